@@ -0,0 +1 @@
+"""Benchmarks of the prometheus_sensors refresh pipeline."""
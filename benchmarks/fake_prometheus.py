@@ -0,0 +1,170 @@
+"""Local stand-in for the Prometheus HTTP API."""
+
+from __future__ import annotations
+
+import asyncio
+import re
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Self
+
+from aiohttp import web
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator, Mapping
+
+_BATCH_ID = re.compile(r'"__ha_id", "([^"]+)"')
+
+
+@dataclass
+class FakePrometheusConfig:
+    """Shape and speed of the responses of the fake server."""
+
+    latency: float = 0.0
+    series: int = 1
+    points: int = 60
+    labels: int = 20
+    label_values: int = 100
+    scrape_interval: str = "15s"
+
+
+@dataclass
+class FakePrometheusStats:
+    """Counters of the requests served."""
+
+    requests: int = 0
+    bytes_sent: int = 0
+    by_path: dict[str, int] = field(default_factory=dict)
+
+
+class FakePrometheus:
+    """
+    Serve synthetic query results over HTTP.
+
+    Instant queries return config.series series, each labelled with a
+    distinct instance. Batched queries return one series per __ha_id found
+    in the query, so batching can be measured as well.
+    """
+
+    def __init__(self, config: FakePrometheusConfig | None = None) -> None:
+        """Initialize the server."""
+        self.config = config or FakePrometheusConfig()
+        self.stats = FakePrometheusStats()
+        self.url = ""
+        self._runner: web.AppRunner | None = None
+
+    async def __aenter__(self) -> Self:
+        """Start listening on a free local port."""
+        app = web.Application()
+        app.router.add_route("*", "/api/v1/query", self._query)
+        app.router.add_route("*", "/api/v1/query_range", self._query_range)
+        app.router.add_get("/api/v1/labels", self._labels)
+        app.router.add_get("/api/v1/label/{name}/values", self._label_values)
+        app.router.add_get("/api/v1/status/config", self._status_config)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        self.url = f"http://{host}:{port}"
+        return self
+
+    async def __aexit__(self, *_exc_info: object) -> None:
+        """Stop the server."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    @contextmanager
+    def in_thread(self) -> Iterator[Self]:
+        """
+        Serve from a separate thread and event loop.
+
+        The work of the server then does not count as blocking time of the
+        event loop under test.
+        """
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        try:
+            asyncio.run_coroutine_threadsafe(self.__aenter__(), loop).result()
+            yield self
+        finally:
+            asyncio.run_coroutine_threadsafe(self.__aexit__(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+    async def _params(self, request: web.Request) -> Mapping[str, str]:
+        """Return the parameters of a GET or form-encoded POST request."""
+        if request.method == "POST":
+            return await request.post()
+        return request.query
+
+    async def _respond(self, request: web.Request, data: object) -> web.Response:
+        """Send a successful API response after the configured latency."""
+        self.stats.requests += 1
+        self.stats.by_path[request.path] = self.stats.by_path.get(request.path, 0) + 1
+        if self.config.latency:
+            await asyncio.sleep(self.config.latency)
+        response = web.json_response({"status": "success", "data": data})
+        self.stats.bytes_sent += len(response.body)
+        return response
+
+    def _metrics(self, query_ids: list[str | None]) -> list[dict[str, str]]:
+        """Return the labels of the series of one or several queries."""
+        return [
+            {
+                "__name__": "fake_metric",
+                "instance": f"host-{index}",
+                "job": "benchmark",
+                **({"__ha_id": query_id} if query_id is not None else {}),
+            }
+            for query_id in query_ids
+            for index in range(self.config.series)
+        ]
+
+    async def _query(self, request: web.Request) -> web.Response:
+        params = await self._params(request)
+        query_ids: list[str | None] = _BATCH_ID.findall(params.get("query", ""))
+        now = time.time()
+        result = [
+            {"metric": metric, "value": [now, str(index)]}
+            for index, metric in enumerate(self._metrics(query_ids or [None]))
+        ]
+        return await self._respond(request, {"resultType": "vector", "result": result})
+
+    async def _query_range(self, request: web.Request) -> web.Response:
+        params = await self._params(request)
+        end = float(params.get("end", time.time()))
+        step = float(params.get("step", 15))
+        result = [
+            {
+                "metric": metric,
+                "values": [
+                    [end - step * point, str(point)]
+                    for point in reversed(range(self.config.points))
+                ],
+            }
+            for metric in self._metrics([None])
+        ]
+        return await self._respond(request, {"resultType": "matrix", "result": result})
+
+    async def _labels(self, request: web.Request) -> web.Response:
+        return await self._respond(
+            request, [f"label_{index}" for index in range(self.config.labels)]
+        )
+
+    async def _label_values(self, request: web.Request) -> web.Response:
+        name = request.match_info["name"]
+        values = (
+            [f"metric_{index}" for index in range(self.config.label_values)]
+            if name == "__name__"
+            else [f"{name}_{index}" for index in range(self.config.label_values)]
+        )
+        return await self._respond(request, values)
+
+    async def _status_config(self, request: web.Request) -> web.Response:
+        yaml = f"global:\n  scrape_interval: {self.config.scrape_interval}\n"
+        return await self._respond(request, {"yaml": yaml})
@@ -0,0 +1,251 @@
+"""
+Benchmark refresh cycles against the fake Prometheus.
+
+Run from the repository root:
+
+    python -m benchmarks.refresh --queries 10 100 1000 --latency 0.005
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from homeassistant.components.sensor import SensorEntityDescription
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers import frame
+from homeassistant.helpers.entity_component import EntityComponent
+
+from custom_components.prometheus_sensors.api import PrometheusApiClient
+from custom_components.prometheus_sensors.api_client.transport import (
+    TRANSPORT_AIOHTTP,
+    TRANSPORT_HTTP2,
+    create_transport,
+)
+from custom_components.prometheus_sensors.coordinator import (
+    PrometheusDataUpdateCoordinator,
+    RefreshOptions,
+)
+from custom_components.prometheus_sensors.sensor import PrometheusSensor
+
+from .fake_prometheus import FakePrometheus, FakePrometheusConfig
+
+LOGGER = logging.getLogger(__name__)
+# Ticks later than this are counted as time the event loop was blocked.
+BLOCKING_THRESHOLD = 0.001
+
+
+@dataclass
+class LoopMonitor:
+    """Measure how long the event loop is unable to run other tasks."""
+
+    tick: float = 0.0005
+    blocked: float = 0.0
+    max_blocked: float = 0.0
+    _task: asyncio.Task | None = field(default=None, repr=False)
+
+    def start(self) -> None:
+        """Start sampling the event loop."""
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        """Stop sampling the event loop."""
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.tick)
+            lag = time.perf_counter() - start - self.tick
+            if lag > BLOCKING_THRESHOLD:
+                self.blocked += lag
+                self.max_blocked = max(self.max_blocked, lag)
+
+
+@dataclass
+class BenchmarkResult:
+    """Measurements of a series of refresh cycles."""
+
+    queries: int
+    cycle_times: list[float]
+    requests: int
+    new_connections: int
+    bytes_decoded: int
+    loop_blocked: float
+    max_loop_blocked: float
+
+    def percentile(self, percent: int) -> float:
+        """Return a percentile of the cycle times, in milliseconds."""
+        if len(self.cycle_times) == 1:
+            return self.cycle_times[0] * 1000
+        return (
+            statistics.quantiles(self.cycle_times, n=100, method="inclusive")[
+                percent - 1
+            ]
+            * 1000
+        )
+
+    def row(self) -> str:
+        """Format the result as a table row."""
+        cycles = len(self.cycle_times)
+        return (
+            f"{self.queries:>7} {self.percentile(50):>9.1f} {self.percentile(95):>9.1f}"
+            f" {self.percentile(99):>9.1f} {self.requests / cycles:>9.1f}"
+            f" {self.new_connections / cycles:>9.1f}"
+            f" {self.bytes_decoded / cycles / 1024:>10.1f}"
+            f" {self.loop_blocked / cycles * 1000:>10.1f}"
+            f" {self.max_loop_blocked * 1000:>9.1f}"
+        )
+
+
+HEADER = (
+    f"{'queries':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/cyc':>9}"
+    f" {'conn/cyc':>9}"
+    f" {'KiB/cyc':>10} {'blk ms/cyc':>10} {'blk max':>9}"
+)
+
+
+async def async_benchmark(
+    hass: HomeAssistant,
+    component: EntityComponent[PrometheusSensor],
+    server: FakePrometheus,
+    queries: int,
+    *,
+    cycles: int,
+    max_concurrency: int,
+    batch_queries: bool,
+    transport: str,
+) -> BenchmarkResult:
+    """Run refresh cycles of a coordinator with one sensor per query."""
+    query_configs = [
+        {
+            "id": f"query_{index}",
+            "name": f"Query {index}",
+            "query": f"up{{i='{index}'}}",
+        }
+        for index in range(queries)
+    ]
+    client = PrometheusApiClient(
+        host=server.url,
+        transport=create_transport(
+            transport, ssl_context=False, pool_size=max_concurrency
+        ),
+    )
+    connection_stats = client.connection_stats
+    coordinator = PrometheusDataUpdateCoordinator(
+        hass=hass,
+        logger=LOGGER,
+        client=client,
+        queries={query["id"]: query["query"] for query in query_configs},
+        name=f"benchmark_{queries}",
+        options=RefreshOptions(
+            # Cycles are driven by the benchmark, not by the coordinator timer.
+            update_interval=timedelta(hours=1),
+            max_concurrency=max_concurrency,
+            batch_queries=batch_queries,
+        ),
+    )
+    await coordinator.async_refresh()
+    await component.async_add_entities(
+        [
+            PrometheusSensor(
+                coordinator=coordinator,
+                entity_description=SensorEntityDescription(
+                    key=query["id"], name=query["name"]
+                ),
+                attribution=query["query"],
+                device_info=None,
+            )
+            for query in query_configs
+        ]
+    )
+    await hass.async_block_till_done()
+
+    monitor = LoopMonitor()
+    monitor.start()
+    cycle_times: list[float] = []
+    requests = server.stats.requests
+    new_connections = connection_stats.new_connections
+    bytes_decoded = client.decode_stats.bytes_read
+    try:
+        for _ in range(cycles):
+            # Make every query due, as if its interval had elapsed.
+            coordinator.scheduler.reset()
+            start = time.perf_counter()
+            await coordinator.async_refresh()
+            cycle_times.append(time.perf_counter() - start)
+    finally:
+        monitor.stop()
+        for entity in list(component.entities):
+            await component.async_remove_entity(entity.entity_id)
+        await client.async_close()
+    return BenchmarkResult(
+        queries=queries,
+        cycle_times=cycle_times,
+        requests=server.stats.requests - requests,
+        new_connections=connection_stats.new_connections - new_connections,
+        bytes_decoded=client.decode_stats.bytes_read - bytes_decoded,
+        loop_blocked=monitor.blocked,
+        max_loop_blocked=monitor.max_blocked,
+    )
+
+
+async def async_main(args: argparse.Namespace) -> None:
+    """Run the benchmarks and print one row per query count."""
+    config = FakePrometheusConfig(latency=args.latency, series=args.series)
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        frame.async_setup(hass)
+        await dr.async_load(hass)
+        await er.async_load(hass)
+        component: EntityComponent[PrometheusSensor] = EntityComponent(
+            LOGGER, "sensor", hass
+        )
+        try:
+            with FakePrometheus(config).in_thread() as server:
+                sys.stdout.write(f"{HEADER}\n")
+                for queries in args.queries:
+                    result = await async_benchmark(
+                        hass,
+                        component,
+                        server,
+                        queries,
+                        cycles=args.cycles,
+                        max_concurrency=args.max_concurrency,
+                        batch_queries=args.batch,
+                        transport=args.transport,
+                    )
+                    sys.stdout.write(f"{result.row()}\n")
+        finally:
+            await hass.async_stop(force=True)
+
+
+def main() -> None:
+    """Parse the arguments and run the benchmarks."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--queries", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--cycles", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.005)
+    parser.add_argument("--series", type=int, default=1)
+    parser.add_argument("--max-concurrency", type=int, default=10)
+    parser.add_argument("--batch", action="store_true")
+    parser.add_argument(
+        "--transport",
+        choices=[TRANSPORT_AIOHTTP, TRANSPORT_HTTP2],
+        default=TRANSPORT_AIOHTTP,
+    )
+    asyncio.run(async_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -7,10 +7,13 @@ https://github.com/alessandroste/prometheus-sensors
 
 from __future__ import annotations
 
-from datetime import timedelta
+from datetime import datetime, timedelta
+from functools import partial
 from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
 
 import voluptuous as vol
+from aiohttp.hdrs import USER_AGENT
 from homeassistant.components.binary_sensor import BinarySensorDeviceClass
 from homeassistant.components.sensor import SensorDeviceClass, SensorStateClass
 from homeassistant.const import (
@@ -23,38 +26,78 @@ from homeassistant.const import (
     CONF_UNIT_OF_MEASUREMENT,
     CONF_VALUE_TEMPLATE,
     CONF_VERIFY_SSL,
+    EVENT_HOMEASSISTANT_CLOSE,
     Platform,
 )
+from homeassistant.core import callback
 from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers import discovery
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.aiohttp_client import SERVER_SOFTWARE
+from homeassistant.helpers.event import async_track_time_interval
 from homeassistant.loader import async_get_loaded_integration
+from homeassistant.util import ssl as ssl_util
 
 from .api import PrometheusApiClient
+from .api_client.prometheus_client import RequestOptions
+from .api_client.transport import (
+    TRANSPORT_AIOHTTP,
+    TRANSPORT_HTTP2,
+    Transport,
+    create_transport,
+    http2_available,
+)
+from .backfill import StatisticsBackfill
 from .const import (
+    CONF_BATCH_QUERIES,
     CONF_BINARY_SENSORS,
+    CONF_DOWNSAMPLE,
     CONF_HEADERS,
+    CONF_HEARTBEAT,
+    CONF_MAX_CONCURRENCY,
+    CONF_POOL_SIZE,
+    CONF_POST_THRESHOLD,
     CONF_QUERIES,
     CONF_QUERY,
+    CONF_QUERY_TIMEOUT,
+    CONF_RELATIVE_TOLERANCE,
     CONF_SENSORS,
+    CONF_SERIES_LABELS,
+    CONF_SERIES_LIMIT,
     CONF_STATE_CLASS,
+    CONF_STATISTIC,
+    CONF_STEP,
+    CONF_TOLERANCE,
+    CONF_TRANSPORT,
+    CONF_WINDOW,
+    DATA_BACKFILL,
+    DATA_CLIENTS,
     DISCOVERY_COORDINATOR,
     DOMAIN,
+    DOWNSAMPLE_FUNCTIONS,
     LOGGER,
-    SCAN_INTERVAL,
+    MAX_CONCURRENCY,
+    METRIC_INDEX_REFRESH_INTERVAL,
+    POST_THRESHOLD,
     SCHEMA_HINT_HOST,
     SCHEMA_HINT_NAME,
     query_id_from_name,
 )
-from .coordinator import PrometheusDataUpdateCoordinator
+from .coordinator import PrometheusDataUpdateCoordinator, RefreshOptions
 from .data import PrometheusSensorsData
+from .metric_index import MetricIndex
+from .registry import ClientRegistry, get_query_cache
+from .services import async_setup_services
+from .window_statistics import STATISTICS
 
 if TYPE_CHECKING:
+    from collections.abc import Hashable
+
     from homeassistant.config_entries import ConfigEntry
-    from homeassistant.core import HomeAssistant
+    from homeassistant.core import Event, HomeAssistant
     from homeassistant.helpers.typing import ConfigType
 
     from .data import PrometheusSensorsConfigEntry
+    from .registry import SharedClient
 
 PLATFORMS: list[Platform] = [Platform.SENSOR, Platform.BINARY_SENSOR]
 
@@ -66,6 +109,19 @@ _SENSOR_QUERY_SCHEMA = vol.Schema(
         vol.Optional(CONF_DEVICE_CLASS): vol.Coerce(SensorDeviceClass),
         vol.Optional(CONF_UNIT_OF_MEASUREMENT): cv.string,
         vol.Optional(CONF_STATE_CLASS): vol.Coerce(SensorStateClass),
+        vol.Optional(CONF_TOLERANCE): vol.All(vol.Coerce(float), vol.Range(min=0)),
+        vol.Optional(CONF_RELATIVE_TOLERANCE): vol.All(
+            vol.Coerce(float), vol.Range(min=0)
+        ),
+        vol.Optional(CONF_HEARTBEAT): cv.positive_time_period,
+        vol.Optional(CONF_SCAN_INTERVAL): cv.positive_time_period,
+        vol.Optional(CONF_SERIES_LABELS): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(CONF_QUERY_TIMEOUT): cv.positive_time_period,
+        vol.Optional(CONF_SERIES_LIMIT): cv.positive_int,
+        vol.Exclusive(CONF_WINDOW, "aggregation"): cv.positive_time_period,
+        vol.Optional(CONF_STEP): cv.positive_time_period,
+        vol.Optional(CONF_STATISTIC): vol.In(STATISTICS),
+        vol.Exclusive(CONF_DOWNSAMPLE, "aggregation"): vol.In(DOWNSAMPLE_FUNCTIONS),
     }
 )
 
@@ -76,6 +132,11 @@ _BINARY_SENSOR_QUERY_SCHEMA = vol.Schema(
         vol.Optional(CONF_ICON): cv.icon,
         vol.Optional(CONF_DEVICE_CLASS): vol.Coerce(BinarySensorDeviceClass),
         vol.Optional(CONF_VALUE_TEMPLATE): cv.template,
+        vol.Optional(CONF_HEARTBEAT): cv.positive_time_period,
+        vol.Optional(CONF_SCAN_INTERVAL): cv.positive_time_period,
+        vol.Optional(CONF_SERIES_LABELS): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(CONF_QUERY_TIMEOUT): cv.positive_time_period,
+        vol.Optional(CONF_SERIES_LIMIT): cv.positive_int,
     }
 )
 
@@ -100,8 +161,19 @@ _SERVER_SCHEMA = vol.All(
             vol.Required(CONF_NAME, default=SCHEMA_HINT_NAME): cv.string,
             vol.Required(CONF_HOST, default=SCHEMA_HINT_HOST): cv.string,
             vol.Optional(CONF_VERIFY_SSL, default=True): cv.boolean,
-            vol.Optional(CONF_SCAN_INTERVAL, default=SCAN_INTERVAL): cv.time_period,
+            vol.Optional(CONF_SCAN_INTERVAL): cv.positive_time_period,
+            vol.Optional(CONF_QUERY_TIMEOUT): cv.positive_time_period,
+            vol.Optional(CONF_SERIES_LIMIT): cv.positive_int,
             vol.Optional(CONF_HEADERS): vol.Schema({cv.string: cv.string}),
+            vol.Optional(
+                CONF_MAX_CONCURRENCY, default=MAX_CONCURRENCY
+            ): cv.positive_int,
+            vol.Optional(CONF_POOL_SIZE): cv.positive_int,
+            vol.Optional(CONF_TRANSPORT, default=TRANSPORT_AIOHTTP): vol.In(
+                [TRANSPORT_AIOHTTP, TRANSPORT_HTTP2]
+            ),
+            vol.Optional(CONF_BATCH_QUERIES, default=False): cv.boolean,
+            vol.Optional(CONF_POST_THRESHOLD, default=POST_THRESHOLD): cv.positive_int,
             vol.Optional(CONF_SENSORS, default=[]): [_SENSOR_QUERY_SCHEMA],
             vol.Optional(CONF_BINARY_SENSORS, default=[]): [
                 _BINARY_SENSOR_QUERY_SCHEMA
@@ -118,18 +190,27 @@ CONFIG_SCHEMA = vol.Schema(
 
 async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     """Set up YAML-configured Prometheus sensors."""
+    hass.data[DATA_BACKFILL] = backfill = StatisticsBackfill(hass)
+    await backfill.async_load()
+    async_setup_services(hass)
+
     for server_config in config.get(DOMAIN, []):
-        client = PrometheusApiClient(
+        key, shared = _acquire_client(
+            hass,
             host=server_config[CONF_HOST],
-            session=async_get_clientsession(
-                hass, verify_ssl=server_config[CONF_VERIFY_SSL]
+            verify_ssl=server_config[CONF_VERIFY_SSL],
+            transport=server_config[CONF_TRANSPORT],
+            pool_size=server_config.get(
+                CONF_POOL_SIZE, server_config[CONF_MAX_CONCURRENCY]
             ),
             headers=server_config.get(CONF_HEADERS),
+            post_threshold=server_config[CONF_POST_THRESHOLD],
         )
+        _async_release_client_on_stop(hass, key)
         coordinator = PrometheusDataUpdateCoordinator(
             hass=hass,
             logger=LOGGER,
-            client=client,
+            client=shared.client,
             queries={
                 query_id_from_name(query[CONF_NAME]): query[CONF_QUERY]
                 for query in [
@@ -138,7 +219,65 @@ async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
                 ]
             },
             name=DOMAIN,
-            update_interval=server_config[CONF_SCAN_INTERVAL],
+            options=RefreshOptions(
+                update_interval=server_config.get(CONF_SCAN_INTERVAL),
+                tick_epoch=shared.epoch,
+                query_intervals={
+                    query_id_from_name(query[CONF_NAME]): query.get(CONF_SCAN_INTERVAL)
+                    for query in [
+                        *server_config[CONF_SENSORS],
+                        *server_config[CONF_BINARY_SENSORS],
+                    ]
+                },
+                series_labels={
+                    query_id_from_name(query[CONF_NAME]): query[CONF_SERIES_LABELS]
+                    for query in [
+                        *server_config[CONF_SENSORS],
+                        *server_config[CONF_BINARY_SENSORS],
+                    ]
+                    if query.get(CONF_SERIES_LABELS)
+                },
+                query_timeouts={
+                    query_id_from_name(query[CONF_NAME]): timeout
+                    for query in [
+                        *server_config[CONF_SENSORS],
+                        *server_config[CONF_BINARY_SENSORS],
+                    ]
+                    if (
+                        timeout := query.get(CONF_QUERY_TIMEOUT)
+                        or server_config.get(CONF_QUERY_TIMEOUT)
+                    )
+                },
+                series_limits={
+                    query_id_from_name(query[CONF_NAME]): limit
+                    for query in [
+                        *server_config[CONF_SENSORS],
+                        *server_config[CONF_BINARY_SENSORS],
+                    ]
+                    if (
+                        limit := query.get(CONF_SERIES_LIMIT)
+                        or server_config.get(CONF_SERIES_LIMIT)
+                    )
+                },
+                query_windows={
+                    query_id_from_name(query[CONF_NAME]): (
+                        query[CONF_WINDOW],
+                        query.get(CONF_STEP),
+                    )
+                    for query in server_config[CONF_SENSORS]
+                    if query.get(CONF_WINDOW)
+                },
+                query_downsampling={
+                    query_id_from_name(query[CONF_NAME]): (
+                        query[CONF_DOWNSAMPLE],
+                        query.get(CONF_STEP),
+                    )
+                    for query in server_config[CONF_SENSORS]
+                    if query.get(CONF_DOWNSAMPLE)
+                },
+                max_concurrency=server_config[CONF_MAX_CONCURRENCY],
+                batch_queries=server_config[CONF_BATCH_QUERIES],
+            ),
         )
         await coordinator.async_refresh()
 
@@ -148,14 +287,14 @@ async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
             DISCOVERY_COORDINATOR: coordinator,
         }
 
-        if server_config[CONF_SENSORS]:
-            await discovery.async_load_platform(
-                hass,
-                Platform.SENSOR,
-                DOMAIN,
-                {**common_config, CONF_QUERIES: server_config[CONF_SENSORS]},
-                config,
-            )
+        # The sensor platform also adds the circuit sensor of the server.
+        await discovery.async_load_platform(
+            hass,
+            Platform.SENSOR,
+            DOMAIN,
+            {**common_config, CONF_QUERIES: server_config[CONF_SENSORS]},
+            config,
+        )
         if server_config[CONF_BINARY_SENSORS]:
             await discovery.async_load_platform(
                 hass,
@@ -177,10 +316,18 @@ async def async_setup_entry(
     entry: PrometheusSensorsConfigEntry,
 ) -> bool:
     """Set up this integration using UI."""
-    client = PrometheusApiClient(
+    max_concurrency = int(entry.data.get(CONF_MAX_CONCURRENCY, MAX_CONCURRENCY))
+    key, shared = _acquire_client(
+        hass,
         host=entry.data[CONF_HOST],
-        session=async_get_clientsession(hass, verify_ssl=entry.data[CONF_VERIFY_SSL]),
+        verify_ssl=entry.data[CONF_VERIFY_SSL],
+        transport=entry.data.get(CONF_TRANSPORT, TRANSPORT_AIOHTTP),
+        pool_size=int(entry.data.get(CONF_POOL_SIZE) or max_concurrency),
+        headers=entry.data.get(CONF_HEADERS),
+        post_threshold=int(entry.data.get(CONF_POST_THRESHOLD, POST_THRESHOLD)),
     )
+    entry.async_on_unload(partial(_async_release_client, hass, key))
+    client = shared.client
     coordinator = PrometheusDataUpdateCoordinator(
         hass=hass,
         logger=LOGGER,
@@ -191,14 +338,79 @@ async def async_setup_entry(
         },
         config_entry=entry,
         name=DOMAIN,
-        update_interval=timedelta(**entry.data[CONF_SCAN_INTERVAL])
-        if CONF_SCAN_INTERVAL in entry.data
-        else timedelta(seconds=1),
+        options=RefreshOptions(
+            update_interval=timedelta(**entry.data[CONF_SCAN_INTERVAL])
+            if entry.data.get(CONF_SCAN_INTERVAL)
+            else None,
+            tick_epoch=shared.epoch,
+            query_intervals={
+                subentry.data[CONF_ID]: timedelta(**subentry.data[CONF_SCAN_INTERVAL])
+                for subentry in entry.subentries.values()
+                if subentry.data.get(CONF_SCAN_INTERVAL)
+            },
+            series_labels={
+                subentry.data[CONF_ID]: subentry.data[CONF_SERIES_LABELS]
+                for subentry in entry.subentries.values()
+                if subentry.data.get(CONF_SERIES_LABELS)
+            },
+            query_timeouts={
+                subentry.data[CONF_ID]: timedelta(**timeout)
+                for subentry in entry.subentries.values()
+                if (
+                    timeout := subentry.data.get(CONF_QUERY_TIMEOUT)
+                    or entry.data.get(CONF_QUERY_TIMEOUT)
+                )
+            },
+            series_limits={
+                subentry.data[CONF_ID]: int(limit)
+                for subentry in entry.subentries.values()
+                if (
+                    limit := subentry.data.get(CONF_SERIES_LIMIT)
+                    or entry.data.get(CONF_SERIES_LIMIT)
+                )
+            },
+            query_windows={
+                subentry.data[CONF_ID]: (
+                    timedelta(**subentry.data[CONF_WINDOW]),
+                    timedelta(**step)
+                    if (step := subentry.data.get(CONF_STEP))
+                    else None,
+                )
+                for subentry in entry.subentries.values()
+                if subentry.data.get(CONF_WINDOW)
+            },
+            query_downsampling={
+                subentry.data[CONF_ID]: (
+                    subentry.data[CONF_DOWNSAMPLE],
+                    timedelta(**step)
+                    if (step := subentry.data.get(CONF_STEP))
+                    else None,
+                )
+                for subentry in entry.subentries.values()
+                if subentry.data.get(CONF_DOWNSAMPLE)
+            },
+            max_concurrency=max_concurrency,
+            batch_queries=entry.data.get(CONF_BATCH_QUERIES, False),
+        ),
     )
     entry.runtime_data = PrometheusSensorsData(
         client=client,
         integration=async_get_loaded_integration(hass, entry.domain),
         coordinator=coordinator,
+        metric_index=MetricIndex(client),
+    )
+
+    async def _async_refresh_metric_index(_now: datetime) -> None:
+        # Only refreshes the index once the query form has loaded it.
+        await entry.runtime_data.metric_index.async_refresh()
+
+    entry.async_on_unload(
+        async_track_time_interval(
+            hass,
+            _async_refresh_metric_index,
+            METRIC_INDEX_REFRESH_INTERVAL,
+            name=f"{DOMAIN} metric index refresh",
+        )
     )
 
     # https://developers.home-assistant.io/docs/integration_fetching_data#coordinated-single-api-poll-for-data-for-all-entities
@@ -206,10 +418,88 @@ async def async_setup_entry(
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     entry.async_on_unload(entry.add_update_listener(_async_update_listener))
+    hass.data[DATA_BACKFILL].async_resume(entry)
 
     return True
 
 
+def _create_transport(name: str, *, verify_ssl: bool, pool_size: int) -> Transport:
+    """Create a transport with its own connection pool for a Prometheus server."""
+    if name == TRANSPORT_HTTP2 and not http2_available():
+        LOGGER.warning(
+            "The %s transport requires the httpx and h2 packages, using %s",
+            TRANSPORT_HTTP2,
+            TRANSPORT_AIOHTTP,
+        )
+        name = TRANSPORT_AIOHTTP
+    return create_transport(
+        name,
+        ssl_context=ssl_util.get_default_context()
+        if verify_ssl
+        else ssl_util.get_default_no_verify_context(),
+        pool_size=pool_size,
+        headers={USER_AGENT: SERVER_SOFTWARE},
+    )
+
+
+def _acquire_client(
+    hass: HomeAssistant,
+    *,
+    host: str,
+    verify_ssl: bool,
+    transport: str,
+    pool_size: int,
+    headers: dict[str, str] | None = None,
+    post_threshold: int = POST_THRESHOLD,
+) -> tuple[Hashable, SharedClient]:
+    """
+    Return the client shared by the entries of a Prometheus server.
+
+    Clients of the same scheme and host share a transport, whatever their
+    path and headers. The connection pool of a transport is created by its
+    first client, so that pool_size is used by every client of the host.
+    """
+    transport_key = (urlsplit(host)[:2], verify_ssl, transport)
+    key = (
+        host,
+        tuple(sorted((headers or {}).items())),
+        post_threshold,
+        transport_key,
+    )
+    registry = hass.data.setdefault(DATA_CLIENTS, ClientRegistry())
+    return key, registry.acquire(
+        key,
+        transport_key,
+        lambda: _create_transport(
+            transport, verify_ssl=verify_ssl, pool_size=pool_size
+        ),
+        lambda shared_transport: PrometheusApiClient(
+            host=host,
+            transport=shared_transport,
+            cache=get_query_cache(hass),
+            options=RequestOptions(headers=headers, post_threshold=post_threshold),
+        ),
+    )
+
+
+async def _async_release_client(hass: HomeAssistant, key: Hashable) -> None:
+    """Release a shared client, and the registry once no client is left."""
+    registry = hass.data[DATA_CLIENTS]
+    await registry.async_release(key)
+    if not registry:
+        del hass.data[DATA_CLIENTS]
+
+
+@callback
+def _async_release_client_on_stop(hass: HomeAssistant, key: Hashable) -> None:
+    """Release the client of a YAML-configured server when Home Assistant stops."""
+
+    async def _async_release(_event: Event) -> None:
+        await _async_release_client(hass, key)
+
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_CLOSE, _async_release)
+
+
 async def async_unload_entry(
     hass: HomeAssistant,
     entry: PrometheusSensorsConfigEntry,
@@ -2,12 +2,61 @@
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import asyncio
+import re
+import time
+from datetime import UTC, datetime
+from functools import partial
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Any
 
-from .api_client.prometheus_client import PrometheusClient
+import aiohttp
+
+from .api_client.decoder import json_loads
+from .api_client.duration import parse_duration
+from .api_client.exceptions import (
+    PrometheusApiClientError as PrometheusResponseError,
+)
+from .api_client.prometheus_client import PrometheusClient, RequestOptions
+from .batching import combine_queries, split_result
+from .circuit_breaker import CircuitBreaker, CircuitState
+from .const import (
+    METRIC_NAMES_MAX_AGE,
+    POST_THRESHOLD,
+    QUERY_TIMEOUT_GRACE,
+    QUERY_VALIDATION_MAX_AGE,
+    QUERY_VALIDATION_TIMEOUT,
+)
 
 if TYPE_CHECKING:
-    import aiohttp
+    from collections.abc import Awaitable, Callable, Mapping, Sequence
+    from datetime import timedelta
+
+    from .api_client.cache import CacheStats, QueryCache
+    from .api_client.connection import ConnectionStats
+    from .api_client.decoder import DecodeStats
+    from .api_client.transport import Transport
+
+# Prometheus renders its configuration with the global section first.
+_GLOBAL_SCRAPE_INTERVAL = re.compile(
+    r"^global:\n(?:[ \t]+.*\n)*?[ \t]+scrape_interval:[ \t]*(\S+)", re.MULTILINE
+)
+DEFAULT_SCRAPE_INTERVAL = "1m"
+# Readiness endpoint, build information, then a query that reads no series.
+_CONNECTION_PROBES: tuple[tuple[str, dict[str, str] | None], ...] = (
+    ("/-/ready", None),
+    ("/api/v1/status/buildinfo", None),
+    ("/api/v1/query", {"query": "vector(1)"}),
+)
+# Statuses of proxies in front of a server that is down.
+_UNAVAILABLE_STATUSES = (
+    HTTPStatus.BAD_GATEWAY,
+    HTTPStatus.SERVICE_UNAVAILABLE,
+    HTTPStatus.GATEWAY_TIMEOUT,
+)
+# Scalar and string results are a timestamp and a value instead of a list of
+# series, so reading their series fails.
+_UNEXPECTED_RESULT = "Prometheus did not return {expected}, check the type of the query"
 
 
 class PrometheusApiClientError(Exception):
@@ -24,6 +73,12 @@ class PrometheusApiClientCommunicationError(
     error_code = "connection"
 
 
+class PrometheusApiClientUnavailableError(
+    PrometheusApiClientCommunicationError,
+):
+    """Exception to indicate a query skipped while the server is unreachable."""
+
+
 class PrometheusApiClientAuthenticationError(
     PrometheusApiClientError,
 ):
@@ -32,60 +87,455 @@ class PrometheusApiClientAuthenticationError(
     error_code = "auth"
 
 
+class PrometheusApiClientQueryError(
+    PrometheusApiClientError,
+):
+    """Exception to indicate a query the server cannot parse."""
+
+    error_code = "invalid_syntax"
+
+
+class PrometheusApiClientTimeoutError(
+    PrometheusApiClientError,
+):
+    """Exception to indicate a query stopped by the server after its timeout."""
+
+    error_code = "timeout"
+
+
 class PrometheusApiClient:
     """A wrapper around prometheus-api-client."""
 
     def __init__(
         self,
         host: str,
-        session: aiohttp.ClientSession,
-        headers: dict[str, str] | None = None,
+        session: aiohttp.ClientSession | None = None,
+        *,
+        transport: Transport | None = None,
+        cache: QueryCache | None = None,
+        options: RequestOptions | None = None,
     ) -> None:
         """Sample API Client."""
         self._host = host
         self._connection = PrometheusClient(
-            url=self._host, session=session, headers=headers
+            url=self._host,
+            session=session,
+            transport=transport,
+            cache=cache,
+            options=options or RequestOptions(post_threshold=POST_THRESHOLD),
         )
+        self.circuit_breaker = CircuitBreaker()
+        self._probe_lock = asyncio.Lock()
+
+    @property
+    def connection_stats(self) -> ConnectionStats:
+        """Return the counters of the connections used by the client."""
+        return self._connection.transport.stats
+
+    @property
+    def cache_stats(self) -> CacheStats | None:
+        """Return the counters of the shared query cache, if any."""
+        return self._connection.cache.stats if self._connection.cache else None
 
-    async def async_get_metrics(self) -> list[str]:
-        """Get all the defined metrics from Prometheus."""
+    async def async_close(self) -> None:
+        """Close the connections of the client."""
+        await self._connection.transport.close()
+
+    @property
+    def decode_stats(self) -> DecodeStats:
+        """Return the counters of the data decoded from query responses."""
+        return self._connection.decode_stats
+
+    async def async_check_connection(self) -> None:
+        """
+        Check that the server answers queries, without loading it.
+
+        The probes are tried from the cheapest, as Prometheus-compatible servers
+        do not all expose the same endpoints.
+        """
+        status = None
+        for path, params in _CONNECTION_PROBES:
+            try:
+                status = await self._connection.get_status(path, params)
+            except Exception as exception:
+                msg = f"Error connecting to Prometheus: {exception}"
+                raise PrometheusApiClientCommunicationError(
+                    msg,
+                ) from exception
+            if status in (HTTPStatus.UNAUTHORIZED, HTTPStatus.FORBIDDEN):
+                msg = f"Prometheus rejected the credentials with status {status}"
+                raise PrometheusApiClientAuthenticationError(msg)
+            if status == HTTPStatus.OK:
+                return
+        msg = f"Prometheus did not answer any probe, last status {status}"
+        raise PrometheusApiClientError(msg)
+
+    async def async_get_metrics(self, start: float | None = None) -> list[str]:
+        """Get the metrics defined in Prometheus, or only since start."""
         try:
-            return await self._connection.all_metrics()
+            return await self._connection.all_metrics(
+                params={"start": start} if start is not None else None,
+                max_age=METRIC_NAMES_MAX_AGE,
+            )
         except Exception as exception:
             msg = f"Error fetching metrics: {exception}"
             raise PrometheusApiClientError(
                 msg,
             ) from exception
 
-    async def async_query(self, query: str) -> float | None:
-        """Query Prometheus with a given query."""
+    async def async_get_label_names(self, match: str, start: float) -> list[str]:
+        """Get the label names of the series matching a selector since start."""
         try:
-            result = await self._connection.custom_query(query)
-            return float(result[0]["value"][1]) if result else None
+            return await self._connection.get_label_names(
+                params={"match[]": match, "start": start}
+            )
         except Exception as exception:
-            msg = f"Error querying Prometheus: {exception}"
+            msg = f"Error fetching labels: {exception}"
             raise PrometheusApiClientError(
                 msg,
             ) from exception
 
-    async def async_get_query_labels(self, query: str) -> list[str]:
-        """Query Prometheus and return the list of label names."""
+    async def async_get_label_values(
+        self, label: str, match: str, start: float
+    ) -> list[str]:
+        """Get the values of a label in the series matching a selector since start."""
         try:
-            result = await self._connection.custom_query(query)
-            return list(result[0]["metric"].keys()) if result else []
+            return await self._connection.get_label_values(
+                label, params={"match[]": match, "start": start}
+            )
         except Exception as exception:
-            msg = f"Error querying Prometheus labels: {exception}"
+            msg = f"Error fetching label values: {exception}"
             raise PrometheusApiClientError(
                 msg,
             ) from exception
 
-    async def async_test_query_result_size(self, query: str) -> bool:
-        """Query Prometheus and return the list of label names."""
+    async def async_get_scrape_interval(self) -> timedelta:
+        """Return the global scrape interval configured on the server."""
+        try:
+            config = await self._connection.get_config()
+            match = _GLOBAL_SCRAPE_INTERVAL.search(config)
+            return parse_duration(match.group(1) if match else DEFAULT_SCRAPE_INTERVAL)
+        except Exception as exception:
+            msg = f"Error fetching Prometheus scrape interval: {exception}"
+            raise PrometheusApiClientError(
+                msg,
+            ) from exception
+
+    async def async_query(
+        self,
+        query: str,
+        max_age: float | None = None,
+        query_timeout: float | None = None,
+        limit: int | None = None,
+    ) -> float | None:
+        """
+        Query Prometheus with a given query.
+
+        With max_age, a shared result up to max_age seconds old may be returned.
+        The server stops evaluating the query after query_timeout seconds, and
+        returns at most limit series.
+        """
+        result = await self._async_custom_query(
+            query,
+            max_series=1,
+            max_age=max_age,
+            query_timeout=query_timeout,
+            limit=limit,
+        )
+        return _value_from_result(result)
+
+    async def async_query_series(
+        self,
+        query: str,
+        labels: Sequence[str],
+        max_age: float | None = None,
+        query_timeout: float | None = None,
+        limit: int | None = None,
+    ) -> dict[str, float | None]:
+        """Query Prometheus and return the value of every series, keyed by labels."""
+        result = await self._async_custom_query(
+            query, max_age=max_age, query_timeout=query_timeout, limit=limit
+        )
+        return _series_values(result, labels)
+
+    async def async_query_batch(
+        self,
+        queries: Mapping[str, str],
+        series_labels: Mapping[str, Sequence[str]] | None = None,
+        max_age: float | None = None,
+        query_timeout: float | None = None,
+    ) -> dict[str, float | dict[str, float | None] | None]:
+        """
+        Query Prometheus with several queries combined in a single request.
+
+        Queries listed in series_labels return the values of all their series.
+        The server applies a limit to the whole combined result, where one
+        query could push the series of the others out, so batches are sent
+        without one.
+        """
+        series_labels = series_labels or {}
+        result = await self._async_custom_query(
+            combine_queries(queries),
+            max_age=max_age,
+            query_timeout=query_timeout,
+        )
+        return {
+            query_id: _series_values(series, series_labels[query_id])
+            if query_id in series_labels
+            else _value_from_result(series)
+            for query_id, series in split_result(result, queries).items()
+        }
+
+    async def _async_custom_query(
+        self,
+        query: str,
+        *,
+        max_series: int | None = None,
+        max_age: float | None = None,
+        query_timeout: float | None = None,
+        limit: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """Evaluate a query, bounded on the server by query_timeout and limit."""
+        params: dict[str, Any] = {}
+        if query_timeout is not None:
+            params["timeout"] = f"{query_timeout:g}s"
+        if limit is not None:
+            params["limit"] = limit
+        return await self._async_guarded_query(
+            partial(
+                self._connection.custom_query,
+                query,
+                params=params,
+                max_series=max_series,
+                max_age=max_age,
+                request_timeout=_request_timeout(query_timeout),
+            )
+        )
+
+    async def async_query_range(
+        self,
+        query: str,
+        start: float,
+        end: float,
+        step: float,
+        *,
+        labels: Sequence[str] | None = None,
+        query_timeout: float | None = None,
+    ) -> dict[str, list[list[Any]]]:
+        """
+        Evaluate a query at every step from start to end, as Unix timestamps.
+
+        Returns the [timestamp, value] samples of every series, keyed by
+        labels. Without labels, only the first series is returned, keyed by
+        an empty string.
+        """
+        params: dict[str, Any] = {}
+        if query_timeout is not None:
+            params["timeout"] = f"{query_timeout:g}s"
+        result = await self._async_guarded_query(
+            partial(
+                self._connection.custom_query_range,
+                query,
+                start_time=datetime.fromtimestamp(start, UTC),
+                end_time=datetime.fromtimestamp(end, UTC),
+                step=f"{step:g}s",
+                params=params,
+                request_timeout=_request_timeout(query_timeout),
+            )
+        )
+        return _range_samples(result, labels)
+
+    async def _async_guarded_query(
+        self, request: Callable[[], Awaitable[list[dict[str, Any]]]]
+    ) -> list[dict[str, Any]]:
+        """
+        Send a query through the circuit breaker and return its result.
+
+        The client waits a little longer than the server timeout, so queries
+        stopped by the server are reported as timeouts rather than as
+        communication errors.
+        """
+        await self._async_check_circuit()
         try:
-            result = await self._connection.custom_query(query)
-            return len(result) == 1
+            result = await request()
+        except PrometheusResponseError as exception:
+            if _is_server_timeout(exception):
+                self.circuit_breaker.record_success()
+                msg = f"Prometheus stopped evaluating the query: {exception.content}"
+                raise PrometheusApiClientTimeoutError(
+                    msg,
+                ) from exception
+            if exception.status in _UNAVAILABLE_STATUSES:
+                self.circuit_breaker.record_failure(time.monotonic())
+            else:
+                self.circuit_breaker.record_success()
+            msg = f"Error querying Prometheus: {exception}"
+            raise PrometheusApiClientError(
+                msg,
+            ) from exception
+        except TimeoutError as exception:
+            self.circuit_breaker.record_failure(time.monotonic())
+            msg = "Prometheus did not answer the query in time"
+            raise PrometheusApiClientCommunicationError(
+                msg,
+            ) from exception
+        except aiohttp.ClientConnectionError as exception:
+            self.circuit_breaker.record_failure(time.monotonic())
+            msg = f"Error communicating with Prometheus: {exception}"
+            raise PrometheusApiClientCommunicationError(
+                msg,
+            ) from exception
         except Exception as exception:
-            msg = f"Error querying Prometheus labels: {exception}"
+            self.circuit_breaker.record_failure(time.monotonic())
+            msg = f"Error querying Prometheus: {exception}"
             raise PrometheusApiClientError(
                 msg,
             ) from exception
+        self.circuit_breaker.record_success()
+        return result
+
+    async def _async_check_circuit(self) -> None:
+        """
+        Fail at once while the circuit of the server is open.
+
+        When a probe is due, the first caller checks the connection with the
+        cheapest probe while the others wait for its outcome, so an outage costs
+        one probe per delay instead of one timed out request per query.
+        """
+        breaker = self.circuit_breaker
+        if breaker.state is CircuitState.CLOSED:
+            return
+        async with self._probe_lock:
+            if breaker.state is CircuitState.CLOSED:
+                return
+            if not breaker.probe_due(time.monotonic()):
+                msg = f"Prometheus is unreachable after {breaker.failures} failures"
+                raise PrometheusApiClientUnavailableError(msg)
+            breaker.start_probe()
+            try:
+                await self.async_check_connection()
+            except PrometheusApiClientAuthenticationError:
+                # The server answers, the query reports the rejected credentials.
+                breaker.record_success()
+            except asyncio.CancelledError:
+                # A probe cut short by the deadline of its query still failed.
+                breaker.record_probe_failure(time.monotonic())
+                raise
+            except PrometheusApiClientError as exception:
+                breaker.record_probe_failure(time.monotonic())
+                msg = f"Prometheus is still unreachable: {exception}"
+                raise PrometheusApiClientUnavailableError(
+                    msg,
+                ) from exception
+            else:
+                breaker.record_success()
+
+    async def async_check_query_syntax(self, query: str) -> None:
+        """
+        Check the syntax of a query without evaluating it.
+
+        The check is skipped on servers without the format_query endpoint.
+        """
+        try:
+            await self._connection.format_query(query)
+        except PrometheusResponseError as exception:
+            if exception.status == HTTPStatus.BAD_REQUEST:
+                msg = f"Invalid query: {exception.content}"
+                raise PrometheusApiClientQueryError(
+                    msg,
+                ) from exception
+        except Exception as exception:
+            msg = f"Error checking the query syntax: {exception}"
+            raise PrometheusApiClientError(
+                msg,
+            ) from exception
+
+    async def async_get_query_labels(self, query: str) -> list[str]:
+        """Query Prometheus and return the list of label names."""
+        result = await self._async_validation_query(query, max_series=1)
+        return list(result[0]["metric"].keys()) if result else []
+
+    async def async_test_query_result_size(self, query: str) -> bool:
+        """Query Prometheus and return whether the query returns a single series."""
+        return len(await self._async_validation_query(query, max_series=2)) == 1
+
+    async def _async_validation_query(
+        self, query: str, max_series: int
+    ) -> list[dict[str, Any]]:
+        """
+        Evaluate a query to validate it, with a bounded duration and result size.
+
+        The server stops evaluating after the validation timeout and returns at
+        most max_series series. Results are cached, so submitting a form again
+        does not evaluate the same query twice.
+        """
+        return await self._async_custom_query(
+            query,
+            max_series=max_series,
+            max_age=QUERY_VALIDATION_MAX_AGE,
+            query_timeout=QUERY_VALIDATION_TIMEOUT,
+            limit=max_series,
+        )
+
+
+def _request_timeout(query_timeout: float | None) -> float | None:
+    """Return how long to wait for a query the server evaluates in query_timeout."""
+    return query_timeout + QUERY_TIMEOUT_GRACE if query_timeout is not None else None
+
+
+def _is_server_timeout(exception: PrometheusResponseError) -> bool:
+    """Return if the server answered that it stopped evaluating a query."""
+    try:
+        error = json_loads(exception.content.encode())
+    except ValueError:
+        return False
+    return isinstance(error, dict) and error.get("errorType") == "timeout"
+
+
+def _value_from_result(result: list[dict[str, Any]]) -> float | None:
+    """Return the value of the first series of an instant query result."""
+    try:
+        return float(result[0]["value"][1]) if result else None
+    except (KeyError, IndexError, TypeError, ValueError) as exception:
+        msg = _UNEXPECTED_RESULT.format(expected="an instant vector")
+        raise PrometheusApiClientError(
+            msg,
+        ) from exception
+
+
+def series_key(metric: Mapping[str, str], labels: Sequence[str]) -> str:
+    """Return the key identifying a series by the values of some of its labels."""
+    return "/".join(metric.get(label, "") for label in labels)
+
+
+def _series_values(
+    result: list[dict[str, Any]], labels: Sequence[str]
+) -> dict[str, float | None]:
+    """Return the values of the series of an instant query result, keyed by labels."""
+    try:
+        return {
+            series_key(series["metric"], labels): float(series["value"][1])
+            for series in result
+        }
+    except (KeyError, IndexError, TypeError, ValueError) as exception:
+        msg = _UNEXPECTED_RESULT.format(expected="an instant vector")
+        raise PrometheusApiClientError(
+            msg,
+        ) from exception
+
+
+def _range_samples(
+    result: list[dict[str, Any]], labels: Sequence[str] | None
+) -> dict[str, list[list[Any]]]:
+    """Return the samples of the series of a range query result, keyed by labels."""
+    try:
+        if labels is None:
+            return {"": result[0]["values"]} if result else {}
+        return {
+            series_key(series["metric"], labels): series["values"] for series in result
+        }
+    except (KeyError, IndexError, TypeError) as exception:
+        msg = _UNEXPECTED_RESULT.format(expected="a range vector")
+        raise PrometheusApiClientError(
+            msg,
+        ) from exception
@@ -0,0 +1,81 @@
+"""Cache of query results shared between clients."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import partial
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Hashable
+
+
+@dataclass
+class CacheStats:
+    """Counters of the lookups in a query cache."""
+
+    hits: int = 0
+    misses: int = 0
+    merged: int = 0
+    evictions: int = 0
+
+
+class QueryCache:
+    """
+    Keep the latest results of queries, evicting the least recently used.
+
+    A result is reused by any caller that accepts its age. Callers asking for
+    a result that is being fetched wait for that request instead of sending
+    their own, so identical queries in a refresh cycle cost a single request.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        """Initialize the cache."""
+        self._max_entries = max_entries
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._pending: dict[Hashable, asyncio.Task[Any]] = {}
+        self.stats = CacheStats()
+
+    def __len__(self) -> int:
+        """Return the number of cached results."""
+        return len(self._entries)
+
+    async def get(
+        self,
+        key: Hashable,
+        max_age: float,
+        fetch: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Return the cached result of key if younger than max_age, or fetch it."""
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and now - entry[0] <= max_age:
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry[1]
+
+        task = self._pending.get(key)
+        if task is None:
+            self.stats.misses += 1
+            task = asyncio.get_running_loop().create_task(fetch())
+            self._pending[key] = task
+            task.add_done_callback(partial(self._store, key, now))
+        else:
+            self.stats.merged += 1
+        # A caller that gives up must not cancel the request of the others.
+        return await asyncio.shield(task)
+
+    def _store(self, key: Hashable, started: float, task: asyncio.Task[Any]) -> None:
+        """Cache the result of a successful request."""
+        del self._pending[key]
+        if task.cancelled() or task.exception() is not None:
+            return
+        # The result is as old as the request that evaluated it.
+        self._entries[key] = (started, task.result())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
@@ -0,0 +1,67 @@
+"""Connection pool of a Prometheus server."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import aiohttp
+
+if TYPE_CHECKING:
+    import ssl
+
+# Longer than common scrape intervals, so connections survive between refreshes.
+KEEPALIVE_TIMEOUT = 120
+
+
+@dataclass
+class ConnectionStats:
+    """Counters of the connections opened and reused by a session."""
+
+    requests: int = 0
+    new_connections: int = 0
+    reused_connections: int = 0
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """Return a trace config that updates these counters."""
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(self._on_request_start)
+        trace_config.on_connection_create_end.append(self._on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(self._on_connection_reuseconn)
+        return trace_config
+
+    async def _on_request_start(self, *_args: object) -> None:
+        self.requests += 1
+
+    async def _on_connection_create_end(self, *_args: object) -> None:
+        self.new_connections += 1
+
+    async def _on_connection_reuseconn(self, *_args: object) -> None:
+        self.reused_connections += 1
+
+
+def create_session(
+    *,
+    ssl_context: ssl.SSLContext | bool,
+    pool_size: int,
+    stats: ConnectionStats,
+    headers: dict[str, str] | None = None,
+) -> aiohttp.ClientSession:
+    """
+    Create a session with a connection pool dedicated to one server.
+
+    At most pool_size connections are opened, and idle connections are kept
+    alive for KEEPALIVE_TIMEOUT seconds so refreshes do not pay for new TCP and
+    TLS handshakes.
+    """
+    connector = aiohttp.TCPConnector(
+        ssl=ssl_context,
+        limit=pool_size,
+        limit_per_host=pool_size,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        headers=headers,
+        trace_configs=[stats.trace_config()],
+    )
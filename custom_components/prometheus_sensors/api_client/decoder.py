@@ -0,0 +1,151 @@
+"""Incremental decoding of Prometheus query responses."""
+
+import json
+import re
+from dataclasses import dataclass
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+_RESULT_START = re.compile(rb'"result"\s*:\s*\[')
+_TOKEN = re.compile(rb'[{}\[\]"]')
+_STRING = re.compile(rb'"(?:[^"\\]|\\.)*"', re.DOTALL)
+_SERIES_KEY = b'"metric"'
+_WHITESPACE = b" \t\r\n,"
+
+
+def json_loads(data: bytes | bytearray) -> Any:
+    """Decode JSON with orjson when available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(bytes(data))
+
+
+@dataclass
+class DecodeStats:
+    """Counters of the data read from query responses."""
+
+    bytes_read: int = 0
+    bytes_discarded: int = 0
+    series_parsed: int = 0
+    series_discarded: int = 0
+
+
+class ResultDecoder:
+    """
+    Decode the result array of a query response chunk by chunk.
+
+    Only the first max_series series are parsed. The rest of the body is
+    counted but never decoded, so memory stays bounded by the chunk size and
+    the size of the kept series.
+    """
+
+    def __init__(self, max_series: int) -> None:
+        """Initialize the decoder."""
+        self._max_series = max_series
+        self._buffer = bytearray()
+        self._pos = 0
+        self._depth = 0
+        self._in_result = False
+        self._tail = b""
+        self.result: list[Any] = []
+        self.done = False
+        self.truncated = False
+        self.fallback = False
+        self.stats = DecodeStats()
+
+    def feed(self, chunk: bytes) -> None:
+        """Consume the next chunk of the response body."""
+        self.stats.bytes_read += len(chunk)
+        if self.done:
+            if self.truncated:
+                self._discard(chunk)
+            return
+        self._buffer += chunk
+        if self.fallback:
+            return
+        if not self._in_result:
+            match = _RESULT_START.search(self._buffer)
+            if match is None:
+                return
+            self._in_result = True
+            self._pos = match.end()
+        self._scan()
+
+    def finish(self) -> list[Any]:
+        """Return the decoded series once the whole body has been fed."""
+        if self.fallback or not self._in_result:
+            data = json_loads(self._buffer)["data"]
+            self.result = data["result"]
+            self.stats.series_parsed = (
+                len(self.result)
+                if data.get("resultType") in ("vector", "matrix")
+                else 1
+            )
+        self._buffer = bytearray()
+        return self.result
+
+    def _scan(self) -> None:
+        """Extract the complete series found in the buffer."""
+        buffer = self._buffer
+        pos = self._pos
+        while pos < len(buffer):
+            if self._depth == 0:
+                # Between two series of the result array.
+                while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                    pos += 1
+                if pos == len(buffer):
+                    break
+                if buffer[pos] == ord("]"):
+                    self.done = True
+                    self._buffer = bytearray()
+                    return
+                if buffer[pos] != ord("{"):
+                    # Scalar and string results are small, decode them whole.
+                    self.fallback = True
+                    return
+                # Drop everything before the series to keep the buffer small.
+                del buffer[:pos]
+                pos = 0
+            token = _TOKEN.search(buffer, pos + (self._depth == 0))
+            if self._depth == 0:
+                self._depth = 1
+            if token is None:
+                pos = len(buffer)
+                break
+            if token.group() == b'"':
+                string = _STRING.match(buffer, token.start())
+                if string is None:
+                    # The string continues in the next chunk.
+                    pos = token.start()
+                    break
+                pos = string.end()
+                continue
+            pos = token.end()
+            self._depth += 1 if token.group() in b"{[" else -1
+            if self._depth == 0:
+                self.result.append(json_loads(buffer[:pos]))
+                self.stats.series_parsed += 1
+                if len(self.result) >= self._max_series:
+                    self._truncate(pos)
+                    return
+        self._pos = pos
+
+    def _truncate(self, pos: int) -> None:
+        """Stop decoding and treat the rest of the body as discarded."""
+        rest = bytes(self._buffer[pos:])
+        self.done = True
+        self.truncated = True
+        self._buffer = bytearray()
+        self._discard(rest)
+
+    def _discard(self, chunk: bytes) -> None:
+        """Count the bytes and series that are skipped."""
+        self.stats.bytes_discarded += len(chunk)
+        data = self._tail + chunk
+        self.stats.series_discarded += data.count(_SERIES_KEY)
+        # Keep a partial key that may continue in the next chunk.
+        self._tail = data[-(len(_SERIES_KEY) - 1) :]
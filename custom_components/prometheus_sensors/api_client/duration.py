@@ -0,0 +1,45 @@
+"""Prometheus duration strings."""
+
+import re
+from datetime import timedelta
+
+_DURATION = re.compile(
+    r"^(?:(\d+)y)?(?:(\d+)w)?(?:(\d+)d)?(?:(\d+)h)?(?:(\d+)m)?(?:(\d+)s)?(?:(\d+)ms)?$"
+)
+_UNITS = (
+    timedelta(days=365),
+    timedelta(weeks=1),
+    timedelta(days=1),
+    timedelta(hours=1),
+    timedelta(minutes=1),
+    timedelta(seconds=1),
+    timedelta(milliseconds=1),
+)
+_SUFFIXES = ("y", "w", "d", "h", "m", "s", "ms")
+
+
+def parse_duration(duration: str) -> timedelta:
+    """Parse a duration such as 1m30s."""
+    match = _DURATION.match(duration.strip())
+    if match is None or not any(match.groups()):
+        msg = f"Invalid duration: {duration}"
+        raise ValueError(msg)
+    return sum(
+        (
+            unit * int(value)
+            for unit, value in zip(_UNITS, match.groups(), strict=True)
+            if value
+        ),
+        timedelta(),
+    )
+
+
+def format_duration(duration: timedelta) -> str:
+    """Format a duration such as 1m30s, rounded to the millisecond."""
+    remainder = round(duration / _UNITS[-1])
+    parts = []
+    for unit, suffix in zip(_UNITS, _SUFFIXES, strict=True):
+        value, remainder = divmod(remainder, round(unit / _UNITS[-1]))
+        if value:
+            parts.append(f"{value}{suffix}")
+    return "".join(parts) or "0s"
@@ -1,11 +1,11 @@
 """Exceptions for Prometheus API client."""
 
-from aiohttp import StreamReader
-
 
 class PrometheusApiClientError(Exception):
     """Exception to indicate a general API error."""
 
-    def __init__(self, status: int, content: StreamReader) -> None:
+    def __init__(self, status: int, content: str) -> None:
         """Initialize the exception."""
+        self.status = status
+        self.content = content
         super().__init__(f"HTTP Status Code {status} ({content!r})")
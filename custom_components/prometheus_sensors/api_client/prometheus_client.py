@@ -1,12 +1,33 @@
 """A Class for collection of metrics from a Prometheus Host."""
 
+from contextlib import AbstractAsyncContextManager
+from dataclasses import dataclass
 from datetime import datetime
+from functools import partial
 from http import HTTPStatus
 from typing import Any
+from urllib.parse import urlencode
 
 import aiohttp
 
+from .cache import QueryCache
+from .decoder import DecodeStats, ResultDecoder, json_loads
 from .exceptions import PrometheusApiClientError
+from .transport import AiohttpTransport, Transport, TransportResponse
+
+CHUNK_SIZE = 64 * 1024
+
+
+@dataclass(frozen=True, kw_only=True)
+class RequestOptions:
+    """Options of the requests sent to a Prometheus server."""
+
+    headers: dict[str, str] | None = None
+    # Queries whose encoded parameters are longer are sent as a form-encoded
+    # POST body instead of GET query parameters.
+    post_threshold: int | None = None
+    # Seconds after which requests without a timeout of their own are abandoned.
+    timeout: float = 10
 
 
 class PrometheusClient:
@@ -15,92 +36,131 @@ class PrometheusClient:
     def __init__(
         self,
         url: str,
-        session: aiohttp.ClientSession,
-        timeout: aiohttp.ClientTimeout | None = None,
-        headers: dict[str, str] | None = None,
+        session: aiohttp.ClientSession | None = None,
+        *,
+        transport: Transport | None = None,
+        cache: QueryCache | None = None,
+        options: RequestOptions | None = None,
     ) -> None:
-        """Initialize the Prometheus API client."""
-        if url is None:
+        """
+        Initialize the Prometheus API client.
+
+        Requests are sent with transport, or over session when no transport
+        is given. Instant query results are shared through cache.
+        """
+        if url is None or (session is None and transport is None):
             raise ValueError
 
+        options = options or RequestOptions()
         self._url = url
-        self._session = session
-        self._timeout = timeout or aiohttp.ClientTimeout(total=10)
-        self._headers = headers
+        self.transport = transport or AiohttpTransport(session)
+        self._timeout = options.timeout
+        self._headers = options.headers
+        self._post_threshold = options.post_threshold
+        self.cache = cache
+        self.decode_stats = DecodeStats()
 
     async def check_connection(self, params: dict | None = None) -> bool:
         """Validate the connection to the server."""
-        response = await self._session.get(
-            f"{self._url}/",
+        return await self.get_status("/", params) < HTTPStatus.BAD_REQUEST
+
+    async def get_status(self, path: str, params: dict | None = None) -> int:
+        """Send a GET request to path and return the status of the response."""
+        async with self.transport.request(
+            "GET",
+            f"{self._url}{path}",
             params=params,
             headers=self._headers,
-            timeout=self._timeout,
-        )
-        return response.ok
+            request_timeout=self._timeout,
+        ) as response:
+            await response.read()
+            return response.status
+
+    async def get_config(self) -> str:
+        """Return the configuration file loaded by the server, as YAML."""
+        return (await self._get_data("/api/v1/status/config"))["yaml"]
+
+    async def all_metrics(
+        self, params: dict | None = None, max_age: float | None = None
+    ) -> list[str]:
+        """
+        Return a list of the available metrics.
 
-    async def all_metrics(self, params: dict | None = None) -> list[str]:
-        """Return a list of the available metrics."""
-        self._all_metrics = await self.get_label_values(
-            label_name="__name__", params=params
+        With max_age, a cached list fetched at most max_age seconds ago is
+        returned instead.
+        """
+        fetch = partial(self.get_label_values, label_name="__name__", params=params)
+        if self.cache is None or not max_age:
+            return await fetch()
+        key = (
+            self._url,
+            tuple(sorted((self._headers or {}).items())),
+            "__name__",
+            tuple(sorted((params or {}).items())),
         )
-        return self._all_metrics
+        return await self.cache.get(key, max_age, fetch)
+
+    async def format_query(self, query: str) -> str:
+        """Return a query as formatted by the server, without evaluating it."""
+        return await self._get_data("/api/v1/format_query", {"query": query})
 
     async def get_label_names(self, params: dict | None = None) -> list[str]:
         """Return a list of the available labels."""
-        params = params or {}
-        response = await self._session.get(
-            f"{self._url}/api/v1/labels",
-            params=params,
-            headers=self._headers,
-            timeout=self._timeout,
-        )
-
-        if response.status == HTTPStatus.OK:
-            labels = (await response.json())["data"]
-        else:
-            raise PrometheusApiClientError(response.status, response.content)
-        return labels
+        return await self._get_data("/api/v1/labels", params)
 
     async def get_label_values(
         self, label_name: str, params: dict | None = None
     ) -> list[str]:
         """Return a list of the label values."""
-        params = params or {}
-        response = await self._session.get(
-            f"{self._url}/api/v1/label/{label_name}/values",
-            params=params,
-            headers=self._headers,
-            timeout=self._timeout,
-        )
-
-        if response.status == HTTPStatus.OK:
-            labels = (await response.json())["data"]
-        else:
-            raise PrometheusApiClientError(response.status, response.content)
-        return labels
+        return await self._get_data(f"/api/v1/label/{label_name}/values", params)
 
     async def custom_query(
         self,
         query: str,
         params: dict | None = None,
+        max_series: int | None = None,
+        max_age: float | None = None,
+        request_timeout: float | None = None,
     ) -> Any:
-        """Evaluate a custom query."""
+        """
+        Evaluate a custom query.
+
+        With max_series, only the first series of the result are decoded and
+        the rest of the response body is skipped. With max_age, a cached result
+        evaluated at most max_age seconds ago is returned instead. The request
+        is abandoned after request_timeout seconds, or the client timeout.
+        """
         params = params or {}
-        data = None
         query = str(query)
+        fetch = partial(self._custom_query, query, params, max_series, request_timeout)
+        if self.cache is None or not max_age:
+            return await fetch()
+        key = (
+            self._url,
+            tuple(sorted((self._headers or {}).items())),
+            query,
+            tuple(sorted(params.items())),
+            max_series,
+        )
+        return await self.cache.get(key, max_age, fetch)
+
+    async def _custom_query(
+        self,
+        query: str,
+        params: dict,
+        max_series: int | None,
+        request_timeout: float | None,
+    ) -> Any:
+        """Send an instant query and decode its result."""
         # using the query API to get raw data
-        response = await self._session.get(
+        async with self._query_request(
             f"{self._url}/api/v1/query",
             params={"query": query, **params},
-            headers=self._headers,
-            timeout=self._timeout,
-        )
-        if response.status == HTTPStatus.OK:
-            data = (await response.json())["data"]["result"]
-        else:
-            raise PrometheusApiClientError(response.status, response.content)
-
-        return data
+            request_timeout=request_timeout,
+        ) as response:
+            if response.status != HTTPStatus.OK:
+                raise PrometheusApiClientError(response.status, await response.text())
+            return await self._read_result(response, max_series)
 
     async def custom_query_range(
         self,
@@ -109,15 +169,20 @@ class PrometheusClient:
         end_time: datetime,
         step: str,
         params: dict | None = None,
+        request_timeout: float | None = None,
     ) -> Any:
-        """Evaluate a custom query with time range."""
+        """
+        Evaluate a custom query with time range.
+
+        The request is abandoned after request_timeout seconds, or the client
+        timeout.
+        """
         start = round(start_time.timestamp())
         end = round(end_time.timestamp())
         params = params or {}
-        data = None
         query = str(query)
         # using the query_range API to get raw data
-        response = await self._session.get(
+        async with self._query_request(
             f"{self._url}/api/v1/query_range",
             params={
                 "query": query,
@@ -126,11 +191,74 @@ class PrometheusClient:
                 "step": step,
                 **params,
             },
+            request_timeout=request_timeout,
+        ) as response:
+            if response.status != HTTPStatus.OK:
+                raise PrometheusApiClientError(response.status, await response.text())
+            return await self._read_result(response, None)
+
+    async def _get_data(self, path: str, params: dict | None = None) -> Any:
+        """Send a GET request and return the data of the response."""
+        async with self.transport.request(
+            "GET",
+            f"{self._url}{path}",
+            params=params or {},
             headers=self._headers,
-            timeout=self._timeout,
+            request_timeout=self._timeout,
+        ) as response:
+            if response.status != HTTPStatus.OK:
+                raise PrometheusApiClientError(response.status, await response.text())
+            return json_loads(await response.read())["data"]
+
+    async def _read_result(
+        self, response: TransportResponse, max_series: int | None
+    ) -> Any:
+        """Decode the result of a query response."""
+        if max_series is None:
+            body = await response.read()
+            result = json_loads(body)["data"]["result"]
+            self.decode_stats.bytes_read += len(body)
+            self.decode_stats.series_parsed += len(result)
+            return result
+
+        decoder = ResultDecoder(max_series)
+        async for chunk in response.iter_chunked(CHUNK_SIZE):
+            decoder.feed(chunk)
+        result = decoder.finish()
+        self.decode_stats.bytes_read += decoder.stats.bytes_read
+        self.decode_stats.bytes_discarded += decoder.stats.bytes_discarded
+        self.decode_stats.series_parsed += decoder.stats.series_parsed
+        self.decode_stats.series_discarded += decoder.stats.series_discarded
+        return result
+
+    def _query_request(
+        self,
+        url: str,
+        params: dict[str, Any],
+        request_timeout: float | None = None,
+    ) -> AbstractAsyncContextManager[TransportResponse]:
+        """
+        Send a query with GET, or with POST when the parameters are too long.
+
+        The response is released when the returned context manager exits.
+        """
+        request_timeout = request_timeout or self._timeout
+        body = urlencode(params, doseq=True)
+        if self._post_threshold is None or len(body) <= self._post_threshold:
+            return self.transport.request(
+                "GET",
+                url,
+                params=params,
+                headers=self._headers,
+                request_timeout=request_timeout,
+            )
+        return self.transport.request(
+            "POST",
+            url,
+            data=body,
+            headers={
+                **(self._headers or {}),
+                "Content-Type": "application/x-www-form-urlencoded",
+            },
+            request_timeout=request_timeout,
         )
-        if response.status == HTTPStatus.OK:
-            data = (await response.json())["data"]["result"]
-        else:
-            raise PrometheusApiClientError(response.status, response.content)
-        return data
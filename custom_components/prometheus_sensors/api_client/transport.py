@@ -0,0 +1,264 @@
+"""HTTP transports used by the Prometheus client."""
+
+from __future__ import annotations
+
+import importlib.util
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from typing import TYPE_CHECKING, Any, Protocol
+
+import aiohttp
+
+from .connection import KEEPALIVE_TIMEOUT, ConnectionStats, create_session
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+if TYPE_CHECKING:
+    import ssl
+    from collections.abc import AsyncIterator, Iterator
+    from contextlib import AbstractAsyncContextManager
+
+TRANSPORT_AIOHTTP = "aiohttp"
+TRANSPORT_HTTP2 = "http2"
+
+
+def http2_available() -> bool:
+    """Return if the optional HTTP/2 client libraries are installed."""
+    return httpx is not None and importlib.util.find_spec("h2") is not None
+
+
+class TransportResponse(Protocol):
+    """Response of a transport request."""
+
+    status: int
+
+    async def read(self) -> bytes:
+        """Return the whole body."""
+
+    async def text(self) -> str:
+        """Return the whole body as text."""
+
+    def iter_chunked(self, size: int) -> AsyncIterator[bytes]:
+        """Iterate over the body in chunks of at most size bytes."""
+
+
+class Transport(Protocol):
+    """Send HTTP requests to a Prometheus server."""
+
+    stats: ConnectionStats
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        params: dict[str, Any] | None = None,
+        data: str | None = None,
+        headers: dict[str, str] | None = None,
+        request_timeout: float | None = None,
+    ) -> AbstractAsyncContextManager[TransportResponse]:
+        """Send a request. The response is released when the context exits."""
+
+    async def close(self) -> None:
+        """Close the connections opened by the transport."""
+
+
+class _AiohttpResponse:
+    """Response of the aiohttp transport."""
+
+    def __init__(self, response: aiohttp.ClientResponse) -> None:
+        self._response = response
+        self.status = response.status
+
+    async def read(self) -> bytes:
+        return await self._response.read()
+
+    async def text(self) -> str:
+        return await self._response.text(errors="replace")
+
+    def iter_chunked(self, size: int) -> AsyncIterator[bytes]:
+        return self._response.content.iter_chunked(size)
+
+
+class AiohttpTransport:
+    """
+    Transport over an aiohttp session.
+
+    The session is only closed by the transport when owned is set, so a
+    session shared with Home Assistant can be used as well.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        *,
+        stats: ConnectionStats | None = None,
+        owned: bool = False,
+    ) -> None:
+        """Initialize the transport."""
+        self._session = session
+        self._owned = owned
+        self.stats = stats or ConnectionStats()
+
+    @asynccontextmanager
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        params: dict[str, Any] | None = None,
+        data: str | None = None,
+        headers: dict[str, str] | None = None,
+        request_timeout: float | None = None,
+    ) -> AsyncIterator[TransportResponse]:
+        """Send a request. The response is released when the context exits."""
+        async with self._session.request(
+            method,
+            url,
+            params=params,
+            data=data,
+            headers=headers,
+            timeout=aiohttp.ClientTimeout(total=request_timeout),
+        ) as response:
+            yield _AiohttpResponse(response)
+
+    async def close(self) -> None:
+        """Close the session when it is owned by the transport."""
+        if self._owned:
+            await self._session.close()
+
+
+@contextmanager
+def _translate_httpx_errors() -> Iterator[None]:
+    """
+    Raise httpx errors as the errors of the aiohttp transport.
+
+    Timeouts become TimeoutError and other failures to reach the server
+    aiohttp.ClientConnectionError, so callers handle both transports alike.
+    """
+    try:
+        yield
+    except httpx.TimeoutException as exception:
+        raise TimeoutError(str(exception)) from exception
+    except httpx.TransportError as exception:
+        raise aiohttp.ClientConnectionError(str(exception)) from exception
+
+
+class _HttpxResponse:
+    """Response of the HTTP/2 transport."""
+
+    def __init__(self, response: httpx.Response) -> None:
+        self._response = response
+        self.status = response.status_code
+
+    async def read(self) -> bytes:
+        with _translate_httpx_errors():
+            return await self._response.aread()
+
+    async def text(self) -> str:
+        return (await self.read()).decode(errors="replace")
+
+    async def iter_chunked(self, size: int) -> AsyncIterator[bytes]:
+        with _translate_httpx_errors():
+            async for chunk in self._response.aiter_bytes(size):
+                yield chunk
+
+
+class Http2Transport:
+    """
+    Transport multiplexing concurrent requests over HTTP/2 connections.
+
+    Requires the optional httpx and h2 packages. Servers that do not
+    negotiate HTTP/2 are served over HTTP/1.1 with a pool of pool_size
+    connections. The streams of open connections are only weakly referenced,
+    so connections closed by the pool are forgotten.
+    """
+
+    def __init__(
+        self,
+        *,
+        ssl_context: ssl.SSLContext | bool,
+        pool_size: int,
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        """Initialize the transport."""
+        if not http2_available():
+            msg = "HTTP/2 transport requires the httpx and h2 packages"
+            raise RuntimeError(msg)
+        self.stats = ConnectionStats()
+        self._streams: weakref.WeakSet[Any] = weakref.WeakSet()
+        self._client = httpx.AsyncClient(
+            http2=True,
+            verify=ssl_context,
+            headers=headers,
+            limits=httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size,
+                keepalive_expiry=KEEPALIVE_TIMEOUT,
+            ),
+        )
+
+    @asynccontextmanager
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        params: dict[str, Any] | None = None,
+        data: str | None = None,
+        headers: dict[str, str] | None = None,
+        request_timeout: float | None = None,
+    ) -> AsyncIterator[TransportResponse]:
+        """Send a request. The response is released when the context exits."""
+        self.stats.requests += 1
+        with _translate_httpx_errors():
+            async with self._client.stream(
+                method,
+                url,
+                params=params,
+                content=data,
+                headers=headers,
+                timeout=request_timeout,
+            ) as response:
+                self._count_connection(response)
+                yield _HttpxResponse(response)
+
+    def _count_connection(self, response: httpx.Response) -> None:
+        """Count the requests sent over new and reused connections."""
+        stream = response.extensions.get("network_stream")
+        if stream is None:
+            return
+        if stream in self._streams:
+            self.stats.reused_connections += 1
+        else:
+            self._streams.add(stream)
+            self.stats.new_connections += 1
+
+    async def close(self) -> None:
+        """Close the connections of the client."""
+        await self._client.aclose()
+
+
+def create_transport(
+    name: str,
+    *,
+    ssl_context: ssl.SSLContext | bool,
+    pool_size: int,
+    headers: dict[str, str] | None = None,
+) -> Transport:
+    """Create a transport with a connection pool dedicated to one server."""
+    if name == TRANSPORT_HTTP2:
+        return Http2Transport(
+            ssl_context=ssl_context, pool_size=pool_size, headers=headers
+        )
+    stats = ConnectionStats()
+    return AiohttpTransport(
+        create_session(
+            ssl_context=ssl_context, pool_size=pool_size, stats=stats, headers=headers
+        ),
+        stats=stats,
+        owned=True,
+    )
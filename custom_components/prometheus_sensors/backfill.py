@@ -0,0 +1,375 @@
+"""Backfill of the long-term statistics of sensors from Prometheus history."""
+
+from __future__ import annotations
+
+import asyncio
+import math
+from dataclasses import asdict, dataclass
+from functools import partial
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.components.recorder import DOMAIN as RECORDER_DOMAIN
+from homeassistant.components.recorder import get_instance
+from homeassistant.components.recorder.models import (
+    StatisticData,
+    StatisticMeanType,
+    StatisticMetaData,
+)
+from homeassistant.components.recorder.statistics import (
+    STATISTIC_UNIT_TO_UNIT_CONVERTER,
+    async_import_statistics,
+    statistics_during_period,
+)
+from homeassistant.components.sensor import ATTR_STATE_CLASS, SensorStateClass
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.const import Platform
+from homeassistant.core import callback
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .api import PrometheusApiClientError
+from .const import (
+    BACKFILL_CHUNK,
+    BACKFILL_CHUNK_DELAY,
+    BACKFILL_RETRY_DELAY,
+    BACKFILL_STEP,
+    DOMAIN,
+    LOGGER,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from datetime import datetime
+
+    from homeassistant.components.recorder.statistics import StatisticsRow
+    from homeassistant.core import HomeAssistant
+
+    from .data import PrometheusSensorsConfigEntry
+
+STORAGE_KEY = f"{DOMAIN}.backfill"
+STORAGE_VERSION = 1
+# Delay before the progress of the jobs is written to storage.
+SAVE_DELAY = 10
+HOUR = 3600
+
+
+@dataclass
+class BackfillJob:
+    """Progress of the backfill of the statistics of a sensor."""
+
+    entry_id: str
+    query_id: str
+    # Key of the series of the sensor, for queries returning several series.
+    series_key: str | None
+    # Unix time of the next hour to import, and of the end of the last one.
+    start: float
+    end: float
+    unit_of_measurement: str | None
+    # Sensors with a total_increasing state class import sums, others means.
+    # Sums continue from the statistics before start, and the statistics
+    # after end are shifted by the difference with the sum they replaced.
+    total: bool
+    sum: float = 0.0
+    last: float | None = None
+    replaced_sum: float = 0.0
+    # Unexpected error that stopped the job, which is then no longer resumed.
+    error: str | None = None
+
+
+class StatisticsBackfill:
+    """
+    Import the history of sensors from Prometheus into long-term statistics.
+
+    Each job fetches the samples of its query one chunk at a time with a
+    range query and imports them as hourly statistics, so memory is bounded
+    by the size of a chunk. Chunks of all jobs are fetched one after the
+    other with a pause in between, so a backfill never loads the server.
+    The progress of every job is stored, and jobs resume when their entry is
+    set up again.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the backfill."""
+        self._hass = hass
+        self._store: Store[dict[str, dict[str, Any]]] = Store(
+            hass, STORAGE_VERSION, STORAGE_KEY
+        )
+        self._jobs: dict[str, BackfillJob] = {}
+        self._tasks: dict[str, asyncio.Task[None]] = {}
+        self._lock = asyncio.Lock()
+
+    async def async_load(self) -> None:
+        """Load the jobs interrupted by a restart."""
+        data = await self._store.async_load() or {}
+        self._jobs = {entity_id: BackfillJob(**job) for entity_id, job in data.items()}
+
+    @callback
+    def async_resume(self, entry: PrometheusSensorsConfigEntry) -> None:
+        """Resume the jobs of the sensors of an entry."""
+        for entity_id, job in self._jobs.items():
+            if job.entry_id == entry.entry_id and job.error is None:
+                self._async_start(entry, entity_id)
+
+    async def async_backfill(
+        self, entity_id: str, start: datetime, end: datetime
+    ) -> None:
+        """Start importing the statistics of a sensor between start and end."""
+        entity = er.async_get(self._hass).async_get(entity_id)
+        if (
+            entity is None
+            or entity.platform != DOMAIN
+            or entity.domain != Platform.SENSOR
+            or entity.config_entry_id is None
+        ):
+            msg = f"{entity_id} is not a sensor of a Prometheus server set up in the UI"
+            raise ServiceValidationError(msg)
+        if RECORDER_DOMAIN not in self._hass.config.components:
+            msg = "Statistics can only be imported when the recorder is enabled"
+            raise ServiceValidationError(msg)
+        entry: PrometheusSensorsConfigEntry | None = (
+            self._hass.config_entries.async_get_entry(entity.config_entry_id)
+        )
+        if entry is None or entry.state is not ConfigEntryState.LOADED:
+            msg = f"The Prometheus server of {entity_id} is not loaded"
+            raise ServiceValidationError(msg)
+        state_class = (entity.capabilities or {}).get(ATTR_STATE_CLASS)
+        if state_class not in (
+            SensorStateClass.MEASUREMENT,
+            SensorStateClass.TOTAL_INCREASING,
+        ):
+            msg = f"{entity_id} has no measurement or total_increasing state class"
+            raise ServiceValidationError(msg)
+        query_id, series_key = _query_of_entity(entry, entity.unique_id)
+        start_ts = _floor_hour(dt_util.as_timestamp(start))
+        end_ts = _floor_hour(dt_util.as_timestamp(end))
+        if start_ts >= end_ts:
+            msg = "The backfill must cover at least one complete hour"
+            raise ServiceValidationError(msg)
+
+        job = BackfillJob(
+            entry_id=entry.entry_id,
+            query_id=query_id,
+            series_key=series_key,
+            start=start_ts,
+            end=end_ts,
+            unit_of_measurement=entity.unit_of_measurement,
+            total=state_class == SensorStateClass.TOTAL_INCREASING,
+        )
+        if job.total:
+            recorder = get_instance(self._hass)
+            if before := await recorder.async_add_executor_job(
+                _last_statistics, self._hass, entity_id, start_ts
+            ):
+                job.sum = before["sum"] or 0.0
+                job.last = before["state"]
+            if replaced := await recorder.async_add_executor_job(
+                _last_statistics, self._hass, entity_id, end_ts
+            ):
+                job.replaced_sum = replaced["sum"] or 0.0
+
+        self._jobs[entity_id] = job
+        self._async_schedule_save()
+        self._async_start(entry, entity_id)
+
+    @callback
+    def _async_start(self, entry: PrometheusSensorsConfigEntry, entity_id: str) -> None:
+        """Run the job of a sensor in the background, replacing a running one."""
+        if (task := self._tasks.get(entity_id)) is not None:
+            task.cancel()
+        self._tasks[entity_id] = task = entry.async_create_background_task(
+            self._hass,
+            self._async_run(entry, entity_id),
+            f"{DOMAIN} backfill of {entity_id}",
+        )
+        task.add_done_callback(partial(self._async_failed, entity_id))
+
+    @callback
+    def _async_failed(self, entity_id: str, task: asyncio.Task[None]) -> None:
+        """
+        Mark the job of a task stopped by an unexpected error as failed.
+
+        Errors of the server are retried by the task itself, while errors such
+        as those of the recorder would fail again, so the job is stored as
+        failed and no longer resumed until the action is called again.
+        """
+        if (
+            task.cancelled()
+            or (exception := task.exception()) is None
+            or self._tasks.get(entity_id) is not task
+        ):
+            return
+        del self._tasks[entity_id]
+        LOGGER.error(
+            "Backfill of %s failed, call the action again to retry",
+            entity_id,
+            exc_info=exception,
+        )
+        if (job := self._jobs.get(entity_id)) is not None:
+            job.error = str(exception) or type(exception).__name__
+            self._async_schedule_save()
+
+    async def _async_run(
+        self, entry: PrometheusSensorsConfigEntry, entity_id: str
+    ) -> None:
+        """Import the statistics of a sensor chunk by chunk."""
+        job = self._jobs[entity_id]
+        LOGGER.info(
+            "Backfilling the statistics of %s from %s",
+            entity_id,
+            dt_util.utc_from_timestamp(job.start),
+        )
+        while job.start < job.end:
+            if not _has_query(entry, job):
+                LOGGER.warning(
+                    "Dropping the backfill of %s, its query was removed", entity_id
+                )
+                await self._async_finish(entity_id)
+                return
+            try:
+                async with self._lock:
+                    await self._async_import_chunk(entry, entity_id, job)
+            except PrometheusApiClientError as exception:
+                LOGGER.warning(
+                    "Backfill of %s failed, retrying in %s seconds: %s",
+                    entity_id,
+                    BACKFILL_RETRY_DELAY,
+                    exception,
+                )
+                await asyncio.sleep(BACKFILL_RETRY_DELAY)
+                continue
+            self._async_schedule_save()
+            await asyncio.sleep(BACKFILL_CHUNK_DELAY)
+        if job.total and job.sum != job.replaced_sum:
+            get_instance(self._hass).async_adjust_statistics(
+                entity_id,
+                dt_util.utc_from_timestamp(job.end),
+                job.sum - job.replaced_sum,
+                job.unit_of_measurement,
+            )
+        await self._async_finish(entity_id)
+        LOGGER.info("Backfilled the statistics of %s", entity_id)
+
+    async def _async_finish(self, entity_id: str) -> None:
+        """Forget the job of a sensor."""
+        del self._jobs[entity_id]
+        await self._store.async_save(self._data_to_save())
+
+    async def _async_import_chunk(
+        self, entry: PrometheusSensorsConfigEntry, entity_id: str, job: BackfillJob
+    ) -> None:
+        """Import the hours of the next chunk of a job."""
+        coordinator = entry.runtime_data.coordinator
+        step = BACKFILL_STEP.total_seconds()
+        end = min(job.start + BACKFILL_CHUNK.total_seconds(), job.end)
+        series = await coordinator.client.async_query_range(
+            coordinator.queries[job.query_id],
+            job.start,
+            end - step,
+            step,
+            labels=coordinator.series_labels[job.query_id]
+            if job.series_key is not None
+            else None,
+        )
+        if statistics := _hourly_statistics(job, series.get(job.series_key or "", [])):
+            async_import_statistics(self._hass, _metadata(entity_id, job), statistics)
+        job.start = end
+
+    @callback
+    def _async_schedule_save(self) -> None:
+        """Store the progress of the jobs after a delay."""
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    def _data_to_save(self) -> dict[str, dict[str, Any]]:
+        """Return the jobs to store."""
+        return {entity_id: asdict(job) for entity_id, job in self._jobs.items()}
+
+
+def _query_of_entity(
+    entry: PrometheusSensorsConfigEntry, unique_id: str
+) -> tuple[str, str | None]:
+    """Return the query of a sensor, and the key of its series if any."""
+    coordinator = entry.runtime_data.coordinator
+    for query_id in coordinator.queries:
+        if unique_id == query_id:
+            return query_id, None
+        if query_id in coordinator.series_labels and unique_id.startswith(
+            f"{query_id}_"
+        ):
+            return query_id, unique_id.removeprefix(f"{query_id}_")
+    msg = f"No query of {entry.title} matches the sensor {unique_id}"
+    raise ServiceValidationError(msg)
+
+
+def _has_query(entry: PrometheusSensorsConfigEntry, job: BackfillJob) -> bool:
+    """Return if the query of a job still exists, with the same series."""
+    coordinator = entry.runtime_data.coordinator
+    return job.query_id in coordinator.queries and (
+        job.series_key is None or job.query_id in coordinator.series_labels
+    )
+
+
+def _last_statistics(
+    hass: HomeAssistant, entity_id: str, before: float
+) -> StatisticsRow | None:
+    """Return the state and sum of the last statistics of a sensor before a time."""
+    statistics = statistics_during_period(
+        hass,
+        dt_util.utc_from_timestamp(0),
+        dt_util.utc_from_timestamp(before),
+        {entity_id},
+        "hour",
+        None,
+        {"state", "sum"},
+    )
+    return statistics[entity_id][-1] if statistics.get(entity_id) else None
+
+
+def _hourly_statistics(
+    job: BackfillJob, samples: Sequence[Sequence[Any]]
+) -> list[StatisticData]:
+    """Aggregate the samples of a chunk into hourly statistics."""
+    hours: dict[float, list[float]] = {}
+    for timestamp, value in samples:
+        if not math.isnan(value := float(value)):
+            hours.setdefault(_floor_hour(timestamp), []).append(value)
+    statistics: list[StatisticData] = []
+    for hour, values in hours.items():
+        start = dt_util.utc_from_timestamp(hour)
+        if not job.total:
+            statistics.append(
+                StatisticData(
+                    start=start,
+                    mean=math.fsum(values) / len(values),
+                    min=min(values),
+                    max=max(values),
+                )
+            )
+            continue
+        for value in values:
+            if job.last is not None:
+                # A decrease is a reset of the counter, which restarts from 0.
+                job.sum += value - job.last if value >= job.last else value
+            job.last = value
+        statistics.append(StatisticData(start=start, state=values[-1], sum=job.sum))
+    return statistics
+
+
+def _metadata(entity_id: str, job: BackfillJob) -> StatisticMetaData:
+    """Return the metadata of the statistics of a sensor."""
+    converter = STATISTIC_UNIT_TO_UNIT_CONVERTER.get(job.unit_of_measurement)
+    return StatisticMetaData(
+        mean_type=StatisticMeanType.NONE if job.total else StatisticMeanType.ARITHMETIC,
+        has_sum=job.total,
+        name=None,
+        source=RECORDER_DOMAIN,
+        statistic_id=entity_id,
+        unit_class=converter.UNIT_CLASS if converter is not None else None,
+        unit_of_measurement=job.unit_of_measurement,
+    )
+
+
+def _floor_hour(timestamp: float) -> float:
+    """Return the start of the hour of a Unix timestamp."""
+    return timestamp - timestamp % HOUR
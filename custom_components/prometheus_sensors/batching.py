@@ -0,0 +1,92 @@
+"""Batching of instant queries into combined PromQL expressions."""
+
+from __future__ import annotations
+
+import json
+import re
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping
+
+BATCH_LABEL = "__ha_id"
+
+# Expressions that evaluate to a scalar or string cannot be passed to
+# label_replace, and comments would swallow the wrapping parentheses.
+_UNBATCHABLE_QUERY = re.compile(
+    r"""^\s*(
+        [-+]?(\d|\.\d|0x|inf|nan)   # number literal
+        |scalar\s*\(
+        |time\s*\(
+        |pi\s*\(
+        |["'`]                      # string literal
+    )""",
+    re.IGNORECASE | re.VERBOSE,
+)
+
+
+def can_batch(query: str) -> bool:
+    """Return whether a query can safely be part of a combined expression."""
+    return (
+        "#" not in query
+        and BATCH_LABEL not in query
+        and _UNBATCHABLE_QUERY.match(query) is None
+    )
+
+
+def wrap_query(query_id: str, query: str) -> str:
+    """Tag the series returned by a query with its id."""
+    return f'label_replace(({query}), "{BATCH_LABEL}", {json.dumps(query_id)}, "", "")'
+
+
+def combine_queries(queries: Mapping[str, str]) -> str:
+    """Combine several queries into a single expression."""
+    return " or ".join(
+        wrap_query(query_id, query) for query_id, query in queries.items()
+    )
+
+
+def plan_batches(
+    queries: Mapping[str, str], max_length: int
+) -> tuple[list[dict[str, str]], list[str]]:
+    """
+    Split queries into batches whose combined expression fits max_length.
+
+    Returns the batches and the ids of the queries that must run alone.
+    """
+    batches: list[dict[str, str]] = []
+    standalone: list[str] = []
+    batch: dict[str, str] = {}
+    length = 0
+    for query_id, query in queries.items():
+        query_length = len(wrap_query(query_id, query)) + len(" or ")
+        if not can_batch(query) or query_length > max_length:
+            standalone.append(query_id)
+            continue
+        if batch and length + query_length > max_length:
+            batches.append(batch)
+            batch, length = {}, 0
+        batch[query_id] = query
+        length += query_length
+    if batch:
+        batches.append(batch)
+
+    # A batch of one would only add overhead to the query.
+    for single in [batch for batch in batches if len(batch) == 1]:
+        batches.remove(single)
+        standalone.extend(single)
+    return batches, standalone
+
+
+def split_result(
+    result: Iterable[dict[str, Any]], query_ids: Iterable[str]
+) -> dict[str, list[dict[str, Any]]]:
+    """Assign the series of a combined result back to their query ids."""
+    series_by_id: dict[str, list[dict[str, Any]]] = {
+        query_id: [] for query_id in query_ids
+    }
+    for series in result:
+        query_id = series["metric"].get(BATCH_LABEL)
+        if query_id in series_by_id:
+            series_by_id[query_id].append(series)
+    return series_by_id
@@ -2,9 +2,10 @@
 
 from __future__ import annotations
 
+from dataclasses import replace
+from functools import partial
 from typing import TYPE_CHECKING
 
-import voluptuous as vol
 from homeassistant.components.binary_sensor import (
     BinarySensorEntity,
     BinarySensorEntityDescription,
@@ -23,26 +24,32 @@ from homeassistant.core import callback
 from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers.device_registry import DeviceEntryType, DeviceInfo
 from homeassistant.helpers.template import Template
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .const import (
+    CONF_HEARTBEAT,
     CONF_QUERIES,
     CONF_QUERY,
+    CONF_SERIES_LABELS,
     DISCOVERY_COORDINATOR,
     DOMAIN,
     LOGGER,
     query_id_from_name,
 )
-from .coordinator import PrometheusDataUpdateCoordinator
+from .entity import PrometheusEntity, SeriesEntities
+from .value_template import BinaryValueTemplate
 
 if TYPE_CHECKING:
-    from homeassistant.core import HomeAssistant
+    from collections.abc import Callable
+    from datetime import timedelta
+
+    from homeassistant.core import CALLBACK_TYPE, HomeAssistant
     from homeassistant.helpers.entity_platform import (
         AddConfigEntryEntitiesCallback,
         AddEntitiesCallback,
     )
     from homeassistant.helpers.typing import ConfigType, DiscoveryInfoType
 
+    from .coordinator import PrometheusDataUpdateCoordinator
     from .data import PrometheusSensorsConfigEntry
 
 
@@ -68,19 +75,10 @@ async def async_setup_platform(
         identifiers={(DOMAIN, config[CONF_HOST])},
         entry_type=DeviceEntryType.SERVICE,
     )
-    async_add_entities(
-        [
-            PrometheusBinarySensor(
-                coordinator=coordinator,
-                entity_description=_entity_description_from_query(query),
-                attribution=query[CONF_QUERY],
-                device_info=device_info,
-                value_template=query.get(CONF_VALUE_TEMPLATE),
-            )
-            for query in queries
-        ],
-        update_before_add=True,
-    )
+    for query in queries:
+        _async_add_query_binary_sensors(
+            coordinator, query, device_info, async_add_entities
+        )
 
 
 async def async_setup_entry(
@@ -94,11 +92,10 @@ async def async_setup_entry(
             continue
 
         query = _binary_query_config(dict(subentry.data), hass)
-        binary_sensor = PrometheusBinarySensor(
-            coordinator=entry.runtime_data.coordinator,
-            entity_description=_entity_description_from_query(query),
-            attribution=query[CONF_QUERY],
-            device_info=DeviceInfo(
+        unsubscribe = _async_add_query_binary_sensors(
+            entry.runtime_data.coordinator,
+            query,
+            DeviceInfo(
                 name=entry.data[CONF_NAME],
                 identifiers={
                     (
@@ -108,16 +105,55 @@ async def async_setup_entry(
                 },
                 entry_type=DeviceEntryType.SERVICE,
             ),
-            value_template=query.get(CONF_VALUE_TEMPLATE),
+            partial(async_add_entities, config_subentry_id=subentry_id),
         )
-        async_add_entities(
-            [binary_sensor], update_before_add=True, config_subentry_id=subentry_id
+        if unsubscribe is not None:
+            entry.async_on_unload(unsubscribe)
+
+
+@callback
+def _async_add_query_binary_sensors(
+    coordinator: PrometheusDataUpdateCoordinator,
+    query: dict,
+    device_info: DeviceInfo,
+    async_add_entities: Callable[..., None],
+) -> CALLBACK_TYPE | None:
+    """
+    Add the binary sensor of a query, or one binary sensor per series of the query.
+
+    Returns the callback that stops following the series of the query.
+    """
+    entity_description = _entity_description_from_query(query)
+    # The series of a query share the compiled template and its cached results.
+    value_template = (
+        BinaryValueTemplate(query[CONF_VALUE_TEMPLATE])
+        if query.get(CONF_VALUE_TEMPLATE) is not None
+        else None
+    )
+
+    def _create_binary_sensor(series_key: str | None = None) -> PrometheusBinarySensor:
+        return PrometheusBinarySensor(
+            coordinator=coordinator,
+            entity_description=entity_description,
+            attribution=query[CONF_QUERY],
+            device_info=device_info,
+            value_template=value_template,
+            series_key=series_key,
+            heartbeat=query.get(CONF_HEARTBEAT),
         )
 
+    if not query.get(CONF_SERIES_LABELS):
+        async_add_entities([_create_binary_sensor()], update_before_add=True)
+        return None
+    return SeriesEntities(
+        coordinator,
+        entity_description.key,
+        _create_binary_sensor,
+        async_add_entities,
+    ).async_start()
+
 
-class PrometheusBinarySensor(
-    CoordinatorEntity[PrometheusDataUpdateCoordinator], BinarySensorEntity
-):
+class PrometheusBinarySensor(PrometheusEntity, BinarySensorEntity):
     """Binary sensor class."""
 
     def __init__(
@@ -126,27 +162,35 @@ class PrometheusBinarySensor(
         entity_description: BinarySensorEntityDescription,
         attribution: str,
         device_info: DeviceInfo,
-        value_template: Template | None,
+        value_template: BinaryValueTemplate | None,
+        *,
+        series_key: str | None = None,
+        heartbeat: timedelta | None = None,
     ) -> None:
         """Initialize the binary sensor class."""
-        super().__init__(coordinator)
+        super().__init__(coordinator, series_key=series_key, heartbeat=heartbeat)
+        self._attr_unique_id = entity_description.key
+        if series_key is not None:
+            self._attr_unique_id = f"{entity_description.key}_{series_key}"
+            entity_description = replace(
+                entity_description, name=f"{entity_description.name} {series_key}"
+            )
         self.entity_description = entity_description
         self._value_template = value_template
         self._attr_attribution = attribution
-        self._attr_unique_id = entity_description.key
         self._attr_device_info = device_info
 
     @callback
     def _handle_coordinator_update(self) -> None:
-        value = self.coordinator.data[self.entity_description.key]
+        value = self._query_value()
         self._attr_available = value is not None
         if value is None:
             self._attr_is_on = None
         elif self._value_template is None:
             self._attr_is_on = bool(value)
         else:
-            self._attr_is_on = _render_binary_value(self._value_template, value)
-        self.async_write_ha_state()
+            self._attr_is_on = self._value_template.evaluate(value)
+        self._async_write_ha_state_if_changed(self._attr_is_on)
 
 
 def _binary_query_config(query: dict, hass: HomeAssistant) -> dict:
@@ -158,6 +202,10 @@ def _binary_query_config(query: dict, hass: HomeAssistant) -> dict:
         CONF_ICON: query.get(CONF_ICON),
         CONF_DEVICE_CLASS: query.get(CONF_DEVICE_CLASS),
         CONF_VALUE_TEMPLATE: query.get(CONF_VALUE_TEMPLATE),
+        CONF_HEARTBEAT: cv.time_period(query[CONF_HEARTBEAT])
+        if query.get(CONF_HEARTBEAT)
+        else None,
+        CONF_SERIES_LABELS: query.get(CONF_SERIES_LABELS),
     }
     value_template = query_config[CONF_VALUE_TEMPLATE]
     if value_template is not None:
@@ -177,14 +225,3 @@ def _entity_description_from_query(query: dict) -> BinarySensorEntityDescription
         icon=query.get(CONF_ICON),
         device_class=query.get(CONF_DEVICE_CLASS),
     )
-
-
-def _render_binary_value(value_template: Template, value: object) -> bool | None:
-    """Render a binary sensor template into a boolean value."""
-    rendered = value_template.async_render(variables={"value": value})
-    if rendered is None:
-        return None
-    try:
-        return cv.boolean(rendered)
-    except vol.Invalid:
-        return bool(rendered)
@@ -0,0 +1,82 @@
+"""Circuit breaker guarding the queries sent to a Prometheus server."""
+
+from __future__ import annotations
+
+from enum import StrEnum
+
+from .const import (
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_MAX_PROBE_DELAY,
+    CIRCUIT_PROBE_DELAY,
+)
+
+
+class CircuitState(StrEnum):
+    """State of a circuit breaker."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Stop sending requests to a server that keeps failing.
+
+    The circuit opens after failure_threshold consecutive failures. While it
+    is open, requests fail at once until a probe is due. A single probe is
+    then allowed, which closes the circuit when it succeeds and otherwise
+    doubles the delay until the next probe, up to max_probe_delay.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        probe_delay: float = CIRCUIT_PROBE_DELAY,
+        max_probe_delay: float = CIRCUIT_MAX_PROBE_DELAY,
+    ) -> None:
+        """Initialize a closed circuit."""
+        self.failure_threshold = failure_threshold
+        self.min_probe_delay = probe_delay
+        self.max_probe_delay = max_probe_delay
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self.probe_delay = probe_delay
+        # Monotonic time after which the open circuit may be probed.
+        self.probe_at: float | None = None
+
+    def probe_due(self, now: float) -> bool:
+        """Return if an open circuit may be probed at monotonic time now."""
+        return (
+            self.state is CircuitState.OPEN
+            and self.probe_at is not None
+            and now >= self.probe_at
+        )
+
+    def start_probe(self) -> None:
+        """Let a single probe through the open circuit."""
+        self.state = CircuitState.HALF_OPEN
+
+    def record_success(self) -> None:
+        """Close the circuit after a request or probe succeeded."""
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self.probe_delay = self.min_probe_delay
+        self.probe_at = None
+
+    def record_failure(self, now: float) -> None:
+        """Count a failed request, opening the circuit after too many."""
+        self.failures += 1
+        if (
+            self.state is CircuitState.CLOSED
+            and self.failures >= self.failure_threshold
+        ):
+            self.state = CircuitState.OPEN
+            self.probe_at = now + self.probe_delay
+
+    def record_probe_failure(self, now: float) -> None:
+        """Open the circuit again, probing twice as late as before."""
+        self.failures += 1
+        self.probe_delay = min(self.probe_delay * 2, self.max_probe_delay)
+        self.state = CircuitState.OPEN
+        self.probe_at = now + self.probe_delay
@@ -10,6 +10,7 @@ from homeassistant import config_entries
 from homeassistant.components.binary_sensor import BinarySensorDeviceClass
 from homeassistant.components.sensor import SensorDeviceClass, SensorStateClass
 from homeassistant.config_entries import (
+    ConfigEntryState,
     ConfigSubentryFlow,
 )
 from homeassistant.const import (
@@ -26,6 +27,7 @@ from homeassistant.const import (
     Platform,
 )
 from homeassistant.core import callback
+from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers import selector
 from homeassistant.helpers.aiohttp_client import async_create_clientsession
 
@@ -37,12 +39,32 @@ from .api import (
     PrometheusApiClientCommunicationError,
     PrometheusApiClientError,
 )
+from .api_client.prometheus_client import RequestOptions
+from .api_client.transport import TRANSPORT_AIOHTTP, TRANSPORT_HTTP2
 from .const import (
+    CONF_BATCH_QUERIES,
+    CONF_DOWNSAMPLE,
+    CONF_HEADERS,
+    CONF_HEARTBEAT,
+    CONF_MAX_CONCURRENCY,
+    CONF_POOL_SIZE,
+    CONF_POST_THRESHOLD,
     CONF_QUERY,
+    CONF_QUERY_TIMEOUT,
+    CONF_RELATIVE_TOLERANCE,
+    CONF_SERIES_LABELS,
+    CONF_SERIES_LIMIT,
     CONF_STATE_CLASS,
+    CONF_STATISTIC,
+    CONF_STEP,
+    CONF_TOLERANCE,
+    CONF_TRANSPORT,
+    CONF_WINDOW,
     DOMAIN,
+    DOWNSAMPLE_FUNCTIONS,
     LOGGER,
-    SCAN_INTERVAL,
+    MAX_CONCURRENCY,
+    POST_THRESHOLD,
     SCHEMA_HINT_HOST,
     SCHEMA_HINT_ICON,
     SCHEMA_HINT_NAME,
@@ -50,6 +72,8 @@ from .const import (
     SCHEMA_HINT_QUERY_NAME,
     query_id_from_name,
 )
+from .registry import get_query_cache
+from .window_statistics import DEFAULT_STATISTIC, STATISTICS
 
 if TYPE_CHECKING:
     from collections.abc import Awaitable, Callable
@@ -61,6 +85,25 @@ if TYPE_CHECKING:
         SubentryFlowResult,
     )
 
+    from .metric_index import MetricIndex
+
+
+SELECTOR_DURATION = selector.DurationSelector(
+    selector.DurationSelectorConfig(
+        enable_day=False, enable_millisecond=False, allow_negative=False
+    )
+)
+
+SELECTOR_SERIES_LABELS = selector.TextSelector(
+    selector.TextSelectorConfig(type=selector.TextSelectorType.TEXT, multiple=True)
+)
+
+# Header values entered as YAML numbers, such as tenant ids, are sent as text.
+SCHEMA_HEADERS = vol.Schema({cv.string: cv.string})
+
+SELECTOR_SERIES_LIMIT = selector.NumberSelector(
+    selector.NumberSelectorConfig(min=1, step=1, mode=selector.NumberSelectorMode.BOX)
+)
 
 SCHEMA_CONNECTION = vol.Schema(
     {
@@ -69,12 +112,37 @@ SCHEMA_CONNECTION = vol.Schema(
             selector.TextSelectorConfig(type=selector.TextSelectorType.URL)
         ),
         vol.Required(CONF_VERIFY_SSL, default=True): selector.BooleanSelector(),
+        vol.Optional(CONF_HEADERS): selector.ObjectSelector(),
+        vol.Optional(CONF_SCAN_INTERVAL): SELECTOR_DURATION,
+        vol.Optional(CONF_QUERY_TIMEOUT): SELECTOR_DURATION,
+        vol.Optional(CONF_SERIES_LIMIT): SELECTOR_SERIES_LIMIT,
+        vol.Optional(
+            CONF_MAX_CONCURRENCY, default=MAX_CONCURRENCY
+        ): selector.NumberSelector(
+            selector.NumberSelectorConfig(
+                min=1, max=100, step=1, mode=selector.NumberSelectorMode.BOX
+            )
+        ),
+        vol.Optional(CONF_POOL_SIZE): selector.NumberSelector(
+            selector.NumberSelectorConfig(
+                min=1, max=100, step=1, mode=selector.NumberSelectorMode.BOX
+            )
+        ),
+        vol.Optional(
+            CONF_POST_THRESHOLD, default=POST_THRESHOLD
+        ): selector.NumberSelector(
+            selector.NumberSelectorConfig(
+                min=1, step=1, mode=selector.NumberSelectorMode.BOX
+            )
+        ),
+        vol.Optional(CONF_BATCH_QUERIES, default=False): selector.BooleanSelector(),
         vol.Optional(
-            CONF_SCAN_INTERVAL,
-            default={"seconds": int(SCAN_INTERVAL.total_seconds())},
-        ): selector.DurationSelector(
-            selector.DurationSelectorConfig(
-                enable_day=False, enable_millisecond=False, allow_negative=False
+            CONF_TRANSPORT, default=TRANSPORT_AIOHTTP
+        ): selector.SelectSelector(
+            selector.SelectSelectorConfig(
+                options=[TRANSPORT_AIOHTTP, TRANSPORT_HTTP2],
+                translation_key=CONF_TRANSPORT,
+                mode=selector.SelectSelectorMode.DROPDOWN,
             )
         ),
     },
@@ -135,6 +203,39 @@ SCHEMA_SENSOR_QUERY = vol.Schema(
         vol.Optional(CONF_UNIT_OF_MEASUREMENT, default=""): selector.TextSelector(
             selector.TextSelectorConfig(type=selector.TextSelectorType.TEXT)
         ),
+        vol.Optional(CONF_TOLERANCE): selector.NumberSelector(
+            selector.NumberSelectorConfig(
+                min=0, step="any", mode=selector.NumberSelectorMode.BOX
+            )
+        ),
+        vol.Optional(CONF_RELATIVE_TOLERANCE): selector.NumberSelector(
+            selector.NumberSelectorConfig(
+                min=0, max=1, step="any", mode=selector.NumberSelectorMode.BOX
+            )
+        ),
+        vol.Optional(CONF_HEARTBEAT): SELECTOR_DURATION,
+        vol.Optional(CONF_SCAN_INTERVAL): SELECTOR_DURATION,
+        vol.Optional(CONF_SERIES_LABELS): SELECTOR_SERIES_LABELS,
+        vol.Optional(CONF_QUERY_TIMEOUT): SELECTOR_DURATION,
+        vol.Optional(CONF_SERIES_LIMIT): SELECTOR_SERIES_LIMIT,
+        vol.Optional(CONF_WINDOW): SELECTOR_DURATION,
+        vol.Optional(CONF_STEP): SELECTOR_DURATION,
+        vol.Optional(
+            CONF_STATISTIC, default=DEFAULT_STATISTIC
+        ): selector.SelectSelector(
+            selector.SelectSelectorConfig(
+                options=list(STATISTICS),
+                translation_key=CONF_STATISTIC,
+                mode=selector.SelectSelectorMode.DROPDOWN,
+            )
+        ),
+        vol.Optional(CONF_DOWNSAMPLE): selector.SelectSelector(
+            selector.SelectSelectorConfig(
+                options=list(DOWNSAMPLE_FUNCTIONS),
+                translation_key=CONF_DOWNSAMPLE,
+                mode=selector.SelectSelectorMode.DROPDOWN,
+            )
+        ),
     }
 )
 
@@ -164,6 +265,11 @@ SCHEMA_BINARY_QUERY = vol.Schema(
             )
         ),
         vol.Optional(CONF_VALUE_TEMPLATE): selector.TemplateSelector(),
+        vol.Optional(CONF_HEARTBEAT): SELECTOR_DURATION,
+        vol.Optional(CONF_SCAN_INTERVAL): SELECTOR_DURATION,
+        vol.Optional(CONF_SERIES_LABELS): SELECTOR_SERIES_LABELS,
+        vol.Optional(CONF_QUERY_TIMEOUT): SELECTOR_DURATION,
+        vol.Optional(CONF_SERIES_LIMIT): SELECTOR_SERIES_LIMIT,
     }
 )
 
@@ -196,23 +302,8 @@ class PrometheusConfigFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
         """Handle a flow initialized by the user."""
         _errors = {}
         if user_input is not None:
-            try:
-                await self._test_credentials(
-                    host=user_input[CONF_HOST],
-                    session=async_create_clientsession(
-                        self.hass, verify_ssl=user_input[CONF_VERIFY_SSL]
-                    ),
-                )
-            except PrometheusApiClientAuthenticationError as exception:
-                LOGGER.warning(exception)
-                _errors["base"] = "auth"
-            except PrometheusApiClientCommunicationError as exception:
-                LOGGER.error(exception)
-                _errors["base"] = "connection"
-            except PrometheusApiClientError as exception:
-                LOGGER.exception(exception)
-                _errors["base"] = "unknown"
-            else:
+            _errors = await self._async_validate_connection(user_input)
+            if not _errors:
                 await self._async_handle_discovery_without_unique_id()
                 return self.async_create_entry(
                     title=user_input[CONF_NAME],
@@ -230,27 +321,73 @@ class PrometheusConfigFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
     ) -> ConfigFlowResult:
         """Handle reconfiguration of an existing entry."""
         reconfigure_entry = self._get_reconfigure_entry()
+        _errors = {}
         if user_input is not None:
-            return self.async_update_reload_and_abort(
-                self._get_reconfigure_entry(),
-                data_updates=user_input,
-            )
+            _errors = await self._async_validate_connection(user_input)
+            if not _errors:
+                # Optional fields left empty are missing from the input, so the
+                # fields of the form are replaced rather than merged.
+                data = {
+                    key: value
+                    for key, value in reconfigure_entry.data.items()
+                    if key not in SCHEMA_CONNECTION.schema
+                }
+                return self.async_update_reload_and_abort(
+                    reconfigure_entry,
+                    data={**data, **user_input},
+                )
 
         return self.async_show_form(
             step_id="reconfigure",
             data_schema=self.add_suggested_values_to_schema(
                 SCHEMA_CONNECTION,
-                reconfigure_entry.data,
+                user_input or reconfigure_entry.data,
             ),
+            errors=_errors,
         )
 
-    async def _test_credentials(self, host: str, session: ClientSession) -> None:
+    async def _async_validate_connection(
+        self, user_input: dict[str, Any]
+    ) -> dict[str, str]:
+        """Normalize the headers and test the connection, returning the errors."""
+        try:
+            user_input[CONF_HEADERS] = SCHEMA_HEADERS(
+                user_input.get(CONF_HEADERS) or {}
+            )
+        except vol.Invalid:
+            return {CONF_HEADERS: "invalid_headers"}
+        try:
+            await self._test_credentials(
+                host=user_input[CONF_HOST],
+                session=async_create_clientsession(
+                    self.hass, verify_ssl=user_input[CONF_VERIFY_SSL]
+                ),
+                headers=user_input[CONF_HEADERS],
+            )
+        except PrometheusApiClientAuthenticationError as exception:
+            LOGGER.warning(exception)
+            return {"base": "auth"}
+        except PrometheusApiClientCommunicationError as exception:
+            LOGGER.error(exception)
+            return {"base": "connection"}
+        except PrometheusApiClientError as exception:
+            LOGGER.exception(exception)
+            return {"base": "unknown"}
+        return {}
+
+    async def _test_credentials(
+        self,
+        host: str,
+        session: ClientSession,
+        headers: dict[str, str] | None = None,
+    ) -> None:
         """Validate credentials."""
         client = PrometheusApiClient(
             host=host,
             session=session,
+            options=RequestOptions(headers=headers, post_threshold=POST_THRESHOLD),
         )
-        await client.async_get_metrics()
+        await client.async_check_connection()
 
     async def _get_query_labels(
         self, host: str, session: ClientSession, query: str
@@ -290,8 +427,8 @@ class SubentryFlowHandler(ConfigSubentryFlow):
     ) -> SubentryFlowResult:
         """Add a new sensor."""
         server_config = self._get_entry()
-        _errors = {}
-        if user_input is not None:
+        _errors = _aggregation_errors(user_input)
+        if user_input is not None and not _errors:
             valid = await _client_call_wrapper(
                 lambda: self._async_test_query(
                     host=server_config.data[CONF_HOST],
@@ -299,6 +436,8 @@ class SubentryFlowHandler(ConfigSubentryFlow):
                     session=async_create_clientsession(
                         self.hass, verify_ssl=server_config.data[CONF_VERIFY_SSL]
                     ),
+                    series_labels=user_input.get(CONF_SERIES_LABELS),
+                    headers=server_config.data.get(CONF_HEADERS),
                 )
             )
 
@@ -310,6 +449,17 @@ class SubentryFlowHandler(ConfigSubentryFlow):
                     device_class=user_input.get(CONF_DEVICE_CLASS),
                     unit_of_measurement=user_input.get(CONF_UNIT_OF_MEASUREMENT),
                     state_class=user_input[CONF_STATE_CLASS],
+                    tolerance=user_input.get(CONF_TOLERANCE),
+                    relative_tolerance=user_input.get(CONF_RELATIVE_TOLERANCE),
+                    heartbeat=user_input.get(CONF_HEARTBEAT),
+                    scan_interval=user_input.get(CONF_SCAN_INTERVAL),
+                    series_labels=user_input.get(CONF_SERIES_LABELS),
+                    query_timeout=user_input.get(CONF_QUERY_TIMEOUT),
+                    series_limit=user_input.get(CONF_SERIES_LIMIT),
+                    window=user_input.get(CONF_WINDOW),
+                    step=user_input.get(CONF_STEP),
+                    statistic=user_input.get(CONF_STATISTIC),
+                    downsample=user_input.get(CONF_DOWNSAMPLE),
                 )
                 query_data = asdict(query)
                 query_data[CONF_PLATFORM] = Platform.SENSOR
@@ -317,12 +467,15 @@ class SubentryFlowHandler(ConfigSubentryFlow):
                     data=query_data, title=user_input[CONF_NAME]
                 )
             if valid:
-                _errors["base"] = "invalid_query"
+                _errors["base"] = _invalid_query_error(user_input)
             else:
                 _errors["base"] = valid.error_code
 
         return self.async_show_form(
-            step_id="add_sensor_query", data_schema=SCHEMA_SENSOR_QUERY, errors=_errors
+            step_id="add_sensor_query",
+            data_schema=SCHEMA_SENSOR_QUERY,
+            errors=_errors,
+            description_placeholders=await self._async_suggestions(user_input),
         )
 
     async def async_step_add_binary_query(
@@ -339,6 +492,8 @@ class SubentryFlowHandler(ConfigSubentryFlow):
                     session=async_create_clientsession(
                         self.hass, verify_ssl=server_config.data[CONF_VERIFY_SSL]
                     ),
+                    series_labels=user_input.get(CONF_SERIES_LABELS),
+                    headers=server_config.data.get(CONF_HEADERS),
                 )
             )
 
@@ -351,12 +506,19 @@ class SubentryFlowHandler(ConfigSubentryFlow):
                     CONF_ICON: user_input.get(CONF_ICON),
                     CONF_DEVICE_CLASS: user_input.get(CONF_DEVICE_CLASS),
                     CONF_VALUE_TEMPLATE: user_input.get(CONF_VALUE_TEMPLATE),
+                    CONF_HEARTBEAT: user_input.get(CONF_HEARTBEAT),
+                    CONF_SCAN_INTERVAL: user_input.get(CONF_SCAN_INTERVAL),
+                    CONF_SERIES_LABELS: user_input.get(CONF_SERIES_LABELS) or None,
+                    CONF_QUERY_TIMEOUT: user_input.get(CONF_QUERY_TIMEOUT),
+                    CONF_SERIES_LIMIT: int(user_input[CONF_SERIES_LIMIT])
+                    if user_input.get(CONF_SERIES_LIMIT)
+                    else None,
                 }
                 return self.async_create_entry(
                     data=query_data, title=user_input[CONF_NAME]
                 )
             if valid:
-                _errors["base"] = "invalid_query"
+                _errors["base"] = _invalid_query_error(user_input)
             else:
                 _errors["base"] = valid.error_code
 
@@ -364,6 +526,7 @@ class SubentryFlowHandler(ConfigSubentryFlow):
             step_id="add_binary_query",
             data_schema=SCHEMA_BINARY_QUERY,
             errors=_errors,
+            description_placeholders=await self._async_suggestions(user_input),
         )
 
     async def async_step_reconfigure(
@@ -383,9 +546,9 @@ class SubentryFlowHandler(ConfigSubentryFlow):
         ):
             return await self.async_step_reconfigure_binary_sensor(user_input)
 
-        _errors = {}
+        _errors = _aggregation_errors(user_input)
         server_config = self._get_entry()
-        if user_input is not None:
+        if user_input is not None and not _errors:
             valid = await _client_call_wrapper(
                 lambda: self._async_test_query(
                     host=server_config.data[CONF_HOST],
@@ -393,6 +556,8 @@ class SubentryFlowHandler(ConfigSubentryFlow):
                     session=async_create_clientsession(
                         self.hass, verify_ssl=server_config.data[CONF_VERIFY_SSL]
                     ),
+                    series_labels=user_input.get(CONF_SERIES_LABELS),
+                    headers=server_config.data.get(CONF_HEADERS),
                 )
             )
 
@@ -404,6 +569,17 @@ class SubentryFlowHandler(ConfigSubentryFlow):
                     device_class=user_input.get(CONF_DEVICE_CLASS),
                     unit_of_measurement=user_input.get(CONF_UNIT_OF_MEASUREMENT),
                     state_class=user_input[CONF_STATE_CLASS],
+                    tolerance=user_input.get(CONF_TOLERANCE),
+                    relative_tolerance=user_input.get(CONF_RELATIVE_TOLERANCE),
+                    heartbeat=user_input.get(CONF_HEARTBEAT),
+                    scan_interval=user_input.get(CONF_SCAN_INTERVAL),
+                    series_labels=user_input.get(CONF_SERIES_LABELS),
+                    query_timeout=user_input.get(CONF_QUERY_TIMEOUT),
+                    series_limit=user_input.get(CONF_SERIES_LIMIT),
+                    window=user_input.get(CONF_WINDOW),
+                    step=user_input.get(CONF_STEP),
+                    statistic=user_input.get(CONF_STATISTIC),
+                    downsample=user_input.get(CONF_DOWNSAMPLE),
                 )
                 query_data = asdict(query)
                 query_data[CONF_PLATFORM] = Platform.SENSOR
@@ -414,7 +590,7 @@ class SubentryFlowHandler(ConfigSubentryFlow):
                     title=user_input[CONF_NAME],
                 )
             if valid:
-                _errors["base"] = "invalid_query"
+                _errors["base"] = _invalid_query_error(user_input)
             else:
                 _errors["base"] = valid.error_code
 
@@ -424,6 +600,7 @@ class SubentryFlowHandler(ConfigSubentryFlow):
                 SCHEMA_SENSOR_QUERY, reconfigure_data.data
             ),
             errors=_errors,
+            description_placeholders=await self._async_suggestions(user_input),
         )
 
     async def async_step_reconfigure_binary_sensor(
@@ -441,6 +618,8 @@ class SubentryFlowHandler(ConfigSubentryFlow):
                     session=async_create_clientsession(
                         self.hass, verify_ssl=server_config.data[CONF_VERIFY_SSL]
                     ),
+                    series_labels=user_input.get(CONF_SERIES_LABELS),
+                    headers=server_config.data.get(CONF_HEADERS),
                 )
             )
 
@@ -453,6 +632,13 @@ class SubentryFlowHandler(ConfigSubentryFlow):
                     CONF_ICON: user_input.get(CONF_ICON),
                     CONF_DEVICE_CLASS: user_input.get(CONF_DEVICE_CLASS),
                     CONF_VALUE_TEMPLATE: user_input.get(CONF_VALUE_TEMPLATE),
+                    CONF_HEARTBEAT: user_input.get(CONF_HEARTBEAT),
+                    CONF_SCAN_INTERVAL: user_input.get(CONF_SCAN_INTERVAL),
+                    CONF_SERIES_LABELS: user_input.get(CONF_SERIES_LABELS) or None,
+                    CONF_QUERY_TIMEOUT: user_input.get(CONF_QUERY_TIMEOUT),
+                    CONF_SERIES_LIMIT: int(user_input[CONF_SERIES_LIMIT])
+                    if user_input.get(CONF_SERIES_LIMIT)
+                    else None,
                 }
                 return self.async_update_and_abort(
                     self._get_entry(),
@@ -461,7 +647,7 @@ class SubentryFlowHandler(ConfigSubentryFlow):
                     title=user_input[CONF_NAME],
                 )
             if valid:
-                _errors["base"] = "invalid_query"
+                _errors["base"] = _invalid_query_error(user_input)
             else:
                 _errors["base"] = valid.error_code
 
@@ -471,12 +657,55 @@ class SubentryFlowHandler(ConfigSubentryFlow):
                 SCHEMA_BINARY_QUERY, reconfigure_data.data
             ),
             errors=_errors,
+            description_placeholders=await self._async_suggestions(user_input),
         )
 
+    @callback
+    def _async_metric_index(self) -> MetricIndex | None:
+        """Return the metric index of the server, loading it in the background."""
+        entry = self._get_entry()
+        if entry.state is not ConfigEntryState.LOADED:
+            return None
+        metric_index = entry.runtime_data.metric_index
+        if not metric_index.loaded:
+            entry.async_create_background_task(
+                self.hass, metric_index.async_load(), f"{DOMAIN} metric index load"
+            )
+        return metric_index
+
+    async def _async_suggestions(
+        self, user_input: dict[str, Any] | None
+    ) -> dict[str, str]:
+        """Return completions of the submitted query as a form placeholder."""
+        metric_index = self._async_metric_index()
+        if metric_index is None or user_input is None:
+            return {"suggestions": ""}
+        suggestions = await metric_index.async_suggest(user_input[CONF_QUERY])
+        if not suggestions:
+            return {"suggestions": ""}
+        # Rendered as a Markdown list below the description of the form.
+        items = "\n".join(f"- `{suggestion}`" for suggestion in suggestions)
+        return {"suggestions": f"\n\n{items}"}
+
     async def _async_test_query(
-        self, host: str, session: ClientSession, query: str
+        self,
+        host: str,
+        session: ClientSession,
+        query: str,
+        series_labels: list[str] | None = None,
+        headers: dict[str, str] | None = None,
     ) -> bool:
-        client = PrometheusApiClient(host=host, session=session)
+        client = PrometheusApiClient(
+            host=host,
+            session=session,
+            cache=get_query_cache(self.hass),
+            options=RequestOptions(headers=headers, post_threshold=POST_THRESHOLD),
+        )
+        await client.async_check_query_syntax(query)
+        if series_labels:
+            # One entity per series, the series must carry the key labels.
+            labels = await client.async_get_query_labels(query)
+            return bool(labels) and set(series_labels) <= set(labels)
         return await client.async_test_query_result_size(query)
 
 
@@ -501,6 +730,20 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
         return self.async_abort(reason="none")
 
 
+def _aggregation_errors(user_input: dict[str, Any] | None) -> dict[str, str]:
+    """Return the error of a sensor both aggregated over a window and downsampled."""
+    if user_input and user_input.get(CONF_WINDOW) and user_input.get(CONF_DOWNSAMPLE):
+        return {CONF_DOWNSAMPLE: "window_downsample"}
+    return {}
+
+
+def _invalid_query_error(user_input: dict[str, Any]) -> str:
+    """Return the error of a query whose result cannot be used."""
+    if user_input.get(CONF_SERIES_LABELS):
+        return "missing_series_labels"
+    return "invalid_query"
+
+
 T = TypeVar("T")
 
 
@@ -1,21 +1,81 @@
 """Constants for prometheus_sensors."""
 
+from __future__ import annotations
+
 from datetime import timedelta
 from logging import Logger, getLogger
+from typing import TYPE_CHECKING
+
+from homeassistant.util.hass_dict import HassKey
+
+if TYPE_CHECKING:
+    from .api_client.cache import QueryCache
+    from .backfill import StatisticsBackfill
+    from .registry import ClientRegistry
 
 LOGGER: Logger = getLogger(__package__)
 
 DOMAIN = "prometheus_sensors"
+DATA_CLIENTS: HassKey[ClientRegistry] = HassKey(f"{DOMAIN}_clients")
+DATA_QUERY_CACHE: HassKey[QueryCache] = HassKey(f"{DOMAIN}_query_cache")
+DATA_BACKFILL: HassKey[StatisticsBackfill] = HassKey(f"{DOMAIN}_backfill")
 
 SCAN_INTERVAL = timedelta(seconds=15)
+MAX_CONCURRENCY = 10
+BATCH_MAX_LENGTH = 16000
+POST_THRESHOLD = 2000
+QUERY_CACHE_SIZE = 1024
+# Listing metric names is expensive on large servers, so it is cached longer.
+METRIC_NAMES_MAX_AGE = 300
+METRIC_INDEX_REFRESH_INTERVAL = timedelta(minutes=10)
+# Queries checked by the forms are cut short on the server and their results reused.
+QUERY_VALIDATION_TIMEOUT = 5
+# Seconds the client waits for a query after its server-side timeout.
+QUERY_TIMEOUT_GRACE = 2
+# Queries default to their interval as timeout, up to the default of Prometheus.
+DEFAULT_QUERY_TIMEOUT = timedelta(minutes=2)
+QUERY_VALIDATION_MAX_AGE = 60
+# Shared results are reused while younger than this fraction of the interval.
+CACHE_MAX_AGE = 0.5
+# Consecutive failures after which queries to a server are short-circuited.
+CIRCUIT_FAILURE_THRESHOLD = 5
+# Seconds before the first probe of an open circuit, doubled after each failure.
+CIRCUIT_PROBE_DELAY = 10
+CIRCUIT_MAX_PROBE_DELAY = 600
+# History is fetched a day of one-minute samples at a time, pausing in between.
+BACKFILL_CHUNK = timedelta(days=1)
+BACKFILL_STEP = timedelta(minutes=1)
+BACKFILL_CHUNK_DELAY = 1
+BACKFILL_RETRY_DELAY = 60
 
 CONF_HEADERS = "headers"
+CONF_HEARTBEAT = "heartbeat"
+CONF_MAX_CONCURRENCY = "max_concurrency"
+CONF_POOL_SIZE = "pool_size"
+CONF_POST_THRESHOLD = "post_threshold"
+CONF_BATCH_QUERIES = "batch_queries"
 CONF_BINARY_SENSORS = "binary_sensors"
+CONF_DOWNSAMPLE = "downsample"
 CONF_QUERY = "query"
 CONF_QUERIES = "queries"
+CONF_QUERY_TIMEOUT = "query_timeout"
+CONF_RELATIVE_TOLERANCE = "relative_tolerance"
 CONF_SENSORS = "sensors"
+CONF_SERIES_LABELS = "series_labels"
+CONF_SERIES_LIMIT = "series_limit"
 CONF_STATE_CLASS = "state_class"
+CONF_STATISTIC = "statistic"
+CONF_STEP = "step"
+CONF_TOLERANCE = "tolerance"
+CONF_TRANSPORT = "transport"
+CONF_WINDOW = "window"
 DISCOVERY_COORDINATOR = "coordinator"
+# Functions aggregating downsampled queries, as <function>_over_time.
+DOWNSAMPLE_FUNCTIONS = ("avg", "min", "max")
+
+SERVICE_BACKFILL_STATISTICS = "backfill_statistics"
+ATTR_START = "start"
+ATTR_END = "end"
 
 SCHEMA_HINT_QUERY = (
     'sum(rate(node_cpu_seconds_total{mode!="idle"}[1m]))'
@@ -2,6 +2,9 @@
 
 from __future__ import annotations
 
+import asyncio
+import time
+from dataclasses import dataclass, field
 from datetime import date, datetime
 from decimal import Decimal
 from typing import TYPE_CHECKING
@@ -15,11 +18,24 @@ from homeassistant.helpers.update_coordinator import (
 from .api import (
     PrometheusApiClient,
     PrometheusApiClientAuthenticationError,
+    PrometheusApiClientCommunicationError,
     PrometheusApiClientError,
 )
+from .api_client.duration import format_duration
+from .batching import plan_batches
+from .const import (
+    BATCH_MAX_LENGTH,
+    CACHE_MAX_AGE,
+    DEFAULT_QUERY_TIMEOUT,
+    MAX_CONCURRENCY,
+    QUERY_TIMEOUT_GRACE,
+    SCAN_INTERVAL,
+)
+from .sample_buffer import SlidingWindow
+from .scheduler import QueryScheduler
 
 if TYPE_CHECKING:
-    from collections.abc import Mapping
+    from collections.abc import Mapping, Sequence
     from datetime import timedelta
     from logging import Logger
 
@@ -27,8 +43,42 @@ if TYPE_CHECKING:
     from homeassistant.helpers.typing import StateType
 
     from .data import PrometheusSensorsConfigEntry
+    from .window_statistics import WindowStatistics
+
+type SeriesResult = dict[str, float | WindowStatistics | None]
+type PrometheusResult = dict[
+    str, StateType | date | datetime | Decimal | WindowStatistics | SeriesResult | None
+]
+type _QueryResult = (
+    float | WindowStatistics | SeriesResult | PrometheusApiClientError | None
+)
+
 
-type PrometheusResult = dict[str, StateType | date | datetime | Decimal | None]
+@dataclass(frozen=True, kw_only=True)
+class RefreshOptions:
+    """Options of the refresh of the queries of a server, keyed by query id."""
+
+    update_interval: timedelta | None = None
+    query_intervals: Mapping[str, timedelta | None] = field(default_factory=dict)
+    # Queries returning one value per series, keyed by these labels.
+    series_labels: Mapping[str, Sequence[str]] = field(default_factory=dict)
+    # Server-side limits, by default until the query is due again and one
+    # series for queries returning a single value.
+    query_timeouts: Mapping[str, timedelta] = field(default_factory=dict)
+    series_limits: Mapping[str, int] = field(default_factory=dict)
+    # Queries aggregated over a window of samples, with their step.
+    query_windows: Mapping[str, tuple[timedelta, timedelta | None]] = field(
+        default_factory=dict
+    )
+    # Queries aggregated over their interval by an *_over_time function of
+    # the server, with the resolution of the subquery.
+    query_downsampling: Mapping[str, tuple[str, timedelta | None]] = field(
+        default_factory=dict
+    )
+    # Entries sharing a client refresh on the same ticks.
+    tick_epoch: float | None = None
+    max_concurrency: int = MAX_CONCURRENCY
+    batch_queries: bool = False
 
 
 # https://developers.home-assistant.io/docs/integration_fetching_data#coordinated-single-api-poll-for-data-for-all-entities
@@ -44,10 +94,33 @@ class PrometheusDataUpdateCoordinator(DataUpdateCoordinator[PrometheusResult]):
         queries: Mapping[str, str],
         config_entry: PrometheusSensorsConfigEntry | None = None,
         name: str,
-        update_interval: timedelta | None = None,
+        options: RefreshOptions | None = None,
     ) -> None:
+        options = options or RefreshOptions()
         self.client = client
         self.queries = queries
+        self.series_labels = options.series_labels
+        self.query_timeouts = options.query_timeouts
+        self.series_limits = options.series_limits
+        self.query_windows = options.query_windows
+        self._sliding_windows = {
+            query_id: SlidingWindow(window.total_seconds())
+            for query_id, (window, _) in self.query_windows.items()
+        }
+        self.query_downsampling = options.query_downsampling
+        self.max_concurrency = options.max_concurrency
+        self.batch_queries = options.batch_queries
+        self.last_update_duration: float | None = None
+        self.last_request_count = 0
+        self.query_errors: dict[str, PrometheusApiClientError] = {}
+        self.query_error_counts: dict[str, int] = dict.fromkeys(queries, 0)
+        # Without an explicit interval, follow the scrape interval of the server.
+        self.scheduler = QueryScheduler(
+            {query_id: options.query_intervals.get(query_id) for query_id in queries},
+            options.update_interval or SCAN_INTERVAL,
+            options.tick_epoch,
+        )
+        self._detect_interval = options.update_interval is None
         coordinator_kwargs = {}
         if config_entry is not None:
             coordinator_kwargs["config_entry"] = config_entry
@@ -56,20 +129,238 @@ class PrometheusDataUpdateCoordinator(DataUpdateCoordinator[PrometheusResult]):
             hass,
             logger,
             name=name,
-            update_interval=update_interval,
+            update_interval=self.scheduler.default_interval,
             **coordinator_kwargs,
         )
 
+    async def _async_detect_interval(self) -> None:
+        """Use the scrape interval of the server as default query interval."""
+        self._detect_interval = False
+        try:
+            interval = await self.client.async_get_scrape_interval()
+        except PrometheusApiClientError as exception:
+            self.logger.debug(
+                "Unable to read the scrape interval of %s, using %s: %s",
+                self.name,
+                self.scheduler.default_interval,
+                exception,
+            )
+            return
+        self.logger.debug("Using scrape interval %s for %s", interval, self.name)
+        self.scheduler.default_interval = interval
+
     async def _async_update_data(self) -> PrometheusResult:
         """Update data via library."""
+        if self._detect_interval:
+            await self._async_detect_interval()
+
+        now = time.monotonic()
+        due = self.scheduler.due(now)
         try:
-            return {
-                query_id: await self.client.async_query(query)
-                for query_id, query in self.queries.items()
-            }
+            results = await self._async_fetch(
+                {query_id: self._query(query_id) for query_id in due}
+            )
         except PrometheusApiClientAuthenticationError as exception:
             if getattr(self, "config_entry", None) is not None:
                 raise ConfigEntryAuthFailed(exception) from exception
             raise UpdateFailed(exception) from exception
-        except PrometheusApiClientError as exception:
-            raise UpdateFailed(exception) from exception
+        finally:
+            self.last_update_duration = time.monotonic() - now
+            self.logger.debug(
+                "Refreshed %d %s queries in %d requests in %.3f seconds",
+                len(due),
+                self.name,
+                self.last_request_count,
+                self.last_update_duration,
+            )
+            self._schedule_next(due, now)
+
+        data: PrometheusResult = dict(self.data or {})
+        for query_id in due:
+            result = results[query_id]
+            if isinstance(result, PrometheusApiClientError):
+                self._record_query_error(query_id, result)
+                data[query_id] = None
+            else:
+                self._record_query_success(query_id)
+                data[query_id] = result
+
+        if due and all(query_id in self.query_errors for query_id in due):
+            raise UpdateFailed(self.query_errors[due[0]])
+        return data
+
+    async def _async_fetch(self, queries: Mapping[str, str]) -> dict[str, _QueryResult]:
+        """Run queries concurrently, combined in batches when enabled."""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def _async_query(query_id: str) -> dict[str, _QueryResult]:
+            timeout = self._query_timeout(query_id)
+            async with semaphore:
+                try:
+                    async with asyncio.timeout(timeout + QUERY_TIMEOUT_GRACE):
+                        return {
+                            query_id: await self._async_query_one(
+                                query_id, queries[query_id], timeout
+                            )
+                        }
+                except PrometheusApiClientAuthenticationError:
+                    raise
+                except PrometheusApiClientError as exception:
+                    return {query_id: exception}
+                except TimeoutError:
+                    # The request was cancelled before the client could count it.
+                    self.client.circuit_breaker.record_failure(time.monotonic())
+                    return {
+                        query_id: PrometheusApiClientCommunicationError(
+                            f"Query did not complete within {timeout} seconds"
+                        )
+                    }
+
+        async def _async_query_batch(batch: dict[str, str]) -> dict[str, _QueryResult]:
+            # Queries of a timed out batch still get their own timeout.
+            timeout = min(map(self._query_timeout, batch))
+            try:
+                async with semaphore, asyncio.timeout(timeout + QUERY_TIMEOUT_GRACE):
+                    return await self.client.async_query_batch(
+                        batch,
+                        self.series_labels,
+                        min(map(self._max_age, batch)),
+                        timeout,
+                    )
+            except PrometheusApiClientAuthenticationError:
+                raise
+            except (PrometheusApiClientError, TimeoutError) as exception:
+                if isinstance(exception, TimeoutError):
+                    self.client.circuit_breaker.record_failure(time.monotonic())
+                self.logger.debug(
+                    "Batch of %d queries failed, running them one by one: %s",
+                    len(batch),
+                    exception,
+                )
+            results: dict[str, _QueryResult] = {}
+            for result in await asyncio.gather(*map(_async_query, batch)):
+                results.update(result)
+            return results
+
+        if self.batch_queries:
+            # Range queries cannot be combined with instant queries.
+            batches, standalone = plan_batches(
+                {
+                    query_id: query
+                    for query_id, query in queries.items()
+                    if query_id not in self.query_windows
+                },
+                BATCH_MAX_LENGTH,
+            )
+            standalone.extend(
+                query_id for query_id in queries if query_id in self.query_windows
+            )
+        else:
+            batches, standalone = [], list(queries)
+        self.last_request_count = len(batches) + len(standalone)
+
+        results: dict[str, _QueryResult] = {}
+        for result in await asyncio.gather(
+            *map(_async_query_batch, batches), *map(_async_query, standalone)
+        ):
+            results.update(result)
+        return results
+
+    async def _async_query_one(
+        self, query_id: str, query: str, query_timeout: float
+    ) -> float | WindowStatistics | SeriesResult | None:
+        """Evaluate a query on its own, as a range or an instant query."""
+        if query_id in self.query_windows:
+            return await self._async_query_window(query_id, query, query_timeout)
+        max_age = self._max_age(query_id)
+        limit = self._series_limit(query_id)
+        if query_id in self.series_labels:
+            return await self.client.async_query_series(
+                query, self.series_labels[query_id], max_age, query_timeout, limit
+            )
+        return await self.client.async_query(query, max_age, query_timeout, limit)
+
+    async def _async_query_window(
+        self, query_id: str, query: str, query_timeout: float
+    ) -> WindowStatistics | SeriesResult | None:
+        """Fetch the steps of a window since its last refresh and aggregate them."""
+        sliding_window = self._sliding_windows[query_id]
+        step = (
+            self.query_windows[query_id][1] or self.scheduler.default_interval
+        ).total_seconds()
+        labels = self.series_labels.get(query_id)
+        time_range = sliding_window.next_range(time.time(), step)
+        if time_range is not None:
+            start, end = time_range
+            sliding_window.extend(
+                await self.client.async_query_range(
+                    query,
+                    start,
+                    end,
+                    step,
+                    labels=labels,
+                    query_timeout=query_timeout,
+                ),
+                end,
+            )
+        statistics = sliding_window.statistics()
+        return statistics if labels is not None else statistics.get("")
+
+    def _query(self, query_id: str) -> str:
+        """
+        Return the expression to evaluate for a query.
+
+        Downsampled queries are wrapped in a subquery over their interval, so
+        each refresh publishes an aggregate of the samples since the previous
+        one instead of the value at that instant.
+        """
+        query = self.queries[query_id]
+        if query_id not in self.query_downsampling:
+            return query
+        function, step = self.query_downsampling[query_id]
+        interval = format_duration(self.scheduler.interval(query_id))
+        resolution = format_duration(step or self.scheduler.default_interval)
+        return f"{function}_over_time(({query})[{interval}:{resolution}])"
+
+    def _query_timeout(self, query_id: str) -> float:
+        """Return how many seconds the server may evaluate a query."""
+        timeout = self.query_timeouts.get(query_id) or min(
+            self.scheduler.interval(query_id), DEFAULT_QUERY_TIMEOUT
+        )
+        return timeout.total_seconds()
+
+    def _series_limit(self, query_id: str) -> int | None:
+        """Return how many series the server may return for a query."""
+        if query_id in self.series_limits:
+            return self.series_limits[query_id]
+        return None if query_id in self.series_labels else 1
+
+    def _max_age(self, query_id: str) -> float:
+        """Return how old a shared result of a query may be when it is reused."""
+        return self.scheduler.interval(query_id).total_seconds() * CACHE_MAX_AGE
+
+    def _schedule_next(self, refreshed: list[str], now: float) -> None:
+        """Plan the next refresh and back off when cycles overrun."""
+        if refreshed and self.scheduler.record_cycle(self.last_update_duration or 0):
+            self.logger.info(
+                "Refreshing %s took %.1f seconds, query intervals are now %dx longer",
+                self.name,
+                self.last_update_duration,
+                self.scheduler.backoff,
+            )
+        self.scheduler.mark_refreshed(refreshed, now)
+        self.update_interval = self.scheduler.time_until_next_due(time.monotonic())
+
+    def _record_query_error(
+        self, query_id: str, exception: PrometheusApiClientError
+    ) -> None:
+        """Keep track of a failed query."""
+        if query_id not in self.query_errors:
+            self.logger.warning("Query %s failed: %s", query_id, exception)
+        self.query_errors[query_id] = exception
+        self.query_error_counts[query_id] = self.query_error_counts.get(query_id, 0) + 1
+
+    def _record_query_success(self, query_id: str) -> None:
+        """Clear the error state of a query that succeeded again."""
+        if self.query_errors.pop(query_id, None) is not None:
+            self.logger.info("Query %s is working again", query_id)
@@ -11,10 +11,25 @@ from homeassistant.const import (
     CONF_ICON,
     CONF_ID,
     CONF_NAME,
+    CONF_SCAN_INTERVAL,
     CONF_UNIT_OF_MEASUREMENT,
 )
 
-from .const import CONF_QUERY, CONF_STATE_CLASS, query_id_from_name
+from .const import (
+    CONF_DOWNSAMPLE,
+    CONF_HEARTBEAT,
+    CONF_QUERY,
+    CONF_QUERY_TIMEOUT,
+    CONF_RELATIVE_TOLERANCE,
+    CONF_SERIES_LABELS,
+    CONF_SERIES_LIMIT,
+    CONF_STATE_CLASS,
+    CONF_STATISTIC,
+    CONF_STEP,
+    CONF_TOLERANCE,
+    CONF_WINDOW,
+    query_id_from_name,
+)
 
 if TYPE_CHECKING:
     from homeassistant.config_entries import ConfigEntry
@@ -22,6 +37,7 @@ if TYPE_CHECKING:
 
     from .api import PrometheusApiClient
     from .coordinator import PrometheusDataUpdateCoordinator
+    from .metric_index import MetricIndex
 
 
 type PrometheusSensorsConfigEntry = ConfigEntry[PrometheusSensorsData]
@@ -39,6 +55,17 @@ class QueryDefinition:
         CONF_DEVICE_CLASS: str | None,
         CONF_UNIT_OF_MEASUREMENT: str | None,
         CONF_STATE_CLASS: str | None,
+        CONF_TOLERANCE: float | None,
+        CONF_RELATIVE_TOLERANCE: float | None,
+        CONF_HEARTBEAT: dict[str, int] | None,
+        CONF_SCAN_INTERVAL: dict[str, int] | None,
+        CONF_SERIES_LABELS: list[str] | None,
+        CONF_QUERY_TIMEOUT: dict[str, int] | None,
+        CONF_SERIES_LIMIT: int | None,
+        CONF_WINDOW: dict[str, int] | None,
+        CONF_STEP: dict[str, int] | None,
+        CONF_STATISTIC: str | None,
+        CONF_DOWNSAMPLE: str | None,
     }
 
     def __init__(
@@ -49,6 +76,17 @@ class QueryDefinition:
         device_class: str | None = None,
         unit_of_measurement: str | None = None,
         state_class: str | None = None,
+        tolerance: float | None = None,
+        relative_tolerance: float | None = None,
+        heartbeat: dict[str, int] | None = None,
+        scan_interval: dict[str, int] | None = None,
+        series_labels: list[str] | None = None,
+        query_timeout: dict[str, int] | None = None,
+        series_limit: int | None = None,
+        window: dict[str, int] | None = None,
+        step: dict[str, int] | None = None,
+        statistic: str | None = None,
+        downsample: str | None = None,
     ) -> None:
         """Initialize a QueryDefinition object."""
         setattr(self, CONF_NAME, name)
@@ -70,6 +108,19 @@ class QueryDefinition:
             CONF_STATE_CLASS,
             None if state_class in (None, "") else SensorStateClass(state_class),
         )
+        setattr(self, CONF_TOLERANCE, tolerance)
+        setattr(self, CONF_RELATIVE_TOLERANCE, relative_tolerance)
+        setattr(self, CONF_HEARTBEAT, heartbeat)
+        setattr(self, CONF_SCAN_INTERVAL, scan_interval)
+        setattr(self, CONF_SERIES_LABELS, series_labels or None)
+        setattr(self, CONF_QUERY_TIMEOUT, query_timeout)
+        setattr(self, CONF_SERIES_LIMIT, int(series_limit) if series_limit else None)
+        setattr(self, CONF_WINDOW, window)
+        # Windows already aggregate their samples, the forms reject both.
+        downsample = None if window else downsample or None
+        setattr(self, CONF_STEP, step if window or downsample else None)
+        setattr(self, CONF_STATISTIC, statistic if window else None)
+        setattr(self, CONF_DOWNSAMPLE, downsample)
 
 
 @dataclass
@@ -79,3 +130,4 @@ class PrometheusSensorsData:
     client: PrometheusApiClient
     coordinator: PrometheusDataUpdateCoordinator
     integration: Integration
+    metric_index: MetricIndex
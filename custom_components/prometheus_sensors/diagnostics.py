@@ -0,0 +1,48 @@
+"""Diagnostics support for prometheus_sensors."""
+
+from __future__ import annotations
+
+from dataclasses import asdict
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.const import CONF_HOST
+
+if TYPE_CHECKING:
+    from homeassistant.core import HomeAssistant
+
+    from .data import PrometheusSensorsConfigEntry
+
+
+async def async_get_config_entry_diagnostics(
+    _hass: HomeAssistant,
+    entry: PrometheusSensorsConfigEntry,
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator = entry.runtime_data.coordinator
+    cache_stats = coordinator.client.cache_stats
+    breaker = coordinator.client.circuit_breaker
+    data = coordinator.data or {}
+    queries = {}
+    for query_id in coordinator.queries:
+        error = coordinator.query_errors.get(query_id)
+        queries[query_id] = {
+            "value": data.get(query_id),
+            "error": str(error) if error is not None else None,
+            "error_count": coordinator.query_error_counts.get(query_id, 0),
+        }
+    return {
+        CONF_HOST: entry.data[CONF_HOST],
+        "last_update_success": coordinator.last_update_success,
+        "last_update_duration": coordinator.last_update_duration,
+        "default_interval": str(coordinator.scheduler.default_interval),
+        "backoff": coordinator.scheduler.backoff,
+        "decode_stats": asdict(coordinator.client.decode_stats),
+        "connection_stats": asdict(coordinator.client.connection_stats),
+        "cache_stats": asdict(cache_stats) if cache_stats else None,
+        "circuit": {
+            "state": breaker.state,
+            "consecutive_failures": breaker.failures,
+            "probe_delay": breaker.probe_delay,
+        },
+        "queries": queries,
+    }
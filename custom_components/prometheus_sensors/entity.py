@@ -0,0 +1,167 @@
+"""Base entity for prometheus_sensors."""
+
+from __future__ import annotations
+
+import math
+import time
+from typing import TYPE_CHECKING
+
+from homeassistant.core import CALLBACK_TYPE, callback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import LOGGER
+from .coordinator import PrometheusDataUpdateCoordinator
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Mapping
+    from datetime import timedelta
+
+
+class PrometheusEntity(CoordinatorEntity[PrometheusDataUpdateCoordinator]):
+    """Entity backed by a Prometheus query."""
+
+    def __init__(
+        self,
+        coordinator: PrometheusDataUpdateCoordinator,
+        *,
+        series_key: str | None = None,
+        tolerance: float | None = None,
+        relative_tolerance: float | None = None,
+        heartbeat: timedelta | None = None,
+    ) -> None:
+        """
+        Initialize the entity.
+
+        With series_key, the entity follows a single series of a query that
+        returns one value per series. State writes are skipped while the value
+        and the attributes stay within tolerance or relative_tolerance of the
+        last written ones, unless heartbeat has elapsed since that write.
+        """
+        super().__init__(coordinator)
+        self._series_key = series_key
+        self._tolerance = tolerance or 0.0
+        self._relative_tolerance = relative_tolerance or 0.0
+        self._heartbeat = heartbeat.total_seconds() if heartbeat else None
+        self._written: tuple[bool, object] | None = None
+        self._written_attributes: Mapping[str, object] = {}
+        self._written_at = 0.0
+
+    @property
+    def available(self) -> bool:
+        """Return if the query of this entity succeeded."""
+        return (
+            super().available
+            and self.entity_description.key not in self.coordinator.query_errors
+        )
+
+    async def async_added_to_hass(self) -> None:
+        """Publish the value of a series as soon as its entity is added."""
+        await super().async_added_to_hass()
+        # Series entities are created from data the coordinator already holds.
+        if self._series_key is not None and self.coordinator.data is not None:
+            self._handle_coordinator_update()
+
+    def _query_value(self) -> object:
+        """Return the latest value of the query, or of the series, of this entity."""
+        value = (self.coordinator.data or {}).get(self.entity_description.key)
+        if self._series_key is not None:
+            return value.get(self._series_key) if isinstance(value, dict) else None
+        return value
+
+    @callback
+    def _async_write_ha_state_if_changed(
+        self, value: object, attributes: Mapping[str, object] | None = None
+    ) -> None:
+        """Write the state unless it and its attributes did not change."""
+        now = time.monotonic()
+        state = (self.available, value)
+        attributes = attributes or {}
+        if (
+            self._written is not None
+            and self._is_unchanged(self._written, state)
+            and self._are_unchanged(self._written_attributes, attributes)
+            and (self._heartbeat is None or now - self._written_at < self._heartbeat)
+        ):
+            return
+        self._written = state
+        self._written_attributes = attributes
+        self._written_at = now
+        self.async_write_ha_state()
+
+    def _is_unchanged(
+        self, written: tuple[bool, object], state: tuple[bool, object]
+    ) -> bool:
+        """Return if a state is equal to, or within tolerance of, the last write."""
+        (written_available, written_value), (available, value) = written, state
+        if written_available != available:
+            return False
+        return self._is_close(written_value, value)
+
+    def _are_unchanged(
+        self, written: Mapping[str, object], attributes: Mapping[str, object]
+    ) -> bool:
+        """Return if attributes are equal to, or within tolerance of, the last write."""
+        return written.keys() == attributes.keys() and all(
+            self._is_close(written[name], value) for name, value in attributes.items()
+        )
+
+    def _is_close(self, written_value: object, value: object) -> bool:
+        """Return if a value is equal to, or within tolerance of, a written value."""
+        if isinstance(written_value, float) and isinstance(value, float):
+            if math.isnan(written_value) and math.isnan(value):
+                return True
+            # Unlike math.isclose, the relative deadband only follows the
+            # written value, so it does not widen as the value grows.
+            return written_value == value or abs(value - written_value) <= max(
+                self._tolerance, self._relative_tolerance * abs(written_value)
+            )
+        return written_value == value
+
+
+class SeriesEntities:
+    """Keep one entity for each series returned by a query."""
+
+    def __init__(
+        self,
+        coordinator: PrometheusDataUpdateCoordinator,
+        query_id: str,
+        create_entity: Callable[[str], PrometheusEntity],
+        add_entities: Callable[[list[PrometheusEntity]], None],
+    ) -> None:
+        """Initialize the series entities of a query."""
+        self._coordinator = coordinator
+        self._query_id = query_id
+        self._create_entity = create_entity
+        self._add_entities = add_entities
+        self._entities: dict[str, PrometheusEntity] = {}
+
+    @callback
+    def async_start(self) -> CALLBACK_TYPE:
+        """Create the entities of the current series and follow the next updates."""
+        self._async_update()
+        return self._coordinator.async_add_listener(self._async_update)
+
+    @callback
+    def _async_update(self) -> None:
+        """Add entities for new series and remove those of vanished series."""
+        if self._query_id in self._coordinator.query_errors:
+            # Keep the entities, they are unavailable until the query recovers.
+            return
+        series = (self._coordinator.data or {}).get(self._query_id)
+        if not isinstance(series, dict):
+            series = {}
+
+        if added := [key for key in series if key not in self._entities]:
+            entities = {key: self._create_entity(key) for key in added}
+            self._entities.update(entities)
+            self._add_entities(list(entities.values()))
+
+        for key, entity in list(self._entities.items()):
+            if key in series or entity.entity_id is None:
+                # Entities still being added are removed on a later update.
+                continue
+            del self._entities[key]
+            LOGGER.debug("Series %s of %s disappeared", key, self._query_id)
+            # Series vanish during scrape gaps and target restarts, so the
+            # registry entry is kept with its customizations for their return.
+            self._coordinator.hass.async_create_task(entity.async_remove())
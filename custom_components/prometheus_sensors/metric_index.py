@@ -0,0 +1,144 @@
+"""Prefix-searchable index of the metrics of a Prometheus server."""
+
+from __future__ import annotations
+
+import asyncio
+import re
+import time
+from bisect import bisect_left
+from itertools import islice, takewhile
+from typing import TYPE_CHECKING
+
+from .api import PrometheusApiClientError
+from .const import LOGGER
+
+if TYPE_CHECKING:
+    from .api import PrometheusApiClient
+
+MAX_SUGGESTIONS = 10
+# Labels are only read from recent series, so long retention does not slow lookups.
+LABEL_LOOKBACK = 3600
+
+_NAME = r"[a-zA-Z_:][a-zA-Z0-9_:]*"
+_SELECTOR = rf"({_NAME})\{{(?:[^{{}}]*,)?\s*"
+_METRIC_PREFIX = re.compile(rf"({_NAME})$")
+_LABEL_PREFIX = re.compile(rf"{_SELECTOR}([a-zA-Z_]\w*)?$")
+_LABEL_VALUE_PREFIX = re.compile(
+    rf'{_SELECTOR}([a-zA-Z_]\w*)\s*(?:=~|!~|!=|=)\s*"([^"\\]*)$'
+)
+
+
+class MetricIndex:
+    """
+    Index of the metric names of a server, and of the labels of some metrics.
+
+    Metric names are loaded once, then refreshed incrementally with the names
+    of the series that appeared since the previous refresh. Label names and
+    values are only fetched for the metrics being completed, restricted to
+    their recent series with match[] and start, so the label sets of the whole
+    server are never downloaded.
+    """
+
+    def __init__(self, client: PrometheusApiClient) -> None:
+        """Initialize the index."""
+        self._client = client
+        self._lock = asyncio.Lock()
+        self.names: list[str] = []
+        # Wall time of the last refresh, used as start of the next one.
+        self.refreshed_at: float | None = None
+        self._labels: dict[str, list[str]] = {}
+        self._label_values: dict[tuple[str, str], list[str]] = {}
+
+    @property
+    def loaded(self) -> bool:
+        """Return if the metric names have been loaded."""
+        return self.refreshed_at is not None
+
+    async def async_load(self) -> None:
+        """Load the metric names unless they are already loaded."""
+        async with self._lock:
+            if not self.loaded:
+                await self._async_refresh()
+
+    async def async_refresh(self) -> None:
+        """Add the metric names of new series to a loaded index."""
+        async with self._lock:
+            if self.loaded:
+                await self._async_refresh()
+
+    async def _async_refresh(self) -> None:
+        """Fetch the metric names, logging failures as the index is optional."""
+        try:
+            await self._async_fetch_names()
+        except PrometheusApiClientError as exception:
+            LOGGER.debug("Unable to refresh the metric index: %s", exception)
+
+    async def _async_fetch_names(self) -> None:
+        now = time.time()
+        if self.refreshed_at is None:
+            self.names = sorted(await self._client.async_get_metrics())
+        else:
+            for name in await self._client.async_get_metrics(start=self.refreshed_at):
+                index = bisect_left(self.names, name)
+                if index == len(self.names) or self.names[index] != name:
+                    self.names.insert(index, name)
+            # Labels of the metrics looked up are fetched again on next use.
+            self._labels.clear()
+            self._label_values.clear()
+        self.refreshed_at = now
+
+    def complete(self, prefix: str) -> list[str]:
+        """Return the metric names starting with prefix."""
+        start = bisect_left(self.names, prefix)
+        return list(
+            takewhile(
+                lambda name: name.startswith(prefix),
+                islice(self.names, start, start + MAX_SUGGESTIONS),
+            )
+        )
+
+    async def async_labels(self, metric: str) -> list[str]:
+        """Return the label names of the recent series of a metric."""
+        if metric not in self._labels:
+            labels = await self._client.async_get_label_names(
+                metric, start=time.time() - LABEL_LOOKBACK
+            )
+            self._labels[metric] = sorted(set(labels) - {"__name__"})
+        return self._labels[metric]
+
+    async def async_label_values(self, metric: str, label: str) -> list[str]:
+        """Return the values of a label in the recent series of a metric."""
+        if (metric, label) not in self._label_values:
+            self._label_values[metric, label] = sorted(
+                await self._client.async_get_label_values(
+                    label, metric, start=time.time() - LABEL_LOOKBACK
+                )
+            )
+        return self._label_values[metric, label]
+
+    async def async_suggest(self, query: str) -> list[str]:
+        """
+        Return completions of the metric, label or label value ending a query.
+
+        Nothing is suggested while the index is not loaded or when a lookup
+        fails, as suggestions must never block the form.
+        """
+        if not self.loaded:
+            return []
+        try:
+            if match := _LABEL_VALUE_PREFIX.search(query):
+                metric, label, prefix = match.groups()
+                candidates = await self.async_label_values(metric, label)
+            elif match := _LABEL_PREFIX.search(query):
+                metric, prefix = match.group(1), match.group(2) or ""
+                candidates = await self.async_labels(metric)
+            elif match := _METRIC_PREFIX.search(query):
+                return self.complete(match.group(1))
+            else:
+                return []
+        except PrometheusApiClientError as exception:
+            LOGGER.debug("Unable to complete query %s: %s", query, exception)
+            return []
+        return [value for value in candidates if value.startswith(prefix)][
+            :MAX_SUGGESTIONS
+        ]
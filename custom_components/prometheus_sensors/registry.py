@@ -0,0 +1,101 @@
+"""Clients and query results shared by the entries of Prometheus servers."""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from .api_client.cache import QueryCache
+from .const import DATA_QUERY_CACHE, QUERY_CACHE_SIZE
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Hashable
+
+    from homeassistant.core import HomeAssistant
+
+    from .api import PrometheusApiClient
+    from .api_client.transport import Transport
+
+
+def get_query_cache(hass: HomeAssistant) -> QueryCache:
+    """Return the query results shared by the clients of every server."""
+    return hass.data.setdefault(DATA_QUERY_CACHE, QueryCache(QUERY_CACHE_SIZE))
+
+
+@dataclass
+class SharedClient:
+    """Client of a Prometheus server and the number of its users."""
+
+    client: PrometheusApiClient
+    transport_key: Hashable
+    # Monotonic time the refreshes of every user of the client are aligned to.
+    epoch: float
+    users: int = 0
+
+
+@dataclass
+class _PooledTransport:
+    """Transport shared by the clients of a server and its number of clients."""
+
+    transport: Transport
+    epoch: float
+    users: int = 0
+
+
+class ClientRegistry:
+    """
+    Share clients and connection pools between the entries of a server.
+
+    YAML servers and config entries with the same host and options use a
+    single client, so identical queries are answered by one request. Clients
+    that only differ in their headers, such as the tenants of a multi-tenant
+    cluster, send them with every request over a shared transport, so they
+    reuse the same keep-alive connections. Every user of a transport refreshes
+    on the same ticks. Clients and transports are reference counted and closed
+    when their last user is unloaded.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the registry."""
+        self._clients: dict[Hashable, SharedClient] = {}
+        self._transports: dict[Hashable, _PooledTransport] = {}
+
+    def __len__(self) -> int:
+        """Return the number of shared clients."""
+        return len(self._clients)
+
+    def acquire(
+        self,
+        key: Hashable,
+        transport_key: Hashable,
+        create_transport: Callable[[], Transport],
+        create_client: Callable[[Transport], PrometheusApiClient],
+    ) -> SharedClient:
+        """Return the client of key, created with create_client if needed."""
+        shared = self._clients.get(key)
+        if shared is None:
+            pooled = self._transports.get(transport_key)
+            if pooled is None:
+                pooled = _PooledTransport(create_transport(), time.monotonic())
+                self._transports[transport_key] = pooled
+            pooled.users += 1
+            shared = SharedClient(
+                create_client(pooled.transport), transport_key, pooled.epoch
+            )
+            self._clients[key] = shared
+        shared.users += 1
+        return shared
+
+    async def async_release(self, key: Hashable) -> None:
+        """Release the client of key, closing its transport once unused."""
+        shared = self._clients[key]
+        shared.users -= 1
+        if shared.users:
+            return
+        del self._clients[key]
+        pooled = self._transports[shared.transport_key]
+        pooled.users -= 1
+        if not pooled.users:
+            del self._transports[shared.transport_key]
+            await pooled.transport.close()
@@ -0,0 +1,123 @@
+"""Sliding windows of the samples of range queries."""
+
+from __future__ import annotations
+
+import math
+from array import array
+from typing import TYPE_CHECKING
+
+from .window_statistics import WindowStatistics
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping, Sequence
+
+
+class SampleBuffer:
+    """
+    Ring buffer of the (timestamp, value) samples of a series.
+
+    Timestamps and values are stored as doubles in two arrays of a fixed
+    capacity, so a window of samples costs 16 bytes per sample.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        """Initialize an empty buffer holding up to capacity samples."""
+        self._timestamps = array("d", bytes(8 * capacity))
+        self._values = array("d", bytes(8 * capacity))
+        self._head = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        """Return the number of samples in the buffer."""
+        return self._size
+
+    @property
+    def last_timestamp(self) -> float | None:
+        """Return the timestamp of the newest sample."""
+        if not self._size:
+            return None
+        return self._timestamps[(self._head + self._size - 1) % len(self._timestamps)]
+
+    def append(self, timestamp: float, value: float) -> None:
+        """Add a sample newer than the others, dropping the oldest when full."""
+        capacity = len(self._timestamps)
+        if self._size == capacity:
+            self._head = (self._head + 1) % capacity
+            self._size -= 1
+        index = (self._head + self._size) % capacity
+        self._timestamps[index] = timestamp
+        self._values[index] = value
+        self._size += 1
+
+    def evict(self, cutoff: float) -> None:
+        """Drop the samples at or before cutoff."""
+        capacity = len(self._timestamps)
+        while self._size and self._timestamps[self._head] <= cutoff:
+            self._head = (self._head + 1) % capacity
+            self._size -= 1
+
+    def values(self) -> array[float]:
+        """Return the values of the samples, oldest first."""
+        end = self._head + self._size
+        if end <= len(self._values):
+            return self._values[self._head : end]
+        return self._values[self._head :] + self._values[: end - len(self._values)]
+
+
+class SlidingWindow:
+    """
+    Samples of the series of a query over a sliding window.
+
+    Samples are aligned to multiples of the step, so each refresh only needs
+    the steps since the newest stored sample. Samples older than the window
+    are evicted, and series without samples left are forgotten.
+    """
+
+    def __init__(self, window: float) -> None:
+        """Initialize an empty window of window seconds."""
+        self.window = window
+        self.step: float | None = None
+        self._capacity = 0
+        self._buffers: dict[str, SampleBuffer] = {}
+        self._last_timestamp: float | None = None
+
+    def next_range(self, now: float, step: float) -> tuple[float, float] | None:
+        """
+        Return the start and end of the range to fetch at now, if any.
+
+        A change of step drops the stored samples, as they no longer align.
+        """
+        if step != self.step:
+            self.step = step
+            self._capacity = math.ceil(self.window / step) + 1
+            self._buffers.clear()
+            self._last_timestamp = None
+        end = math.floor(now / step) * step
+        start = (math.floor((end - self.window) / step) + 1) * step
+        if self._last_timestamp is not None:
+            start = max(start, self._last_timestamp + step)
+        return (start, end) if start <= end else None
+
+    def extend(self, series: Mapping[str, Sequence[Sequence]], end: float) -> None:
+        """Add the samples of the series fetched up to end, then slide the window."""
+        for key, samples in series.items():
+            buffer = self._buffers.get(key)
+            if buffer is None:
+                buffer = self._buffers[key] = SampleBuffer(self._capacity)
+            last = buffer.last_timestamp
+            for timestamp, value in samples:
+                if last is None or timestamp > last:
+                    buffer.append(timestamp, float(value))
+        self._last_timestamp = end
+        cutoff = end - self.window
+        for key, buffer in list(self._buffers.items()):
+            buffer.evict(cutoff)
+            if not buffer:
+                del self._buffers[key]
+
+    def statistics(self) -> dict[str, WindowStatistics | None]:
+        """Return the statistics of the samples of every series, keyed as fetched."""
+        return {
+            key: WindowStatistics.from_samples(buffer.values())
+            for key, buffer in self._buffers.items()
+        }
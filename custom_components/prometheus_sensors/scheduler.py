@@ -0,0 +1,123 @@
+"""Scheduling of Prometheus queries."""
+
+from __future__ import annotations
+
+import math
+from datetime import timedelta
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping
+
+MAX_BACKOFF = 8
+# A zero update interval would stop the polling of the coordinator, which only
+# schedules its refreshes with a resolution of a second anyway.
+MIN_DELAY = timedelta(seconds=1)
+# Queries due within this fraction of their interval run with the current cycle.
+_DUE_SLACK = 0.05
+
+
+class QueryScheduler:
+    """
+    Decide which queries are due on each refresh.
+
+    Every query has its own interval, or follows the default interval of the
+    server. Queries with the same interval form a bucket that is always
+    refreshed together. When refresh cycles take longer than the shortest
+    interval, all intervals are stretched by a backoff factor until the
+    cycles fit again.
+
+    With an epoch, refreshes are aligned to multiples of the interval since the
+    epoch, so schedulers sharing an epoch refresh their buckets together.
+    """
+
+    def __init__(
+        self,
+        intervals: Mapping[str, timedelta | None],
+        default_interval: timedelta,
+        epoch: float | None = None,
+    ) -> None:
+        """Initialize the scheduler."""
+        self.default_interval = default_interval
+        self.epoch = epoch
+        self.backoff = 1
+        self._buckets: dict[timedelta | None, list[str]] = {}
+        self._bucket_of: dict[str, timedelta | None] = {}
+        for query_id, interval in intervals.items():
+            self._buckets.setdefault(interval, []).append(query_id)
+            self._bucket_of[query_id] = interval
+        self._next_due: dict[timedelta | None, float] = {}
+
+    @property
+    def buckets(self) -> dict[timedelta, list[str]]:
+        """Return the queries grouped by their effective interval."""
+        buckets: dict[timedelta, list[str]] = {}
+        for bucket, query_ids in self._buckets.items():
+            buckets.setdefault(self._interval(bucket), []).extend(query_ids)
+        return buckets
+
+    def _interval(self, bucket: timedelta | None) -> timedelta:
+        """Return the effective interval of a bucket."""
+        return (bucket or self.default_interval) * self.backoff
+
+    def interval(self, query_id: str) -> timedelta:
+        """Return the effective interval of a query."""
+        return self._interval(self._bucket_of[query_id])
+
+    @property
+    def min_interval(self) -> timedelta:
+        """Return the shortest effective interval among the queries."""
+        return min(map(self._interval, self._buckets), default=self.default_interval)
+
+    def due(self, now: float) -> list[str]:
+        """Return the queries to refresh at monotonic time now."""
+        return [
+            query_id
+            for bucket, query_ids in self._buckets.items()
+            if self._next_due.get(bucket, now)
+            <= now + self._interval(bucket).total_seconds() * _DUE_SLACK
+            for query_id in query_ids
+        ]
+
+    def mark_refreshed(self, query_ids: Iterable[str], now: float) -> None:
+        """Schedule the next refresh of the buckets refreshed at now."""
+        for bucket in {self._bucket_of[query_id] for query_id in query_ids}:
+            interval = self._interval(bucket).total_seconds()
+            if self.epoch is None:
+                self._next_due[bucket] = now + interval
+                continue
+            # Refreshes started slightly early still count for the current tick.
+            tick = math.floor((now - self.epoch) / interval + _DUE_SLACK)
+            self._next_due[bucket] = self.epoch + (tick + 1) * interval
+
+    def reset(self) -> None:
+        """Make every query due on the next refresh."""
+        self._next_due.clear()
+
+    def time_until_next_due(self, now: float) -> timedelta:
+        """
+        Return the delay until the next query is due.
+
+        Buckets already due or overdue are refreshed after MIN_DELAY, and a
+        scheduler without queries waits for the default interval.
+        """
+        if not self._buckets:
+            return self.default_interval
+        next_due = min(self._next_due.values(), default=now)
+        return max(timedelta(seconds=next_due - now), MIN_DELAY)
+
+    def record_cycle(self, duration: float) -> bool:
+        """
+        Adapt the backoff factor to the duration of a refresh cycle.
+
+        Returns whether the factor changed.
+        """
+        interval = self.min_interval.total_seconds()
+        if duration > interval and self.backoff < MAX_BACKOFF:
+            self.backoff *= 2
+            return True
+        # Only recover when the cycle would still fit twice in the shorter interval.
+        if duration < interval / 4 and self.backoff > 1:
+            self.backoff //= 2
+            return True
+        return False
@@ -2,9 +2,12 @@
 
 from __future__ import annotations
 
+from dataclasses import asdict, fields, replace
+from functools import partial
 from typing import TYPE_CHECKING
 
 from homeassistant.components.sensor import (
+    SensorDeviceClass,
     SensorEntity,
     SensorEntityDescription,
     SensorStateClass,
@@ -17,28 +20,40 @@ from homeassistant.const import (
     CONF_NAME,
     CONF_PLATFORM,
     CONF_UNIT_OF_MEASUREMENT,
+    EntityCategory,
     Platform,
 )
 from homeassistant.core import callback
+from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers.device_registry import DeviceEntryType, DeviceInfo
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
+from .circuit_breaker import CircuitState
 from .const import (
+    CONF_HEARTBEAT,
     CONF_QUERIES,
     CONF_QUERY,
+    CONF_RELATIVE_TOLERANCE,
+    CONF_SERIES_LABELS,
     CONF_STATE_CLASS,
+    CONF_STATISTIC,
+    CONF_TOLERANCE,
+    CONF_WINDOW,
     DISCOVERY_COORDINATOR,
     DOMAIN,
     LOGGER,
     query_id_from_name,
 )
 from .coordinator import PrometheusDataUpdateCoordinator
+from .entity import PrometheusEntity, SeriesEntities
+from .window_statistics import DEFAULT_STATISTIC, WindowStatistics
 
 if TYPE_CHECKING:
-    from collections.abc import Mapping
+    from collections.abc import Callable, Mapping
+    from datetime import timedelta
     from typing import Any
 
-    from homeassistant.core import HomeAssistant
+    from homeassistant.core import CALLBACK_TYPE, HomeAssistant
     from homeassistant.helpers.entity_platform import (
         AddConfigEntryEntitiesCallback,
         AddEntitiesCallback,
@@ -72,16 +87,17 @@ async def async_setup_platform(
     )
     async_add_entities(
         [
-            PrometheusSensor(
-                coordinator=coordinator,
-                entity_description=_entity_description_from_query(query),
-                attribution=query[CONF_QUERY],
-                device_info=device_info,
+            PrometheusCircuitSensor(
+                coordinator,
+                f"{config[CONF_HOST]}_{query_id_from_name(config[CONF_NAME])}",
+                device_info,
+                # Entities without a config entry are not added to the device.
+                name=f"{config[CONF_NAME]} circuit breaker",
             )
-            for query in queries
-        ],
-        update_before_add=True,
+        ]
     )
+    for query in queries:
+        _async_add_query_sensors(coordinator, query, device_info, async_add_entities)
 
 
 async def async_setup_entry(
@@ -90,33 +106,83 @@ async def async_setup_entry(
     async_add_entities: AddConfigEntryEntitiesCallback,
 ) -> None:
     """Set up the sensor platform."""
+    device_info = DeviceInfo(
+        name=entry.data[CONF_NAME],
+        identifiers={
+            (
+                entry.domain,
+                entry.entry_id,
+            ),
+        },
+        entry_type=DeviceEntryType.SERVICE,
+    )
+    async_add_entities(
+        [
+            PrometheusCircuitSensor(
+                entry.runtime_data.coordinator, entry.entry_id, device_info
+            )
+        ]
+    )
     for subentry_id, subentry in entry.subentries.items():
         if subentry.data.get(CONF_PLATFORM, Platform.SENSOR) != Platform.SENSOR:
             continue
 
-        sensor = PrometheusSensor(
-            coordinator=entry.runtime_data.coordinator,
-            entity_description=_entity_description_from_query(subentry.data),
-            attribution=subentry.data[CONF_QUERY],
-            device_info=DeviceInfo(
-                name=entry.data[CONF_NAME],
-                identifiers={
-                    (
-                        entry.domain,
-                        entry.entry_id,
-                    ),
-                },
-                entry_type=DeviceEntryType.SERVICE,
-            ),
+        unsubscribe = _async_add_query_sensors(
+            entry.runtime_data.coordinator,
+            subentry.data,
+            device_info,
+            partial(async_add_entities, config_subentry_id=subentry_id),
         )
-        async_add_entities(
-            [sensor], update_before_add=True, config_subentry_id=subentry_id
+        if unsubscribe is not None:
+            entry.async_on_unload(unsubscribe)
+
+
+@callback
+def _async_add_query_sensors(
+    coordinator: PrometheusDataUpdateCoordinator,
+    query: Mapping[str, Any],
+    device_info: DeviceInfo,
+    async_add_entities: Callable[..., None],
+) -> CALLBACK_TYPE | None:
+    """
+    Add the sensor of a query, or one sensor per series of the query.
+
+    Returns the callback that stops following the series of the query.
+    """
+    entity_description = _entity_description_from_query(query)
+
+    def _create_sensor(series_key: str | None = None) -> PrometheusSensor:
+        if query.get(CONF_WINDOW):
+            return PrometheusStatisticsSensor(
+                coordinator=coordinator,
+                entity_description=entity_description,
+                attribution=query[CONF_QUERY],
+                device_info=device_info,
+                statistic=query.get(CONF_STATISTIC) or DEFAULT_STATISTIC,
+                series_key=series_key,
+                **_change_detection_from_query(query),
+            )
+        return PrometheusSensor(
+            coordinator=coordinator,
+            entity_description=entity_description,
+            attribution=query[CONF_QUERY],
+            device_info=device_info,
+            series_key=series_key,
+            **_change_detection_from_query(query),
         )
 
+    if not query.get(CONF_SERIES_LABELS):
+        async_add_entities([_create_sensor()], update_before_add=True)
+        return None
+    return SeriesEntities(
+        coordinator,
+        entity_description.key,
+        _create_sensor,
+        async_add_entities,
+    ).async_start()
 
-class PrometheusSensor(
-    CoordinatorEntity[PrometheusDataUpdateCoordinator], SensorEntity
-):
+
+class PrometheusSensor(PrometheusEntity, SensorEntity):
     """Sensor class."""
 
     def __init__(
@@ -125,20 +191,118 @@ class PrometheusSensor(
         entity_description: SensorEntityDescription,
         attribution: str,
         device_info: DeviceInfo,
+        *,
+        series_key: str | None = None,
+        tolerance: float | None = None,
+        relative_tolerance: float | None = None,
+        heartbeat: timedelta | None = None,
     ) -> None:
         """Initialize the sensor class."""
-        super().__init__(coordinator)
+        super().__init__(
+            coordinator,
+            series_key=series_key,
+            tolerance=tolerance,
+            relative_tolerance=relative_tolerance,
+            heartbeat=heartbeat,
+        )
+        self._attr_unique_id = entity_description.key
+        if series_key is not None:
+            self._attr_unique_id = f"{entity_description.key}_{series_key}"
+            entity_description = replace(
+                entity_description, name=f"{entity_description.name} {series_key}"
+            )
         self.entity_description = entity_description
         self._attr_attribution = attribution
-        self._attr_unique_id = entity_description.key
         self._attr_device_info = device_info
 
     @callback
     def _handle_coordinator_update(self) -> None:
-        value = self.coordinator.data[self.entity_description.key]
+        value = self._query_value()
         self._attr_available = value is not None
         self._attr_native_value = value
-        self.async_write_ha_state()
+        self._async_write_ha_state_if_changed(value)
+
+
+class PrometheusStatisticsSensor(PrometheusSensor):
+    """Sensor with statistics of the samples of a query over a window."""
+
+    # The statistics change on every refresh, only the state is recorded.
+    _unrecorded_attributes = frozenset(field.name for field in fields(WindowStatistics))
+
+    def __init__(
+        self,
+        coordinator: PrometheusDataUpdateCoordinator,
+        entity_description: SensorEntityDescription,
+        attribution: str,
+        device_info: DeviceInfo,
+        statistic: str,
+        **kwargs: Any,
+    ) -> None:
+        """Initialize the sensor, with one of the statistics as its state."""
+        super().__init__(
+            coordinator, entity_description, attribution, device_info, **kwargs
+        )
+        self._statistic = statistic
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        statistics = self._query_value()
+        self._attr_available = statistics is not None
+        if isinstance(statistics, WindowStatistics):
+            self._attr_native_value = getattr(statistics, self._statistic)
+            self._attr_extra_state_attributes = asdict(statistics)
+        else:
+            self._attr_native_value = None
+            self._attr_extra_state_attributes = {}
+        self._async_write_ha_state_if_changed(
+            self._attr_native_value, self._attr_extra_state_attributes
+        )
+
+
+class PrometheusCircuitSensor(
+    CoordinatorEntity[PrometheusDataUpdateCoordinator], SensorEntity
+):
+    """Diagnostic sensor with the circuit breaker state of a server."""
+
+    _attr_has_entity_name = True
+    _attr_translation_key = "circuit"
+    _attr_device_class = SensorDeviceClass.ENUM
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(
+        self,
+        coordinator: PrometheusDataUpdateCoordinator,
+        server_id: str,
+        device_info: DeviceInfo,
+        name: str | None = None,
+    ) -> None:
+        """Initialize the circuit sensor of a server, named after its device."""
+        super().__init__(coordinator)
+        self._attr_unique_id = f"{server_id}_circuit"
+        if name is not None:
+            self._attr_has_entity_name = False
+            self._attr_name = name
+        self._attr_options = list(CircuitState)
+        self._attr_device_info = device_info
+
+    @property
+    def available(self) -> bool:
+        """Return True, the circuit is reported while the server is down."""
+        return True
+
+    @property
+    def native_value(self) -> str:
+        """Return the state of the circuit."""
+        return self.coordinator.client.circuit_breaker.state
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return the failures and the delay until the next probe."""
+        breaker = self.coordinator.client.circuit_breaker
+        return {
+            "consecutive_failures": breaker.failures,
+            "probe_delay": breaker.probe_delay,
+        }
 
 
 def _entity_description_from_query(query: Mapping[str, Any]) -> SensorEntityDescription:
@@ -153,6 +317,16 @@ def _entity_description_from_query(query: Mapping[str, Any]) -> SensorEntityDesc
     )
 
 
+def _change_detection_from_query(query: Mapping[str, Any]) -> dict[str, Any]:
+    """Return the change detection settings of a query definition."""
+    heartbeat = query.get(CONF_HEARTBEAT)
+    return {
+        CONF_TOLERANCE: query.get(CONF_TOLERANCE),
+        CONF_RELATIVE_TOLERANCE: query.get(CONF_RELATIVE_TOLERANCE),
+        CONF_HEARTBEAT: cv.time_period(heartbeat) if heartbeat else None,
+    }
+
+
 def _sensor_query_config(query: dict) -> dict:
     """Normalize a YAML sensor query config."""
     return {
@@ -163,4 +337,10 @@ def _sensor_query_config(query: dict) -> dict:
         CONF_DEVICE_CLASS: query.get(CONF_DEVICE_CLASS),
         CONF_UNIT_OF_MEASUREMENT: query.get(CONF_UNIT_OF_MEASUREMENT) or None,
         CONF_STATE_CLASS: query.get(CONF_STATE_CLASS, SensorStateClass.MEASUREMENT),
+        CONF_TOLERANCE: query.get(CONF_TOLERANCE),
+        CONF_RELATIVE_TOLERANCE: query.get(CONF_RELATIVE_TOLERANCE),
+        CONF_HEARTBEAT: query.get(CONF_HEARTBEAT),
+        CONF_SERIES_LABELS: query.get(CONF_SERIES_LABELS),
+        CONF_WINDOW: query.get(CONF_WINDOW),
+        CONF_STATISTIC: query.get(CONF_STATISTIC),
     }
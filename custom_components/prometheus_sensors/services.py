@@ -0,0 +1,49 @@
+"""Services for prometheus_sensors."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import voluptuous as vol
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.core import callback
+from homeassistant.helpers import config_validation as cv
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    ATTR_END,
+    ATTR_START,
+    DATA_BACKFILL,
+    DOMAIN,
+    SERVICE_BACKFILL_STATISTICS,
+)
+
+if TYPE_CHECKING:
+    from homeassistant.core import HomeAssistant, ServiceCall
+
+SCHEMA_BACKFILL_STATISTICS = vol.Schema(
+    {
+        vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
+        vol.Required(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+    }
+)
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the services of the integration."""
+
+    async def _async_backfill_statistics(call: ServiceCall) -> None:
+        end = call.data.get(ATTR_END) or dt_util.utcnow()
+        for entity_id in call.data[ATTR_ENTITY_ID]:
+            await hass.data[DATA_BACKFILL].async_backfill(
+                entity_id, call.data[ATTR_START], end
+            )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_BACKFILL_STATISTICS,
+        _async_backfill_statistics,
+        schema=SCHEMA_BACKFILL_STATISTICS,
+    )
@@ -0,0 +1,120 @@
+"""Evaluation of the value templates of binary sensors."""
+
+from __future__ import annotations
+
+import operator
+import re
+from typing import TYPE_CHECKING
+
+import voluptuous as vol
+from homeassistant.helpers import config_validation as cv
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from homeassistant.helpers.template import Template
+
+# Rendered results kept per template, for the templates that only read value.
+RESULT_CACHE_SIZE = 256
+
+_OPERATORS: dict[str, Callable[[float, float], bool]] = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<=": operator.le,
+    ">=": operator.ge,
+    "<": operator.lt,
+    ">": operator.gt,
+}
+# Operands swap sides so the value is always on the left of the comparison.
+_REVERSED = {"==": "==", "!=": "!=", "<=": ">=", ">=": "<=", "<": ">", ">": "<"}
+_OPERATOR = r"==|!=|<=|>=|<|>"
+_NUMBER = r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+_VALUE = r"value(?:\s*\|\s*(float|int))?"
+_COMPARISON = re.compile(
+    rf"(?:({_NUMBER})\s*({_OPERATOR})\s*)?{_VALUE}(?:\s*({_OPERATOR})\s*({_NUMBER}))?"
+)
+_EXPRESSION = re.compile(r"\s*\{\{-?\s*(.*?)\s*-?\}\}\s*", re.DOTALL)
+
+
+class BinaryValueTemplate:
+    """
+    Turn query values into binary states with a value template.
+
+    Templates made of comparisons of value with numbers, such as
+    `{{ value > 5 }}` or `{{ 1 <= value | float < 10 }}`, joined with `and`,
+    are evaluated as native predicates. Other templates are rendered with
+    Jinja, and their results are cached per value when the render read no
+    states and not the time.
+    """
+
+    def __init__(self, template: Template) -> None:
+        """Compile the template."""
+        self.template = template
+        self._predicate = _compile_predicate(template.template)
+        self._results: dict[object, bool | None] = {}
+
+    def evaluate(self, value: object) -> bool | None:
+        """Return the binary state of a query value."""
+        if self._predicate is not None:
+            try:
+                return self._predicate(value)
+            except (TypeError, ValueError, OverflowError):
+                # Let Jinja report values the filters cannot convert.
+                pass
+        if value in self._results:
+            return self._results[value]
+        # Templates may only read states in some branches, so every render
+        # tells whether its own result can be reused.
+        info = self.template.async_render_to_info(variables={"value": value})
+        result = _binary_value(info.result())
+        if not (info.all_states or info.domains or info.entities or info.has_time):
+            if len(self._results) >= RESULT_CACHE_SIZE:
+                del self._results[next(iter(self._results))]
+            self._results[value] = result
+        return result
+
+
+def _binary_value(rendered: object) -> bool | None:
+    """Turn a rendered binary sensor template into a boolean value."""
+    if rendered is None:
+        return None
+    try:
+        return cv.boolean(rendered)
+    except vol.Invalid:
+        return bool(rendered)
+
+
+def _compile_predicate(source: str) -> Callable[[object], bool] | None:
+    """Return a native predicate equivalent to a template, when it is simple."""
+    expression = _EXPRESSION.fullmatch(source)
+    if expression is None:
+        return None
+    checks: list[Callable[[float], bool]] = []
+    conversions: set[str | None] = set()
+    for part in re.split(r"\s+and\s+", expression.group(1)):
+        comparison = _COMPARISON.fullmatch(part)
+        if comparison is None:
+            return None
+        left, left_operator, conversion, right_operator, right = comparison.groups()
+        if left_operator is None and right_operator is None:
+            return None
+        if left_operator is not None:
+            checks.append(_check(_REVERSED[left_operator], float(left)))
+        if right_operator is not None:
+            checks.append(_check(right_operator, float(right)))
+        conversions.add(conversion)
+    if len(conversions) > 1:
+        return None
+    convert = int if conversions == {"int"} else float
+
+    def _predicate(value: object) -> bool:
+        converted = convert(value)
+        return all(check(converted) for check in checks)
+
+    return _predicate
+
+
+def _check(operator_: str, operand: float) -> Callable[[float], bool]:
+    """Return a predicate comparing a value with an operand."""
+    compare = _OPERATORS[operator_]
+    return lambda value: compare(value, operand)
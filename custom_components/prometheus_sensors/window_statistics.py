@@ -0,0 +1,88 @@
+"""Statistics of the samples of a series over a time window."""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+PERCENTILES = (50, 90, 95, 99)
+# Statistics a sensor can use as its state, the others are attributes.
+STATISTICS = ("min", "max", "mean", "median", "p90", "p95", "p99", "last")
+DEFAULT_STATISTIC = "mean"
+
+
+@dataclass(frozen=True, slots=True)
+class WindowStatistics:
+    """Aggregates of the samples of a series over a window."""
+
+    count: int
+    min: float
+    max: float
+    mean: float
+    median: float
+    p90: float
+    p95: float
+    p99: float
+    last: float
+
+    @classmethod
+    def from_samples(cls, samples: Sequence[str | float]) -> WindowStatistics | None:
+        """
+        Aggregate the values of range query samples, oldest first.
+
+        NaN samples are ignored. Returns None when no sample has a value.
+        Vectorised with numpy when it is installed.
+        """
+        if np is not None:
+            return _numpy_statistics(samples)
+        return _python_statistics(samples)
+
+
+def _numpy_statistics(samples: Sequence[str | float]) -> WindowStatistics | None:
+    """Aggregate samples with numpy."""
+    values = np.asarray(samples, dtype=float)
+    values = values[~np.isnan(values)]
+    if not values.size:
+        return None
+    percentiles = np.percentile(values, PERCENTILES)
+    return WindowStatistics(
+        int(values.size),
+        float(values.min()),
+        float(values.max()),
+        float(values.mean()),
+        *map(float, percentiles),
+        float(values[-1]),
+    )
+
+
+def _python_statistics(samples: Sequence[str | float]) -> WindowStatistics | None:
+    """Aggregate samples without numpy, interpolating percentiles like numpy."""
+    values = [value for value in map(float, samples) if not math.isnan(value)]
+    if not values:
+        return None
+    ordered = sorted(values)
+    return WindowStatistics(
+        len(values),
+        ordered[0],
+        ordered[-1],
+        math.fsum(values) / len(values),
+        *(_percentile(ordered, percentile) for percentile in PERCENTILES),
+        values[-1],
+    )
+
+
+def _percentile(ordered: Sequence[float], percentile: float) -> float:
+    """Return a percentile of sorted values, with linear interpolation."""
+    rank = (len(ordered) - 1) * percentile / 100
+    lower = math.floor(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
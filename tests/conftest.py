@@ -0,0 +1,34 @@
+"""Fixtures for prometheus_sensors tests."""
+
+from collections.abc import Generator
+from unittest.mock import patch
+
+import pytest
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.test_util.aiohttp import (
+    AiohttpClientMocker,
+)
+
+from custom_components.prometheus_sensors.api_client.transport import (
+    AiohttpTransport,
+)
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations: None) -> None:
+    """Enable the custom integration in every test."""
+    return
+
+
+@pytest.fixture
+def mock_transport(
+    hass: HomeAssistant, aioclient_mock: AiohttpClientMocker
+) -> Generator[None]:
+    """Send the requests of set up servers to the aiohttp mocker."""
+    with patch(
+        "custom_components.prometheus_sensors._create_transport",
+        side_effect=lambda *_args, **_kwargs: AiohttpTransport(
+            aioclient_mock.create_session(hass.loop), owned=True
+        ),
+    ):
+        yield
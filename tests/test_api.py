@@ -0,0 +1,110 @@
+"""Tests for the Prometheus API client."""
+
+from urllib.parse import parse_qs
+
+import pytest
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from pytest_homeassistant_custom_component.test_util.aiohttp import (
+    AiohttpClientMocker,
+)
+
+from custom_components.prometheus_sensors.api import (
+    PrometheusApiClient,
+    PrometheusApiClientError,
+)
+from custom_components.prometheus_sensors.api_client.prometheus_client import (
+    RequestOptions,
+)
+
+HOST = "http://prometheus:9090"
+
+
+def _response(result_type: str, result: object) -> dict:
+    return {"status": "success", "data": {"resultType": result_type, "result": result}}
+
+
+async def test_query_vector(
+    hass: HomeAssistant, aioclient_mock: AiohttpClientMocker
+) -> None:
+    """Test the value of an instant vector."""
+    aioclient_mock.get(
+        f"{HOST}/api/v1/query",
+        json=_response("vector", [{"metric": {}, "value": [1, "3.5"]}]),
+    )
+    client = PrometheusApiClient(HOST, async_get_clientsession(hass))
+
+    assert await client.async_query("up") == 3.5
+
+
+@pytest.mark.parametrize(
+    ("result_type", "result"),
+    [("scalar", [1, "3"]), ("string", [1, "three"])],
+)
+async def test_query_scalar(
+    hass: HomeAssistant,
+    aioclient_mock: AiohttpClientMocker,
+    result_type: str,
+    result: list,
+) -> None:
+    """Test results that are not vectors fail as client errors."""
+    aioclient_mock.get(f"{HOST}/api/v1/query", json=_response(result_type, result))
+    client = PrometheusApiClient(HOST, async_get_clientsession(hass))
+
+    with pytest.raises(PrometheusApiClientError, match="instant vector"):
+        await client.async_query("scalar(up)")
+    with pytest.raises(PrometheusApiClientError, match="instant vector"):
+        await client.async_query_series("scalar(up)", ["job"])
+    # The server answered, so the failure is not counted by the breaker.
+    assert client.circuit_breaker.failures == 0
+
+
+async def test_query_get_below_post_threshold(
+    hass: HomeAssistant, aioclient_mock: AiohttpClientMocker
+) -> None:
+    """Test queries whose parameters fit the threshold are sent as a GET."""
+    query = "up"
+    aioclient_mock.get(
+        f"{HOST}/api/v1/query",
+        json=_response("vector", [{"metric": {}, "value": [1, "1"]}]),
+    )
+    client = PrometheusApiClient(
+        HOST,
+        async_get_clientsession(hass),
+        options=RequestOptions(post_threshold=len(f"query={query}")),
+    )
+
+    assert await client.async_query(query) == 1
+
+    ((method, url, data, _headers),) = aioclient_mock.mock_calls
+    assert method == "GET"
+    assert url.query["query"] == query
+    assert data is None
+
+
+async def test_query_post_above_post_threshold(
+    hass: HomeAssistant, aioclient_mock: AiohttpClientMocker
+) -> None:
+    """Test long queries are sent as a form-encoded POST."""
+    query = 'sum(rate(http_requests_total{path=~"/a|/b"}[5m])) > 0'
+    aioclient_mock.post(
+        f"{HOST}/api/v1/query",
+        json=_response("vector", [{"metric": {}, "value": [1, "2"]}]),
+    )
+    client = PrometheusApiClient(
+        HOST,
+        async_get_clientsession(hass),
+        options=RequestOptions(
+            headers={"X-Scope-OrgID": "tenant"},
+            post_threshold=len(f"query={query}") - 1,
+        ),
+    )
+
+    assert await client.async_query(query) == 2
+
+    ((method, url, data, headers),) = aioclient_mock.mock_calls
+    assert method == "POST"
+    assert not url.query
+    assert parse_qs(data) == {"query": [query]}
+    assert headers["Content-Type"] == "application/x-www-form-urlencoded"
+    assert headers["X-Scope-OrgID"] == "tenant"
@@ -0,0 +1,239 @@
+"""Tests for the backfill of long-term statistics."""
+
+from datetime import UTC, datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from homeassistant.components.recorder import Recorder
+from homeassistant.components.recorder.models import StatisticMeanType
+from homeassistant.components.recorder.statistics import (
+    async_import_statistics,
+    statistics_during_period,
+)
+from homeassistant.config_entries import ConfigSubentryData
+from homeassistant.const import EVENT_HOMEASSISTANT_FINAL_WRITE
+from homeassistant.core import HomeAssistant
+from homeassistant.setup import async_setup_component
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from pytest_homeassistant_custom_component.components.recorder.common import (
+    async_wait_recording_done,
+)
+from pytest_homeassistant_custom_component.test_util.aiohttp import (
+    AiohttpClientMocker,
+    AiohttpClientMockResponse,
+)
+from yarl import URL
+
+from custom_components.prometheus_sensors.const import DOMAIN
+
+HOST = "http://prometheus:9090"
+START = datetime(2024, 1, 1, tzinfo=UTC)
+HOUR = timedelta(hours=1)
+
+pytestmark = pytest.mark.usefixtures("mock_transport")
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(
+    recorder_mock: Recorder, enable_custom_integrations: None
+) -> None:
+    """Set up the recorder before Home Assistant, then the custom integration."""
+    return
+
+
+def _entry(query_id: str) -> MockConfigEntry:
+    return MockConfigEntry(
+        domain=DOMAIN,
+        entry_id="server",
+        data={
+            "name": "Server",
+            "host": HOST,
+            "verify_ssl": True,
+            "scan_interval": {"seconds": 15},
+        },
+        subentries_data=[
+            ConfigSubentryData(
+                data={
+                    "platform": "sensor",
+                    "id": query_id,
+                    "name": query_id,
+                    "query": "energy_total",
+                    "icon": None,
+                    "device_class": "energy",
+                    "unit_of_measurement": "kWh",
+                    "state_class": "total_increasing",
+                },
+                subentry_type="entity",
+                title=query_id,
+                unique_id=None,
+            )
+        ],
+    )
+
+
+async def _async_setup(
+    hass: HomeAssistant, aioclient_mock: AiohttpClientMocker, entry: MockConfigEntry
+) -> None:
+    async def _query_range(
+        method: str, url: URL, data: object
+    ) -> AiohttpClientMockResponse:
+        # A counter increasing by one every minute, from 50 at START.
+        start, end = int(url.query["start"]), int(url.query["end"])
+        values = [
+            [timestamp, str(50 + (timestamp - START.timestamp()) // 60)]
+            for timestamp in range(start, end + 1, 60)
+        ]
+        return AiohttpClientMockResponse(
+            method,
+            url,
+            json={
+                "status": "success",
+                "data": {
+                    "resultType": "matrix",
+                    "result": [{"metric": {}, "values": values}],
+                },
+            },
+        )
+
+    aioclient_mock.get(f"{HOST}/api/v1/query_range", side_effect=_query_range)
+    aioclient_mock.get(
+        f"{HOST}/api/v1/query",
+        json={
+            "status": "success",
+            "data": {
+                "resultType": "vector",
+                "result": [{"metric": {}, "value": [1, "1"]}],
+            },
+        },
+    )
+    entry.add_to_hass(hass)
+    assert await async_setup_component(hass, DOMAIN, {})
+    await hass.async_block_till_done()
+
+
+async def test_backfill_continues_sums(
+    recorder_mock: Recorder,
+    hass: HomeAssistant,
+    aioclient_mock: AiohttpClientMocker,
+) -> None:
+    """Test imported sums continue the statistics before and after them."""
+    await _async_setup(hass, aioclient_mock, _entry("energy"))
+    metadata = {
+        "mean_type": StatisticMeanType.NONE,
+        "has_sum": True,
+        "name": None,
+        "source": "recorder",
+        "statistic_id": "sensor.energy",
+        "unit_class": "energy",
+        "unit_of_measurement": "kWh",
+    }
+    async_import_statistics(
+        hass,
+        metadata,
+        [
+            {"start": START - HOUR, "state": 50, "sum": 100},
+            {"start": START + 2 * HOUR, "state": 60, "sum": 8},
+            {"start": START + 3 * HOUR, "state": 62, "sum": 10},
+        ],
+    )
+    await async_wait_recording_done(hass)
+
+    with patch("custom_components.prometheus_sensors.backfill.BACKFILL_CHUNK_DELAY", 0):
+        await hass.services.async_call(
+            DOMAIN,
+            "backfill_statistics",
+            {"entity_id": "sensor.energy", "start": START, "end": START + 3 * HOUR},
+            blocking=True,
+        )
+        await hass.async_block_till_done()
+    await async_wait_recording_done(hass)
+
+    statistics = await recorder_mock.async_add_executor_job(
+        statistics_during_period,
+        hass,
+        START - HOUR,
+        None,
+        {"sensor.energy"},
+        "hour",
+        None,
+        {"state", "sum"},
+    )
+    assert [(row["state"], row["sum"]) for row in statistics["sensor.energy"]] == [
+        (50, 100),
+        (109, 159),
+        (169, 219),
+        (229, 279),
+        # Shifted by the 271 added since the row before it.
+        (62, 281),
+    ]
+
+
+async def test_backfill_of_removed_query(
+    recorder_mock: Recorder,
+    hass: HomeAssistant,
+    aioclient_mock: AiohttpClientMocker,
+    hass_storage: dict,
+) -> None:
+    """Test a stored job whose query was removed is dropped on resume."""
+    hass_storage[f"{DOMAIN}.backfill"] = {
+        "version": 1,
+        "key": f"{DOMAIN}.backfill",
+        "data": {
+            "sensor.removed": {
+                "entry_id": "server",
+                "query_id": "removed",
+                "series_key": None,
+                "start": START.timestamp(),
+                "end": (START + HOUR).timestamp(),
+                "unit_of_measurement": "kWh",
+                "total": True,
+            }
+        },
+    }
+
+    await _async_setup(hass, aioclient_mock, _entry("energy"))
+
+    assert hass_storage[f"{DOMAIN}.backfill"]["data"] == {}
+    assert not any(
+        url.path.endswith("query_range") for _, url, _, _ in aioclient_mock.mock_calls
+    )
+
+
+async def test_backfill_unexpected_error(
+    recorder_mock: Recorder,
+    hass: HomeAssistant,
+    aioclient_mock: AiohttpClientMocker,
+    hass_storage: dict,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    """Test a job stopped by an unexpected error is stored as failed."""
+    entry = _entry("energy")
+    await _async_setup(hass, aioclient_mock, entry)
+
+    with patch(
+        "custom_components.prometheus_sensors.backfill._hourly_statistics",
+        side_effect=ValueError("bad sample"),
+    ):
+        await hass.services.async_call(
+            DOMAIN,
+            "backfill_statistics",
+            {"entity_id": "sensor.energy", "start": START, "end": START + 3 * HOUR},
+            blocking=True,
+        )
+        await hass.async_block_till_done()
+    # Write the progress now instead of after the save delay.
+    hass.bus.async_fire(EVENT_HOMEASSISTANT_FINAL_WRITE)
+    await hass.async_block_till_done()
+
+    assert "Backfill of sensor.energy failed" in caplog.text
+    job = hass_storage[f"{DOMAIN}.backfill"]["data"]["sensor.energy"]
+    assert job["error"] == "bad sample"
+    assert job["start"] == START.timestamp()
+
+    # Failed jobs are not resumed when their entry is set up again.
+    aioclient_mock.clear_requests()
+    assert await hass.config_entries.async_reload(entry.entry_id)
+    await hass.async_block_till_done()
+    assert not any(
+        url.path.endswith("query_range") for _, url, _, _ in aioclient_mock.mock_calls
+    )
@@ -0,0 +1,86 @@
+"""Tests for the batching of instant queries."""
+
+import pytest
+
+from custom_components.prometheus_sensors.batching import (
+    BATCH_LABEL,
+    can_batch,
+    combine_queries,
+    plan_batches,
+    split_result,
+    wrap_query,
+)
+
+
+def test_wrap_query() -> None:
+    """Test the series of a query are tagged with its id."""
+    assert wrap_query("cpu", 'rate(x{a="b"}[1m])') == (
+        'label_replace((rate(x{a="b"}[1m])), "__ha_id", "cpu", "", "")'
+    )
+    # Ids are quoted as PromQL strings.
+    assert '"say \\"hi\\""' in wrap_query('say "hi"', "up")
+
+
+def test_combine_queries() -> None:
+    """Test queries are combined with the or operator."""
+    assert combine_queries({"a": "up", "b": "down"}) == (
+        f"{wrap_query('a', 'up')} or {wrap_query('b', 'down')}"
+    )
+
+
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        ("up", True),
+        ("sum(rate(x[5m])) by (job)", True),
+        ("  42", False),
+        ("-1.5", False),
+        ("0x1f", False),
+        ("Inf", False),
+        ("scalar(up)", False),
+        ("time() - node_boot_time_seconds", False),
+        ("pi()", False),
+        ('"text"', False),
+        ("up # comment", False),
+        (f'up{{{BATCH_LABEL}="a"}}', False),
+    ],
+)
+def test_can_batch(query: str, *, expected: bool) -> None:
+    """Test scalar and string expressions and comments are not batched."""
+    assert can_batch(query) is expected
+
+
+def test_plan_batches_max_length() -> None:
+    """Test batches are split to fit the maximum length."""
+    queries = {f"q{index}": "up" for index in range(5)}
+    query_length = len(wrap_query("q0", "up")) + len(" or ")
+
+    batches, standalone = plan_batches(queries, 2 * query_length)
+
+    assert batches == [
+        {"q0": "up", "q1": "up"},
+        {"q2": "up", "q3": "up"},
+    ]
+    assert standalone == ["q4"]
+
+
+def test_plan_batches_standalone() -> None:
+    """Test queries that cannot be combined, or are too long, run alone."""
+    queries = {"scalar": "scalar(up)", "long": "x" * 100, "a": "up", "b": "down"}
+
+    batches, standalone = plan_batches(queries, 100)
+
+    assert batches == [{"a": "up", "b": "down"}]
+    assert standalone == ["scalar", "long"]
+
+
+def test_split_result() -> None:
+    """Test the series of a combined result are assigned to their queries."""
+    result = [
+        {"metric": {BATCH_LABEL: "a", "job": "x"}, "value": [1, "1"]},
+        {"metric": {BATCH_LABEL: "a", "job": "y"}, "value": [1, "2"]},
+        {"metric": {BATCH_LABEL: "c"}, "value": [1, "3"]},
+        {"metric": {}, "value": [1, "4"]},
+    ]
+
+    assert split_result(result, ["a", "b"]) == {"a": result[:2], "b": []}
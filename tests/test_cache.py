@@ -0,0 +1,134 @@
+"""Tests for the shared query cache."""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Generator
+from unittest.mock import patch
+
+import pytest
+
+from custom_components.prometheus_sensors.api_client.cache import QueryCache
+
+
+class _Clock:
+    """Monotonic clock of the cache, advanced by the test."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> Generator[_Clock]:
+    """Control the age of the cached results."""
+    clock = _Clock()
+    with patch("custom_components.prometheus_sensors.api_client.cache.time", clock):
+        yield clock
+
+
+def _fetch(result: object, calls: list[object]) -> Callable[[], Awaitable[object]]:
+    async def fetch() -> object:
+        calls.append(result)
+        return result
+
+    return fetch
+
+
+async def test_max_age(clock: _Clock) -> None:
+    """Test results are reused while they are younger than max_age."""
+    cache = QueryCache(10)
+    calls: list[object] = []
+
+    assert await cache.get("up", 10, _fetch(1, calls)) == 1
+    clock.now += 10
+    assert await cache.get("up", 10, _fetch(2, calls)) == 1
+    # Callers decide how old a result they accept.
+    assert await cache.get("up", 5, _fetch(3, calls)) == 3
+    clock.now += 11
+    assert await cache.get("up", 10, _fetch(4, calls)) == 4
+
+    assert calls == [1, 3, 4]
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 3
+
+
+async def test_lru_eviction(clock: _Clock) -> None:
+    """Test the least recently used result is evicted first."""
+    cache = QueryCache(2)
+    calls: list[object] = []
+    await cache.get("a", 60, _fetch("a", calls))
+    await cache.get("b", 60, _fetch("b", calls))
+    await cache.get("a", 60, _fetch("a", calls))
+
+    await cache.get("c", 60, _fetch("c", calls))
+    assert len(cache) == 2
+    assert cache.stats.evictions == 1
+
+    await cache.get("a", 60, _fetch("a", calls))
+    await cache.get("b", 60, _fetch("b", calls))
+    assert calls == ["a", "b", "c", "b"]
+
+
+async def test_merge_pending_requests(clock: _Clock) -> None:
+    """Test concurrent callers of a query share a single request."""
+    cache = QueryCache(10)
+    release = asyncio.Event()
+    calls = 0
+
+    async def fetch() -> int:
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return calls
+
+    first = asyncio.create_task(cache.get("up", 10, fetch))
+    second = asyncio.create_task(cache.get("up", 10, fetch))
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(first, second) == [1, 1]
+    assert calls == 1
+    assert cache.stats.merged == 1
+
+
+async def test_cancelled_caller(clock: _Clock) -> None:
+    """Test a caller giving up does not cancel the request of the others."""
+    cache = QueryCache(10)
+    release = asyncio.Event()
+
+    async def fetch() -> str:
+        await release.wait()
+        return "result"
+
+    first = asyncio.create_task(cache.get("up", 10, fetch))
+    second = asyncio.create_task(cache.get("up", 10, fetch))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+
+    assert await second == "result"
+    assert len(cache) == 1
+
+
+async def test_failures_not_cached(clock: _Clock) -> None:
+    """Test failed requests are raised to every waiter and not cached."""
+    cache = QueryCache(10)
+    release = asyncio.Event()
+    calls: list[object] = []
+
+    async def fail() -> None:
+        await release.wait()
+        msg = "unavailable"
+        raise RuntimeError(msg)
+
+    first = asyncio.create_task(cache.get("up", 10, fail))
+    second = asyncio.create_task(cache.get("up", 10, fail))
+    await asyncio.sleep(0)
+    release.set()
+    for task in (first, second):
+        with pytest.raises(RuntimeError):
+            await task
+
+    assert len(cache) == 0
+    assert await cache.get("up", 10, _fetch(1, calls)) == 1
@@ -0,0 +1,138 @@
+"""Tests for the prometheus_sensors config flow."""
+
+from unittest.mock import patch
+
+import pytest
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import HomeAssistant
+from homeassistant.data_entry_flow import FlowResultType
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.prometheus_sensors.const import DOMAIN
+
+HOST = "http://prometheus:9090"
+
+
+async def test_reconfigure_clears_optional_fields(hass: HomeAssistant) -> None:
+    """Test optional fields left empty are removed from the entry."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            "name": "Server",
+            "host": HOST,
+            "verify_ssl": True,
+            "headers": {},
+            "scan_interval": {"seconds": 15},
+            "query_timeout": {"seconds": 10},
+            "series_limit": 5,
+            "pool_size": 4,
+            "max_concurrency": 10,
+        },
+    )
+    entry.add_to_hass(hass)
+
+    with (
+        patch(
+            "custom_components.prometheus_sensors.config_flow."
+            "PrometheusConfigFlowHandler._test_credentials"
+        ),
+        patch(
+            "custom_components.prometheus_sensors.async_setup_entry",
+            return_value=True,
+        ),
+    ):
+        result = await entry.start_reconfigure_flow(hass)
+        assert result["type"] is FlowResultType.FORM
+        result = await hass.config_entries.flow.async_configure(
+            result["flow_id"],
+            {
+                "name": "Server",
+                "host": HOST,
+                "verify_ssl": True,
+                "max_concurrency": 20,
+                "post_threshold": 4000,
+                "batch_queries": False,
+                "transport": "aiohttp",
+            },
+        )
+        await hass.async_block_till_done()
+
+    assert result["type"] is FlowResultType.ABORT
+    assert result["reason"] == "reconfigure_successful"
+    assert entry.state is ConfigEntryState.LOADED
+    assert entry.data["max_concurrency"] == 20
+    assert entry.data["post_threshold"] == 4000
+    for key in ("scan_interval", "query_timeout", "series_limit", "pool_size"):
+        assert key not in entry.data
+
+
+@pytest.mark.parametrize(
+    ("series_labels", "error"),
+    [([], "invalid_query"), (["instance"], "missing_series_labels")],
+)
+async def test_query_result_error(
+    hass: HomeAssistant, series_labels: list[str], error: str
+) -> None:
+    """Test queries missing their series labels get their own error."""
+    entry = MockConfigEntry(
+        domain=DOMAIN, data={"name": "Server", "host": HOST, "verify_ssl": True}
+    )
+    entry.add_to_hass(hass)
+
+    with patch(
+        "custom_components.prometheus_sensors.config_flow."
+        "SubentryFlowHandler._async_test_query",
+        return_value=False,
+    ):
+        result = await hass.config_entries.subentries.async_init(
+            (entry.entry_id, "entity"), context={"source": "user"}
+        )
+        result = await hass.config_entries.subentries.async_configure(
+            result["flow_id"], {"platform": "sensor"}
+        )
+        result = await hass.config_entries.subentries.async_configure(
+            result["flow_id"],
+            {
+                "name": "Up",
+                "query": "up",
+                "state_class": "measurement",
+                "series_labels": series_labels,
+            },
+        )
+
+    assert result["type"] is FlowResultType.FORM
+    assert result["errors"] == {"base": error}
+
+
+async def test_window_and_downsample_rejected(hass: HomeAssistant) -> None:
+    """Test sensors cannot be both aggregated over a window and downsampled."""
+    entry = MockConfigEntry(
+        domain=DOMAIN, data={"name": "Server", "host": HOST, "verify_ssl": True}
+    )
+    entry.add_to_hass(hass)
+
+    with patch(
+        "custom_components.prometheus_sensors.config_flow."
+        "SubentryFlowHandler._async_test_query",
+        return_value=True,
+    ) as test_query:
+        result = await hass.config_entries.subentries.async_init(
+            (entry.entry_id, "entity"), context={"source": "user"}
+        )
+        result = await hass.config_entries.subentries.async_configure(
+            result["flow_id"], {"platform": "sensor"}
+        )
+        result = await hass.config_entries.subentries.async_configure(
+            result["flow_id"],
+            {
+                "name": "Load",
+                "query": "node_load1",
+                "state_class": "measurement",
+                "window": {"minutes": 5},
+                "downsample": "max",
+            },
+        )
+
+    assert result["type"] is FlowResultType.FORM
+    assert result["errors"] == {"downsample": "window_downsample"}
+    test_query.assert_not_called()
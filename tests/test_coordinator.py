@@ -0,0 +1,283 @@
+"""Tests for the prometheus_sensors coordinator."""
+
+import asyncio
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from pytest_homeassistant_custom_component.test_util.aiohttp import (
+    AiohttpClientMocker,
+    AiohttpClientMockResponse,
+)
+from yarl import URL
+
+from custom_components.prometheus_sensors.api import (
+    PrometheusApiClient,
+    PrometheusApiClientCommunicationError,
+    PrometheusApiClientUnavailableError,
+)
+from custom_components.prometheus_sensors.batching import BATCH_LABEL
+from custom_components.prometheus_sensors.circuit_breaker import CircuitState
+from custom_components.prometheus_sensors.const import LOGGER
+from custom_components.prometheus_sensors.coordinator import (
+    PrometheusDataUpdateCoordinator,
+    RefreshOptions,
+)
+
+HOST = "http://prometheus:9090"
+QUERIES = {"a": "up", "b": "node_load1", "c": "node_load5"}
+
+
+async def test_hanging_server_opens_circuit(
+    hass: HomeAssistant, aioclient_mock: AiohttpClientMocker
+) -> None:
+    """Test queries cut short by the coordinator count as breaker failures."""
+
+    async def _hang(method: str, url: URL, data: object) -> None:
+        await asyncio.Event().wait()
+
+    aioclient_mock.get(f"{HOST}/api/v1/query", side_effect=_hang)
+    aioclient_mock.get(f"{HOST}/-/ready", side_effect=_hang)
+    client = PrometheusApiClient(HOST, async_get_clientsession(hass))
+    coordinator = PrometheusDataUpdateCoordinator(
+        hass,
+        LOGGER,
+        client=client,
+        queries=QUERIES,
+        name="test",
+        options=RefreshOptions(
+            update_interval=timedelta(seconds=15),
+            query_timeouts=dict.fromkeys(QUERIES, timedelta(milliseconds=10)),
+        ),
+    )
+    breaker = client.circuit_breaker
+
+    with patch(
+        "custom_components.prometheus_sensors.coordinator.QUERY_TIMEOUT_GRACE", 0.01
+    ):
+        for _ in range(2):
+            coordinator.scheduler.reset()
+            await coordinator.async_refresh()
+        assert breaker.state is CircuitState.OPEN
+        assert all(
+            isinstance(error, PrometheusApiClientCommunicationError)
+            for error in coordinator.query_errors.values()
+        )
+        requests = aioclient_mock.call_count
+
+        # Queries now fail at once, without reaching the server.
+        coordinator.scheduler.reset()
+        await coordinator.async_refresh()
+        assert aioclient_mock.call_count == requests
+        assert all(
+            isinstance(error, PrometheusApiClientUnavailableError)
+            for error in coordinator.query_errors.values()
+        )
+
+        # A probe cut short by the deadline opens the circuit again.
+        breaker.probe_at = 0
+        coordinator.scheduler.reset()
+        await coordinator.async_refresh()
+        assert breaker.state is CircuitState.OPEN
+        assert breaker.probe_delay > breaker.min_probe_delay
+
+
+async def test_batch_sent_without_limit(
+    hass: HomeAssistant, aioclient_mock: AiohttpClientMocker
+) -> None:
+    """Test a query with many series cannot push the others out of a batch."""
+    params = []
+
+    async def _query(method: str, url: URL, data: object) -> AiohttpClientMockResponse:
+        params.append(dict(url.query))
+        result = [
+            {"metric": {BATCH_LABEL: "disks", "device": device}, "value": [1, "1"]}
+            for device in ("sda", "sdb", "sdc")
+        ]
+        result.append({"metric": {BATCH_LABEL: "load"}, "value": [1, "0.5"]})
+        return AiohttpClientMockResponse(
+            method,
+            url,
+            json={
+                "status": "success",
+                "data": {"resultType": "vector", "result": result},
+            },
+        )
+
+    aioclient_mock.get(f"{HOST}/api/v1/query", side_effect=_query)
+    coordinator = PrometheusDataUpdateCoordinator(
+        hass,
+        LOGGER,
+        client=PrometheusApiClient(HOST, async_get_clientsession(hass)),
+        queries={"disks": "node_disk_io_now", "load": "node_load1"},
+        name="test",
+        options=RefreshOptions(
+            update_interval=timedelta(seconds=15),
+            series_labels={"disks": ["device"]},
+            series_limits={"disks": 3},
+            batch_queries=True,
+        ),
+    )
+
+    await coordinator.async_refresh()
+
+    assert len(params) == 1
+    assert "limit" not in params[0]
+    assert coordinator.data["load"] == 0.5
+    assert coordinator.data["disks"] == {"sda": 1, "sdb": 1, "sdc": 1}
+
+
+async def test_default_query_timeout(
+    hass: HomeAssistant, aioclient_mock: AiohttpClientMocker
+) -> None:
+    """Test the default timeout follows the interval of a query, up to a cap."""
+    aioclient_mock.get(
+        f"{HOST}/api/v1/query",
+        json={
+            "status": "success",
+            "data": {"resultType": "vector", "result": []},
+        },
+    )
+    coordinator = PrometheusDataUpdateCoordinator(
+        hass,
+        LOGGER,
+        client=PrometheusApiClient(HOST, async_get_clientsession(hass)),
+        queries={"fast": "up", "hourly": "node_boot_time_seconds"},
+        name="test",
+        options=RefreshOptions(
+            update_interval=timedelta(seconds=15),
+            query_intervals={"hourly": timedelta(hours=1)},
+        ),
+    )
+
+    await coordinator.async_refresh()
+
+    timeouts = {
+        url.query["query"]: url.query["timeout"]
+        for _, url, _, _ in aioclient_mock.mock_calls
+    }
+    assert timeouts == {"up": "15s", "node_boot_time_seconds": "120s"}
+
+
+class _Clock:
+    """Monotonic clock of the coordinator, advanced by the test."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.mark.parametrize(
+    ("intervals", "request_duration"),
+    [
+        ((10, 15), 0.5),
+        ((7, 11, 13), 1),
+        ((10, 15), 12),
+    ],
+    ids=["in-phase", "out-of-phase", "overrunning"],
+)
+async def test_mixed_intervals_keep_polling(
+    hass: HomeAssistant,
+    aioclient_mock: AiohttpClientMocker,
+    intervals: tuple[int, ...],
+    request_duration: float,
+) -> None:
+    """Test buckets falling out of phase with slow cycles never stop polling."""
+    clock = _Clock()
+    refreshed: dict[str, float] = {}
+
+    async def _query(method: str, url: URL, data: object) -> AiohttpClientMockResponse:
+        clock.now += request_duration
+        refreshed[url.query["query"]] = clock.now
+        return AiohttpClientMockResponse(
+            method,
+            url,
+            json={
+                "status": "success",
+                "data": {"resultType": "vector", "result": []},
+            },
+        )
+
+    aioclient_mock.get(f"{HOST}/api/v1/query", side_effect=_query)
+    queries = {f"every_{interval}": f"up{interval}" for interval in intervals}
+    coordinator = PrometheusDataUpdateCoordinator(
+        hass,
+        LOGGER,
+        client=PrometheusApiClient(HOST, async_get_clientsession(hass)),
+        queries=queries,
+        name="test",
+        options=RefreshOptions(
+            update_interval=timedelta(seconds=intervals[0]),
+            query_intervals={
+                f"every_{interval}": timedelta(seconds=interval)
+                for interval in intervals
+            },
+        ),
+    )
+
+    with patch("custom_components.prometheus_sensors.coordinator.time", clock):
+        for _ in range(200):
+            await coordinator.async_refresh()
+            assert coordinator.update_interval
+            assert coordinator.update_interval.total_seconds() > 0
+            clock.now += coordinator.update_interval.total_seconds()
+
+    cycle = request_duration * len(intervals)
+    for query_id, query in queries.items():
+        interval = coordinator.scheduler.interval(query_id).total_seconds()
+        assert clock.now - refreshed[query] <= interval + 2 * cycle
+
+
+async def test_failed_batch_runs_queries_one_by_one(
+    hass: HomeAssistant, aioclient_mock: AiohttpClientMocker
+) -> None:
+    """Test the queries of a failed batch are retried on their own."""
+    queries = []
+
+    async def _query(method: str, url: URL, data: object) -> AiohttpClientMockResponse:
+        query = url.query["query"]
+        queries.append(query)
+        if BATCH_LABEL in query:
+            return AiohttpClientMockResponse(
+                method,
+                url,
+                status=422,
+                json={"status": "error", "error": "too many samples"},
+            )
+        return AiohttpClientMockResponse(
+            method,
+            url,
+            json={
+                "status": "success",
+                "data": {
+                    "resultType": "vector",
+                    "result": [{"metric": {}, "value": [1, str(len(query))]}],
+                },
+            },
+        )
+
+    aioclient_mock.get(f"{HOST}/api/v1/query", side_effect=_query)
+    coordinator = PrometheusDataUpdateCoordinator(
+        hass,
+        LOGGER,
+        client=PrometheusApiClient(HOST, async_get_clientsession(hass)),
+        queries=QUERIES,
+        name="test",
+        options=RefreshOptions(
+            update_interval=timedelta(seconds=15), batch_queries=True
+        ),
+    )
+
+    await coordinator.async_refresh()
+
+    assert len(queries) == 4
+    assert BATCH_LABEL in queries[0]
+    assert sorted(queries[1:]) == sorted(QUERIES.values())
+    assert coordinator.data == {
+        query_id: len(query) for query_id, query in QUERIES.items()
+    }
+    assert not coordinator.query_errors
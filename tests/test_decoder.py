@@ -0,0 +1,77 @@
+"""Tests for the incremental decoding of query responses."""
+
+import json
+
+import pytest
+
+from custom_components.prometheus_sensors.api_client.decoder import ResultDecoder
+
+SERIES = [
+    {"metric": {"__name__": "up", "job": "node"}, "value": [1700000000.5, "1"]},
+    {"metric": {"path": 'C:\\{dir}\\"x"', "text": "a]b}c[d{"}, "value": [1, "2"]},
+    {"metric": {"unicode": "caf\u00e9 \u2603", "empty": ""}, "value": [1, "NaN"]},
+    {"metric": {}, "values": [[1, "3"], [2, "4"]]},
+]
+
+
+def _body(result_type: str, result: object) -> bytes:
+    return json.dumps(
+        {"status": "success", "data": {"resultType": result_type, "result": result}},
+        ensure_ascii=False,
+    ).encode()
+
+
+def _decode(body: bytes, chunk_size: int, max_series: int = 100) -> ResultDecoder:
+    decoder = ResultDecoder(max_series)
+    for index in range(0, len(body), chunk_size):
+        decoder.feed(body[index : index + chunk_size])
+    decoder.finish()
+    return decoder
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 16, 64, 1 << 16])
+def test_vector(chunk_size: int) -> None:
+    """Test series split anywhere across chunks decode like json.loads."""
+    body = _body("vector", SERIES)
+
+    decoder = _decode(body, chunk_size)
+
+    assert decoder.result == json.loads(body)["data"]["result"]
+    assert not decoder.fallback
+    assert decoder.stats.bytes_read == len(body)
+    assert decoder.stats.series_parsed == len(SERIES)
+    assert decoder.stats.bytes_discarded == 0
+
+
+@pytest.mark.parametrize(
+    ("result_type", "result"),
+    [
+        ("vector", []),
+        ("scalar", [1700000000, "42"]),
+        ("string", [1700000000, 'quoted "]" text']),
+    ],
+)
+@pytest.mark.parametrize("chunk_size", [1, 5, 1 << 16])
+def test_other_results(result_type: str, result: object, chunk_size: int) -> None:
+    """Test empty, scalar and string results decode like json.loads."""
+    body = _body(result_type, result)
+
+    decoder = _decode(body, chunk_size)
+
+    assert decoder.result == json.loads(body)["data"]["result"]
+    assert decoder.stats.bytes_read == len(body)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 16])
+def test_max_series(chunk_size: int) -> None:
+    """Test series after max_series are counted but not decoded."""
+    body = _body("vector", SERIES)
+
+    decoder = _decode(body, chunk_size, max_series=1)
+
+    assert decoder.result == SERIES[:1]
+    assert decoder.truncated
+    assert decoder.stats.bytes_read == len(body)
+    assert decoder.stats.series_parsed == 1
+    assert decoder.stats.series_discarded == len(SERIES) - 1
+    assert 0 < decoder.stats.bytes_discarded < len(body)
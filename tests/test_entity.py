@@ -0,0 +1,187 @@
+"""Tests for the change detection of prometheus_sensors entities."""
+
+from collections.abc import Generator, Mapping
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+from homeassistant.config_entries import ConfigSubentryData
+from homeassistant.const import EVENT_STATE_CHANGED, EVENT_STATE_REPORTED
+from homeassistant.core import Event, HomeAssistant, callback
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from pytest_homeassistant_custom_component.test_util.aiohttp import (
+    AiohttpClientMocker,
+)
+
+from custom_components.prometheus_sensors.api import (
+    PrometheusApiClientCommunicationError,
+)
+from custom_components.prometheus_sensors.const import DOMAIN
+from custom_components.prometheus_sensors.coordinator import (
+    PrometheusDataUpdateCoordinator,
+)
+
+HOST = "http://prometheus:9090"
+
+
+class _Clock:
+    """Monotonic clock of the entities, advanced by the test."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> Generator[_Clock]:
+    """Control the time elapsed since the last write of an entity."""
+    clock = _Clock()
+    with patch("custom_components.prometheus_sensors.entity.time", clock):
+        yield clock
+
+
+def _sensor(query_id: str, **options: object) -> ConfigSubentryData:
+    return ConfigSubentryData(
+        data={
+            "platform": "sensor",
+            "id": query_id,
+            "name": query_id,
+            "query": query_id,
+            "icon": None,
+            "device_class": None,
+            "unit_of_measurement": None,
+            "state_class": "measurement",
+            **options,
+        },
+        subentry_type="entity",
+        title=query_id,
+        unique_id=None,
+    )
+
+
+@pytest.fixture
+async def coordinator(
+    hass: HomeAssistant, aioclient_mock: AiohttpClientMocker, mock_transport: None
+) -> PrometheusDataUpdateCoordinator:
+    """Set up a server with sensors of every change detection setting."""
+    aioclient_mock.get(
+        f"{HOST}/api/v1/query",
+        json={"status": "success", "data": {"resultType": "vector", "result": []}},
+    )
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            "name": "Server",
+            "host": HOST,
+            "verify_ssl": True,
+            "scan_interval": {"seconds": 15},
+        },
+        subentries_data=[
+            _sensor("absolute", tolerance=0.5),
+            _sensor("relative", relative_tolerance=0.1),
+            _sensor("heartbeat", tolerance=0.5, heartbeat={"minutes": 5}),
+        ],
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    return entry.runtime_data.coordinator
+
+
+@pytest.fixture
+def writes(hass: HomeAssistant) -> list[str]:
+    """Record the entity ids of every state write, changed or not."""
+    writes: list[str] = []
+
+    @callback
+    def _record(event: Event) -> None:
+        writes.append(event.data["entity_id"])
+
+    @callback
+    def _any(_event_data: Mapping[str, Any]) -> bool:
+        return True
+
+    for event_type in (EVENT_STATE_CHANGED, EVENT_STATE_REPORTED):
+        hass.bus.async_listen(event_type, _record, event_filter=_any)
+    return writes
+
+
+def _update(coordinator: PrometheusDataUpdateCoordinator, **values: float) -> None:
+    coordinator.async_set_updated_data({**coordinator.data, **values})
+
+
+@pytest.mark.usefixtures("clock")
+async def test_absolute_tolerance(
+    hass: HomeAssistant, coordinator: PrometheusDataUpdateCoordinator
+) -> None:
+    """Test the deadband is measured from the last written value."""
+    for value, expected in ((10.0, "10.0"), (10.3, "10.0"), (10.6, "10.6")):
+        _update(coordinator, absolute=value)
+        assert hass.states.get("sensor.absolute").state == expected
+
+    # Slow drifts are written once they leave the deadband.
+    for value in (10.9, 11.0, 11.2):
+        _update(coordinator, absolute=value)
+    assert hass.states.get("sensor.absolute").state == "11.2"
+
+
+@pytest.mark.usefixtures("clock")
+async def test_relative_tolerance(
+    hass: HomeAssistant, coordinator: PrometheusDataUpdateCoordinator
+) -> None:
+    """Test the relative deadband is a fraction of the last written value."""
+    for value, expected in (
+        (100.0, "100.0"),
+        (109.0, "100.0"),
+        (110.5, "110.5"),
+        (100.0, "110.5"),
+        (99.0, "99.0"),
+    ):
+        _update(coordinator, relative=value)
+        assert hass.states.get("sensor.relative").state == expected
+
+
+@pytest.mark.usefixtures("clock")
+async def test_availability_is_written(
+    hass: HomeAssistant, coordinator: PrometheusDataUpdateCoordinator
+) -> None:
+    """Test a failed query is written even when its value is within tolerance."""
+    _update(coordinator, absolute=10.0)
+
+    coordinator.query_errors["absolute"] = PrometheusApiClientCommunicationError()
+    _update(coordinator, absolute=10.0)
+    assert hass.states.get("sensor.absolute").state == "unavailable"
+
+    del coordinator.query_errors["absolute"]
+    _update(coordinator, absolute=10.1)
+    assert hass.states.get("sensor.absolute").state == "10.1"
+
+
+async def test_heartbeat(
+    hass: HomeAssistant,
+    coordinator: PrometheusDataUpdateCoordinator,
+    clock: _Clock,
+    writes: list[str],
+) -> None:
+    """Test unchanged values are written again once the heartbeat elapsed."""
+    _update(coordinator, heartbeat=1.0, absolute=1.0)
+    writes.clear()
+
+    clock.now += 299
+    _update(coordinator, heartbeat=1.2, absolute=1.0)
+    assert "sensor.heartbeat" not in writes
+
+    clock.now += 1
+    _update(coordinator, heartbeat=1.2, absolute=1.0)
+    assert writes.count("sensor.heartbeat") == 1
+    assert hass.states.get("sensor.heartbeat").state == "1.2"
+    # Entities without a heartbeat are never written while unchanged.
+    assert "sensor.absolute" not in writes
+
+    # The heartbeat restarts from the forced write.
+    writes.clear()
+    clock.now += 299
+    _update(coordinator, heartbeat=1.2, absolute=1.0)
+    assert "sensor.heartbeat" not in writes
@@ -0,0 +1,78 @@
+"""Tests for the registry of shared clients."""
+
+from unittest.mock import AsyncMock, Mock
+
+from custom_components.prometheus_sensors.registry import ClientRegistry
+
+
+class _Factories:
+    """Create fake transports and clients, keeping track of them."""
+
+    def __init__(self) -> None:
+        self.transports: list[Mock] = []
+        self.clients: list[Mock] = []
+
+    def transport(self) -> Mock:
+        transport = Mock(close=AsyncMock())
+        self.transports.append(transport)
+        return transport
+
+    def client(self, transport: Mock) -> Mock:
+        client = Mock(transport=transport)
+        self.clients.append(client)
+        return client
+
+
+def _acquire(
+    registry: ClientRegistry, factories: _Factories, key: str, transport_key: str
+) -> Mock:
+    return registry.acquire(
+        key, transport_key, factories.transport, factories.client
+    ).client
+
+
+async def test_shared_client() -> None:
+    """Test entries with the same key share a client until the last is released."""
+    registry = ClientRegistry()
+    factories = _Factories()
+
+    first = _acquire(registry, factories, "a", "host")
+    second = _acquire(registry, factories, "a", "host")
+    assert first is second
+    assert len(factories.clients) == 1
+    assert len(registry) == 1
+
+    await registry.async_release("a")
+    assert len(registry) == 1
+    factories.transports[0].close.assert_not_awaited()
+
+    await registry.async_release("a")
+    assert len(registry) == 0
+    factories.transports[0].close.assert_awaited_once()
+
+
+async def test_shared_transport() -> None:
+    """Test clients of the same host share a transport until the last is released."""
+    registry = ClientRegistry()
+    factories = _Factories()
+
+    tenant_a = registry.acquire("a", "host", factories.transport, factories.client)
+    tenant_b = registry.acquire("b", "host", factories.transport, factories.client)
+    other = registry.acquire("c", "other", factories.transport, factories.client)
+
+    assert tenant_a.client is not tenant_b.client
+    assert tenant_a.client.transport is tenant_b.client.transport
+    assert tenant_a.epoch == tenant_b.epoch
+    assert other.client.transport is not tenant_a.client.transport
+    assert len(factories.transports) == 2
+
+    await registry.async_release("a")
+    factories.transports[0].close.assert_not_awaited()
+    await registry.async_release("b")
+    factories.transports[0].close.assert_awaited_once()
+    factories.transports[1].close.assert_not_awaited()
+    assert len(registry) == 1
+
+    # A server set up again gets a new transport.
+    again = _acquire(registry, factories, "a", "host")
+    assert again.transport is factories.transports[2]
@@ -0,0 +1,97 @@
+"""Tests for the sliding windows of range query samples."""
+
+from custom_components.prometheus_sensors.sample_buffer import (
+    SampleBuffer,
+    SlidingWindow,
+)
+
+WINDOW = 300
+STEP = 60
+
+
+def _samples(*timestamps: float) -> list[list]:
+    return [[timestamp, str(timestamp / STEP)] for timestamp in timestamps]
+
+
+def test_buffer_wraparound() -> None:
+    """Test the oldest samples are overwritten once the buffer is full."""
+    buffer = SampleBuffer(3)
+    assert buffer.last_timestamp is None
+
+    for timestamp in range(1, 6):
+        buffer.append(timestamp, timestamp * 10)
+
+    assert len(buffer) == 3
+    assert buffer.last_timestamp == 5
+    assert list(buffer.values()) == [30, 40, 50]
+
+
+def test_buffer_evict_across_the_end() -> None:
+    """Test eviction of samples stored on both sides of the end of the arrays."""
+    buffer = SampleBuffer(4)
+    for timestamp in range(1, 7):
+        buffer.append(timestamp, timestamp)
+
+    buffer.evict(4)
+    assert list(buffer.values()) == [5, 6]
+    buffer.append(7, 7)
+    assert list(buffer.values()) == [5, 6, 7]
+    buffer.evict(10)
+    assert not buffer
+    assert buffer.last_timestamp is None
+
+
+def test_first_range_covers_the_window() -> None:
+    """Test the first range covers the steps of the whole window."""
+    window = SlidingWindow(WINDOW)
+
+    assert window.next_range(1000, STEP) == (720, 960)
+
+
+def test_next_range_after_load() -> None:
+    """Test later ranges only cover the steps since the newest sample."""
+    window = SlidingWindow(WINDOW)
+    window.next_range(1000, STEP)
+    window.extend({"": _samples(720, 780, 840, 900, 960)}, 960)
+
+    # No new step has started yet.
+    assert window.next_range(1019, STEP) is None
+    assert window.next_range(1085, STEP) == (1020, 1080)
+    # Refreshes that were missed are caught up, within the window.
+    assert window.next_range(1210, STEP) == (1020, 1200)
+    assert window.next_range(5000, STEP) == (4740, 4980)
+
+
+def test_extend_slides_the_window() -> None:
+    """Test samples leaving the window are evicted and duplicates skipped."""
+    window = SlidingWindow(WINDOW)
+    window.next_range(1000, STEP)
+    window.extend({"": _samples(720, 780, 840, 900, 960)}, 960)
+
+    window.extend({"": _samples(960, 1020, 1080)}, 1080)
+
+    statistics = window.statistics()[""]
+    assert statistics.count == 5
+    assert statistics.min == 840 / STEP
+    assert statistics.last == 1080 / STEP
+
+
+def test_series_forgotten_after_the_window() -> None:
+    """Test series without samples left in the window are forgotten."""
+    window = SlidingWindow(WINDOW)
+    window.next_range(1000, STEP)
+    window.extend({"a": _samples(900, 960), "b": _samples(960)}, 960)
+
+    window.extend({"a": _samples(1260)}, 1260)
+
+    assert list(window.statistics()) == ["a"]
+
+
+def test_step_change_clears_samples() -> None:
+    """Test samples are dropped when the step changes, as they no longer align."""
+    window = SlidingWindow(WINDOW)
+    window.next_range(1000, STEP)
+    window.extend({"": _samples(720, 780, 840, 900, 960)}, 960)
+
+    assert window.next_range(1000, 30) == (720, 990)
+    assert window.statistics() == {}
@@ -0,0 +1,78 @@
+"""Tests for the query scheduler."""
+
+from datetime import timedelta
+
+from custom_components.prometheus_sensors.scheduler import (
+    MAX_BACKOFF,
+    MIN_DELAY,
+    QueryScheduler,
+)
+
+DEFAULT_INTERVAL = timedelta(seconds=10)
+
+
+def _scheduler() -> QueryScheduler:
+    return QueryScheduler(
+        {"fast": None, "slow": timedelta(seconds=15)}, DEFAULT_INTERVAL
+    )
+
+
+def test_due_buckets() -> None:
+    """Test every bucket is due at first, then after its own interval."""
+    scheduler = _scheduler()
+
+    assert scheduler.due(0) == ["fast", "slow"]
+    scheduler.mark_refreshed(["fast", "slow"], 0)
+    assert scheduler.due(5) == []
+    assert scheduler.time_until_next_due(5) == timedelta(seconds=5)
+    assert scheduler.due(10) == ["fast"]
+
+
+def test_overdue_bucket() -> None:
+    """Test a bucket already overdue is refreshed after a short delay."""
+    scheduler = _scheduler()
+    scheduler.mark_refreshed(["fast", "slow"], 0)
+
+    assert scheduler.time_until_next_due(10) == MIN_DELAY
+    assert scheduler.time_until_next_due(29.75) == MIN_DELAY
+
+    scheduler.reset()
+    assert scheduler.time_until_next_due(30) == MIN_DELAY
+
+
+def test_without_queries() -> None:
+    """Test a scheduler without queries waits for the default interval."""
+    assert QueryScheduler({}, DEFAULT_INTERVAL).time_until_next_due(0) == (
+        DEFAULT_INTERVAL
+    )
+
+
+def test_backoff() -> None:
+    """Test intervals are stretched while cycles overrun, up to a maximum."""
+    scheduler = _scheduler()
+
+    assert scheduler.record_cycle(12)
+    assert scheduler.backoff == 2
+    assert scheduler.interval("fast") == timedelta(seconds=20)
+    assert scheduler.interval("slow") == timedelta(seconds=30)
+    for _ in range(5):
+        scheduler.record_cycle(1000)
+    assert scheduler.backoff == MAX_BACKOFF
+
+    # Cycles fitting the stretched interval keep the backoff.
+    assert not scheduler.record_cycle(30)
+    assert scheduler.backoff == MAX_BACKOFF
+
+
+def test_backoff_recovery() -> None:
+    """Test the backoff shrinks again once cycles are well within the interval."""
+    scheduler = _scheduler()
+    scheduler.record_cycle(12)
+    scheduler.record_cycle(25)
+    assert scheduler.backoff == 4
+
+    assert scheduler.record_cycle(1)
+    assert scheduler.backoff == 2
+    assert scheduler.record_cycle(1)
+    assert scheduler.backoff == 1
+    assert not scheduler.record_cycle(1)
@@ -0,0 +1,174 @@
+"""Tests for the prometheus_sensors sensors."""
+
+from dataclasses import replace
+
+import pytest
+from homeassistant.config_entries import ConfigSubentryData
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+from homeassistant.setup import async_setup_component
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from pytest_homeassistant_custom_component.test_util.aiohttp import (
+    AiohttpClientMocker,
+)
+
+from custom_components.prometheus_sensors.const import DOMAIN
+from custom_components.prometheus_sensors.window_statistics import WindowStatistics
+
+HOST = "http://prometheus:9090"
+STATISTICS = WindowStatistics(
+    count=3, min=1.0, max=3.0, mean=2.0, median=2.0, p90=3.0, p95=3.0, p99=3.0, last=2.0
+)
+
+
+@pytest.mark.usefixtures("mock_transport")
+async def test_statistics_attributes_update(
+    hass: HomeAssistant, aioclient_mock: AiohttpClientMocker
+) -> None:
+    """Test statistics sensors write changed attributes of an unchanged state."""
+    aioclient_mock.get(
+        f"{HOST}/api/v1/query_range",
+        json={"status": "success", "data": {"resultType": "matrix", "result": []}},
+    )
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            "name": "Server",
+            "host": HOST,
+            "verify_ssl": True,
+            "scan_interval": {"seconds": 15},
+        },
+        subentries_data=[
+            ConfigSubentryData(
+                data={
+                    "platform": "sensor",
+                    "id": "latency",
+                    "name": "Latency",
+                    "query": "request_latency_seconds",
+                    "icon": None,
+                    "device_class": None,
+                    "unit_of_measurement": "s",
+                    "state_class": "measurement",
+                    "tolerance": 0.5,
+                    "window": {"minutes": 5},
+                    "statistic": "mean",
+                },
+                subentry_type="entity",
+                title="Latency",
+                unique_id=None,
+            )
+        ],
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = entry.runtime_data.coordinator
+
+    coordinator.async_set_updated_data({"latency": STATISTICS})
+    assert hass.states.get("sensor.latency").attributes["max"] == 3.0
+
+    coordinator.async_set_updated_data({"latency": replace(STATISTICS, max=9.0)})
+    state = hass.states.get("sensor.latency")
+    assert state.state == "2.0"
+    assert state.attributes["max"] == 9.0
+
+    # Changes within the tolerance are still skipped.
+    coordinator.async_set_updated_data(
+        {"latency": replace(STATISTICS, max=9.2, mean=2.1)}
+    )
+    state = hass.states.get("sensor.latency")
+    assert state.state == "2.0"
+    assert state.attributes["max"] == 9.0
+
+
+@pytest.mark.usefixtures("mock_transport")
+async def test_yaml_circuit_sensor(
+    hass: HomeAssistant, aioclient_mock: AiohttpClientMocker
+) -> None:
+    """Test servers configured in YAML report their circuit, even without sensors."""
+    aioclient_mock.get(
+        f"{HOST}/api/v1/query",
+        json={"status": "success", "data": {"resultType": "vector", "result": []}},
+    )
+    assert await async_setup_component(
+        hass,
+        DOMAIN,
+        {
+            DOMAIN: [
+                {
+                    "name": "Server",
+                    "host": HOST,
+                    "scan_interval": 15,
+                    "binary_sensors": [{"name": "Door", "query": "door_open"}],
+                }
+            ]
+        },
+    )
+    await hass.async_block_till_done()
+
+    state = hass.states.get("sensor.server_circuit_breaker")
+    assert state is not None
+    assert state.state == "closed"
+    assert state.attributes["consecutive_failures"] == 0
+
+
+@pytest.mark.usefixtures("mock_transport")
+async def test_series_entities_keep_registry_entries(
+    hass: HomeAssistant, aioclient_mock: AiohttpClientMocker
+) -> None:
+    """Test series missing from a refresh keep their customized registry entry."""
+    aioclient_mock.get(
+        f"{HOST}/api/v1/query",
+        json={"status": "success", "data": {"resultType": "vector", "result": []}},
+    )
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            "name": "Server",
+            "host": HOST,
+            "verify_ssl": True,
+            "scan_interval": {"seconds": 15},
+        },
+        subentries_data=[
+            ConfigSubentryData(
+                data={
+                    "platform": "sensor",
+                    "id": "disks",
+                    "name": "Disks",
+                    "query": "node_disk_io_now",
+                    "icon": None,
+                    "device_class": None,
+                    "unit_of_measurement": None,
+                    "state_class": "measurement",
+                    "series_labels": ["device"],
+                },
+                subentry_type="entity",
+                title="Disks",
+                unique_id=None,
+            )
+        ],
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = entry.runtime_data.coordinator
+    registry = er.async_get(hass)
+
+    coordinator.async_set_updated_data({"disks": {"sda": 1.0, "sdb": 2.0}})
+    await hass.async_block_till_done()
+    registry.async_update_entity("sensor.disks_sdb", name="Backup disk")
+    await hass.async_block_till_done()
+
+    # A scrape gap drops the series for one refresh.
+    coordinator.async_set_updated_data({"disks": {"sda": 1.0}})
+    await hass.async_block_till_done()
+    state = hass.states.get("sensor.disks_sdb")
+    assert state.state == "unavailable"
+    assert state.attributes["restored"]
+    assert registry.async_get("sensor.disks_sdb").name == "Backup disk"
+
+    coordinator.async_set_updated_data({"disks": {"sda": 1.0, "sdb": 3.0}})
+    await hass.async_block_till_done()
+    state = hass.states.get("sensor.disks_sdb")
+    assert state.state == "3.0"
+    assert state.attributes["friendly_name"] == "Backup disk"
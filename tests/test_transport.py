@@ -0,0 +1,101 @@
+"""Tests for the HTTP/2 transport."""
+
+from collections.abc import AsyncIterator, Callable, Generator
+from typing import Any
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from custom_components.prometheus_sensors.api import (
+    PrometheusApiClient,
+    PrometheusApiClientCommunicationError,
+)
+from custom_components.prometheus_sensors.api_client.transport import (
+    Http2Transport,
+)
+
+HOST = "http://prometheus:9090"
+RESULT = b'{"status":"success","data":{"resultType":"vector","result":[]}}'
+
+Handler = Callable[[httpx.Request], httpx.Response]
+
+
+class _FailingStream(httpx.AsyncByteStream):
+    """Body that fails after its first chunk."""
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        yield RESULT[:10]
+        msg = "connection reset"
+        raise httpx.ReadError(msg)
+
+
+class _NetworkStream:
+    """Stand-in for the network stream of a pooled connection."""
+
+
+NETWORK_STREAM = _NetworkStream()
+
+
+@pytest.fixture
+def handler() -> Handler:
+    """Answer every request with an empty vector."""
+    return lambda _request: httpx.Response(200, content=RESULT)
+
+
+@pytest.fixture
+def transport(handler: Handler) -> Generator[Http2Transport]:
+    """Create an HTTP/2 transport sending its requests to handler."""
+    client = httpx.AsyncClient
+
+    def mock_client(**kwargs: Any) -> httpx.AsyncClient:
+        return client(transport=httpx.MockTransport(handler), **kwargs)
+
+    with patch.object(httpx, "AsyncClient", side_effect=mock_client):
+        yield Http2Transport(ssl_context=False, pool_size=1)
+
+
+def _raise(exception: Exception) -> Handler:
+    def handler(_request: httpx.Request) -> httpx.Response:
+        raise exception
+
+    return handler
+
+
+@pytest.mark.parametrize(
+    "handler",
+    [
+        _raise(httpx.ConnectError("connection refused")),
+        _raise(httpx.ReadTimeout("timed out")),
+        lambda _request: httpx.Response(200, stream=_FailingStream()),
+    ],
+    ids=["connect", "timeout", "body"],
+)
+async def test_transport_errors(transport: Http2Transport) -> None:
+    """Test that HTTP/2 failures are communication errors counted by the breaker."""
+    client = PrometheusApiClient(HOST, transport=transport)
+
+    with pytest.raises(PrometheusApiClientCommunicationError):
+        await client.async_query("up")
+    assert client.circuit_breaker.failures == 1
+    await client.async_close()
+
+
+@pytest.mark.parametrize(
+    "handler",
+    [
+        lambda _request: httpx.Response(
+            200, content=RESULT, extensions={"network_stream": NETWORK_STREAM}
+        )
+    ],
+)
+async def test_connection_counts(transport: Http2Transport) -> None:
+    """Test that requests sent over an open connection are counted as reused."""
+    client = PrometheusApiClient(HOST, transport=transport)
+
+    await client.async_query("up")
+    await client.async_query("down")
+
+    assert transport.stats.new_connections == 1
+    assert transport.stats.reused_connections == 1
+    await client.async_close()
@@ -0,0 +1,31 @@
+"""Tests for the value templates of binary sensors."""
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.template import Template
+
+from custom_components.prometheus_sensors.value_template import BinaryValueTemplate
+
+
+async def test_native_comparison(hass: HomeAssistant) -> None:
+    """Test simple comparisons match their Jinja rendering."""
+    template = BinaryValueTemplate(Template("{{ 1 <= value | float < 10 }}", hass))
+
+    assert template.evaluate("0.5") is False
+    assert template.evaluate("1") is True
+    assert template.evaluate(10.0) is False
+
+
+async def test_state_read_in_some_branches(hass: HomeAssistant) -> None:
+    """Test results of renders reading states are never reused."""
+    template = BinaryValueTemplate(
+        Template("{{ value > 1 and is_state('input_boolean.armed', 'on') }}", hass)
+    )
+    hass.states.async_set("input_boolean.armed", "on")
+
+    # This render stops before reading the state and may be reused.
+    assert template.evaluate(0.0) is False
+    assert template.evaluate(2.0) is True
+
+    hass.states.async_set("input_boolean.armed", "off")
+    assert template.evaluate(2.0) is False
+    assert template.evaluate(0.0) is False